@@ -0,0 +1,105 @@
+"""Solve chemistry problems in bulk without the Streamlit UI.
+
+Usage:
+    python batch_solve.py problems.jsonl -o results.jsonl
+    python batch_solve.py problems.csv -o results.jsonl --workers 8
+
+Input is JSONL (one object per line) or CSV (chosen by file extension).
+Each record needs a "problem" field and may carry an "id" (defaults to
+the 1-based record number) and "reactions" (a list in JSONL, a
+semicolon-separated string in CSV) to override the detected reaction types.
+
+Results are appended to the output JSONL as they complete, one line per
+problem. Rerunning with the same output file skips problems whose id is
+already there, so an interrupted run picks up where it stopped.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from orgsyn.solver import analyze_problem
+from orgsyn.workers import map_chunks
+
+def read_problems(path):
+    """Yield problem records from a JSONL or CSV file, streaming"""
+    with open(path, encoding='utf-8', newline='') as handle:
+        if path.lower().endswith('.csv'):
+            records = csv.DictReader(handle)
+        else:
+            records = (json.loads(line) for line in handle if line.strip())
+        for number, record in enumerate(records, 1):
+            reactions = record.get('reactions')
+            if isinstance(reactions, str):
+                reactions = [r.strip() for r in reactions.split(';') if r.strip()] or None
+            yield {
+                'id': str(record.get('id') or number),
+                'problem': record.get('problem') or '',
+                'reactions': reactions
+            }
+
+def completed_ids(path):
+    """Ids already present in an output file; trims a partially written last line"""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, 'rb+') as handle:
+        data = handle.read()
+        if data and not data.endswith(b'\n'):
+            handle.truncate(data.rfind(b'\n') + 1)
+            data = data[:data.rfind(b'\n') + 1]
+    for line in data.splitlines():
+        try:
+            done.add(json.loads(line)['id'])
+        except (ValueError, KeyError):
+            continue
+    return done
+
+def solve_records(records):
+    """Solve a chunk of records; runs inside pool workers"""
+    results = []
+    for record in records:
+        result = {'id': record['id'], 'problem': record['problem'], 'error': None}
+        try:
+            result.update(analyze_problem(record['problem'], record['reactions']))
+        except Exception as exc:
+            result['error'] = f"{type(exc).__name__}: {exc}"
+        results.append(result)
+    return results
+
+def run_batch(input_path, output_path, workers=None, chunk_size=50, resume=True):
+    """Solve every pending problem in input_path, appending results to output_path"""
+    done = completed_ids(output_path) if resume else set()
+    pending_records = (r for r in read_problems(input_path) if r['id'] not in done)
+    written = 0
+
+    with open(output_path, 'a' if resume else 'w', encoding='utf-8') as out:
+        def write(results):
+            nonlocal written
+            for result in results:
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            out.flush()
+            written += len(results)
+
+        for results in map_chunks(solve_records, pending_records, chunk_size, workers):
+            write(results)
+    return len(done), written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve chemistry problems from a JSONL/CSV file")
+    parser.add_argument('input', help="problems file (.jsonl or .csv)")
+    parser.add_argument('-o', '--output', required=True, help="results file (JSONL)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=50, help="problems per worker task")
+    parser.add_argument('--no-resume', action='store_true', help="overwrite the output instead of resuming")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    skipped, written = run_batch(args.input, args.output, args.workers, args.chunk_size, not args.no_resume)
+    elapsed = time.perf_counter() - start
+    print(f"Solved {written} problems in {elapsed:.1f}s ({skipped} already done)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""Benchmark the parsing, solving, naming, property, drawing and search hot paths.
+
+Usage:
+    python benchmark.py -o results.json
+    python benchmark.py -o results.json --scales 10,1000 --samples 100
+    python benchmark.py -o results.json --baseline baseline.json
+    python benchmark.py --compare results.json --baseline baseline.json
+
+Each scale runs in a fresh interpreter against a synthetic data set of that
+many compounds, pathways and named reactions (ORGSYN_DATA_DIR), with an empty
+image cache and store, so cold and warm timings are reproducible. The data
+and the sampled inputs are generated from --seed.
+
+Results are JSON: one entry per (scale, case) with per-call latency
+statistics in milliseconds. With --baseline, p50 latencies are compared
+against a stored result file and the exit status is 1 if any case slowed
+down by more than --threshold (relative) and --min-delta-ms (absolute).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+DEFAULT_SCALES = [10, 100, 1000, 10000, 100000]
+DEFAULT_SAMPLES = 200
+REACTION_TYPES = [
+    'oxidation', 'reduction', 'esterification', 'hydrolysis', 'acetylation',
+    'halogenation', 'nitration', 'alkylation', 'acylation', 'grignard'
+]
+
+# Synthetic Data
+_HEADS = ['', 'c1ccccc1', 'OC', 'NC', 'ClC', 'BrC', 'C1CCCCC1', 'O=C(O)', 'Cc1ccc(cc1)', 'COC(=O)']
+_TAILS = ['', 'O', 'N', 'C(=O)O', 'C=O', 'Cl', 'Br', 'OC(C)=O', 'c1ccccc1', '[N+](=O)[O-]', 'C#N', 'OC']
+_SYLLABLES = ['meth', 'eth', 'prop', 'but', 'pent', 'hex', 'hept', 'oct',
+              'non', 'dec', 'benz', 'tol', 'phen', 'anil', 'cyclo', 'chlor']
+_SUFFIXES = ['ol', 'al', 'one', 'ane', 'ene', 'ate', 'ide', 'ine']
+_SURNAMES = ['Arndt', 'Hofmann', 'Kolbe', 'Perkin', 'Claisen', 'Wurtz', 'Fittig', 'Sandmeyer',
+             'Gattermann', 'Reimer', 'Tiemann', 'Cannizzaro', 'Wittig', 'Grignard', 'Diels', 'Alder']
+_WORDS = ['conversion', 'aldehyde', 'ketone', 'rearrangement', 'intermediate', 'carbocation',
+          'nucleophilic', 'attack', 'elimination', 'addition', 'radical', 'aromatic', 'ester',
+          'amine', 'acid', 'base', 'catalyst', 'homologation', 'migration', 'enolate']
+
+def _synthetic_name(index):
+    # Bijective base-16 over syllables: every index gets a distinct single word
+    parts = []
+    index += 1
+    while index:
+        index, digit = divmod(index - 1, len(_SYLLABLES))
+        parts.append(_SYLLABLES[digit])
+    return ''.join(reversed(parts)) + _SUFFIXES[len(parts) % len(_SUFFIXES)]
+
+def _misspell(name):
+    # One substituted letter, inside the fuzzy index's edit budget for names of 4+ characters
+    return name[:3] + ('x' if name[3:4] != 'x' else 'y') + name[4:] if len(name) >= 4 else name
+
+def _synthetic_smiles(count):
+    smiles = []
+    seen = set()
+    for length in range(1, 200):
+        for branch in range(length):
+            for head in _HEADS:
+                for tail in _TAILS:
+                    chain = ''.join('C(C)' if i == branch and i else 'C' for i in range(length))
+                    candidate = head + chain + tail
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        smiles.append(candidate)
+                        if len(smiles) == count:
+                            return smiles
+    return smiles
+
+def generate_data(data_dir, scale, seed):
+    """Write synthetic versioned data files with `scale` compounds, pathways and reactions"""
+    rng = random.Random(seed)
+    names = [_synthetic_name(i) for i in range(scale)]
+    smiles = _synthetic_smiles(scale)
+    compounds = [{'name': name, 'smiles': s, 'class': 'Synthetic'} for name, s in zip(names, smiles)]
+
+    pathways = {reaction_type: [] for reaction_type in REACTION_TYPES}
+    for i in range(scale):
+        a, b, c = rng.sample(smiles, 3) if scale >= 3 else (smiles * 3)[:3]
+        pathways[REACTION_TYPES[i % len(REACTION_TYPES)]].append({
+            'name': f"Pathway {i}", 'A': a, 'B': b, 'C': c,
+            'description': ' '.join(rng.choices(_WORDS, k=6)),
+            'reagents': rng.sample(_WORDS, 2),
+            'mechanism': ' '.join(rng.choices(_WORDS, k=5))
+        })
+
+    reactions = {}
+    for i in range(scale):
+        reactions[f"{names[i].title()} {rng.choice(['Reaction', 'Synthesis', 'Rearrangement'])} {i}"] = {
+            'reactants': f"{smiles[i]} + {rng.choice(smiles)}",
+            'products': rng.choice(smiles),
+            'description': ' '.join(rng.choices(_WORDS, k=10)),
+            'mechanism': ' '.join(rng.choices(_WORDS, k=6)),
+            'year': rng.randint(1800, 2020),
+            'chemist': ' and '.join(rng.sample(_SURNAMES, 2))
+        }
+
+    common_names = {f"{name}ic acid": f"C{i % 20 + 1}H{i % 40 + 2}O2" for i, name in enumerate(names[:max(1, scale // 2)])}
+
+    os.makedirs(data_dir, exist_ok=True)
+    files = {
+        'compounds.json': {'version': 1, 'compounds': compounds},
+        'reaction_pathways.json': {'version': 1, 'pathways': pathways},
+        'named_reactions.json': {'version': 1, 'reactions': reactions},
+        'common_names.json': {'version': 1, 'common_names': common_names}
+    }
+    for filename, payload in files.items():
+        with open(os.path.join(data_dir, filename), 'w', encoding='utf-8') as handle:
+            json.dump(payload, handle)
+    project_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'reaction_templates.json')
+    with open(project_data, encoding='utf-8') as source, \
+            open(os.path.join(data_dir, 'reaction_templates.json'), 'w', encoding='utf-8') as target:
+        target.write(source.read())
+    return names, smiles, pathways, reactions
+
+# Measurement
+def _stats(times_ns):
+    ordered = sorted(times_ns)
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] / 1e6
+    return {
+        'ops': len(ordered),
+        'total_ms': sum(ordered) / 1e6,
+        'mean_ms': sum(ordered) / len(ordered) / 1e6,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'max_ms': ordered[-1] / 1e6
+    }
+
+def _time_calls(function, inputs):
+    times = []
+    for args in inputs:
+        start = time.perf_counter_ns()
+        function(*args)
+        times.append(time.perf_counter_ns() - start)
+    return _stats(times)
+
+def _sample(rng, items, count):
+    items = list(items)
+    return rng.sample(items, count) if len(items) >= count else [rng.choice(items) for _ in range(count)]
+
+def run_scale(scale, samples, seed):
+    """Run every case against a synthetic data set; ORGSYN_* paths must point at scratch space"""
+    names, smiles, pathways, reactions = generate_data(os.environ['ORGSYN_DATA_DIR'], scale, seed)
+    rng = random.Random(seed + 1)
+
+    # Imported only now, so module-level paths pick up the scratch environment
+    from orgsyn.api import ApiServer
+    from orgsyn.chemistry import (
+        calculate_molecular_properties, create_reaction_flow_diagram, draw_molecule, get_compound_name
+    )
+    from orgsyn.data import (
+        get_common_names, get_compound_database, get_compound_synonyms, get_named_reactions, get_reaction_pathways
+    )
+    from orgsyn.descriptors import DescriptorTable
+    from orgsyn.molstore import build_molecule_store, get_molecule_store, load_mol
+    from orgsyn.parsing import build_name_index, parse_problem
+    from orgsyn.solver import solve_chemistry_problem
+    from orgsyn.store import ReactionStore
+
+    results = {}
+    def single(case, function):
+        start = time.perf_counter_ns()
+        value = function()
+        results[case] = _stats([time.perf_counter_ns() - start])
+        return value
+
+    single('load_data', lambda: (get_compound_database(), get_reaction_pathways(), get_named_reactions()))
+
+    problem_parts = list(zip(_sample(rng, names, samples), _sample(rng, names, samples),
+                             _sample(rng, REACTION_TYPES, samples), _sample(rng, REACTION_TYPES, samples)))
+    problems = [f"{a} on {r1} gives compound B which on {r2} gives {b}." for a, b, r1, r2 in problem_parts]
+    single('parse_problem.cold', lambda: parse_problem(problems[0]))
+    results['parse_problem'] = _time_calls(parse_problem, [(p,) for p in problems])
+    name_index = single('name_index.build', lambda: build_name_index(
+        get_compound_database(), get_compound_synonyms(), get_common_names()))
+    results['name_index.search'] = _time_calls(name_index.search, [(_misspell(name),) for name in _sample(rng, names, samples)])
+    typo_problems = [f"{_misspell(a)} on {r1} gives compound B which on {r2} gives {_misspell(b)}."
+                     for a, b, r1, r2 in problem_parts]
+    results['parse_problem.typos'] = _time_calls(parse_problem, [(p,) for p in typo_problems])
+    single('solve_chemistry_problem.cold', lambda: solve_chemistry_problem(problems[0], REACTION_TYPES))
+    results['solve_chemistry_problem'] = _time_calls(
+        solve_chemistry_problem, [(p, rng.sample(REACTION_TYPES, 3)) for p in problems])
+
+    known = _sample(rng, smiles, samples)
+    single('get_compound_name.cold', lambda: get_compound_name(known[0]))
+    results['get_compound_name'] = _time_calls(get_compound_name, [(s,) for s in known])
+    results['get_compound_name.unknown'] = _time_calls(get_compound_name, [(s + 'CCl',) for s in known])
+
+    molecules = _sample(rng, smiles, samples)
+    results['calculate_molecular_properties.cold'] = _time_calls(calculate_molecular_properties, [(s,) for s in molecules])
+    results['calculate_molecular_properties.warm'] = _time_calls(calculate_molecular_properties, [(s,) for s in molecules])
+
+    for fmt in ('svg', 'png'):
+        results[f'draw_molecule.{fmt}.cold'] = _time_calls(draw_molecule, [(s, (200, 200), None, fmt) for s in molecules])
+        results[f'draw_molecule.{fmt}.warm'] = _time_calls(draw_molecule, [(s, (200, 200), None, fmt) for s in molecules])
+
+    grid_pathways = _sample(rng, [p for group in get_reaction_pathways().values() for p in group], samples)
+    for fmt in ('svg', 'png'):
+        results[f'create_reaction_flow_diagram.{fmt}.cold'] = _time_calls(
+            create_reaction_flow_diagram, [(p, (300, 300), fmt) for p in grid_pathways])
+    results['create_reaction_flow_diagram.svg.warm'] = _time_calls(
+        create_reaction_flow_diagram, [(p, (300, 300), 'svg') for p in grid_pathways])
+
+    reaction_names = list(reactions)
+    queries = (
+        [name.split()[0][:6] for name in _sample(rng, reaction_names, samples // 4)]        # name prefixes
+        + _sample(rng, _SURNAMES, samples // 4)                                             # chemists
+        + [' '.join(rng.sample(_WORDS, 2)) for _ in range(samples // 4)]                    # two-term text
+        + [rng.choice(['ox', 'C=', 'zzzzzz', 'qq']) for _ in range(samples - 3 * (samples // 4))]  # short / miss
+    )
+
+    store = single('search_store.sync', lambda: _synced_store(ReactionStore))
+    results['search_store'] = _time_calls(lambda q: store.search_reactions(q, limit=100), [(q,) for q in queries])
+
+    facet_index = single('facet_index.build', store.facet_index)
+    facet_values = {facet: list(counts) for facet, counts in facet_index.counts().items()}
+    facet_filters = [{facet: rng.sample(values, min(len(values), rng.randint(0, 2))) for facet, values in facet_values.items()}
+                     for _ in range(samples)]
+    results['facet_filter'] = _time_calls(lambda f: store.filter_reactions(facets=f, limit=100), [(f,) for f in facet_filters])
+    results['facet_filter.search'] = _time_calls(
+        lambda q, f: store.filter_reactions(q, facets=f, limit=100), list(zip(queries, facet_filters)))
+
+    single('molstore.build', lambda: build_molecule_store(workers=1))
+    get_molecule_store.cache_clear()
+    results['molstore.load_mol'] = _time_calls(load_mol, [(s,) for s in molecules])
+
+    table = single('descriptors.build', lambda: DescriptorTable.build(workers=1))
+    filters = [{'mol_wt': (low, low + rng.uniform(10, 200)), 'logp': (None, rng.uniform(-1, 5))}
+               for low in (rng.uniform(50, 400) for _ in range(samples))]
+    results['descriptors.filter'] = _time_calls(
+        lambda ranges: table.rows(table.filter(ranges), 'mol_wt', limit=200), [(f,) for f in filters])
+
+    # Every sampled molecule requested twice at once: batched and deduplicated by the API server
+    api = ApiServer(workers=1)
+    burst = [f'/properties?smiles={quote(s)}' for s in molecules * 2]
+    async def api_burst():
+        return await asyncio.gather(*(api.dispatch('GET', target, b'') for target in burst))
+    single('api.properties.burst', lambda: asyncio.run(api_burst()))
+    api.close()
+
+    import rdkit
+    return {'rdkit': rdkit.__version__, 'cases': results}
+
+def _synced_store(store_class):
+    store = store_class()
+    store.sync_builtin()
+    return store
+
+# Driver
+def _run_scale_subprocess(scale, samples, seed):
+    with tempfile.TemporaryDirectory(prefix=f"orgsyn-bench-{scale}-") as workdir:
+        env = dict(os.environ)
+        env.update({
+            'ORGSYN_DATA_DIR': os.path.join(workdir, 'data'),
+            'ORGSYN_IMAGE_CACHE_DIR': os.path.join(workdir, 'images'),
+            'ORGSYN_STORE_PATH': os.path.join(workdir, 'store.sqlite3'),
+            'ORGSYN_MOLSTORE_PATH': os.path.join(workdir, 'molecules.bin'),
+            'ORGSYN_DESCRIPTOR_PATH': os.path.join(workdir, 'descriptors.npz'),
+            'ORGSYN_COMPOUND_FILES': ''
+        })
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-scale', str(scale),
+             '--samples', str(samples), '--seed', str(seed)],
+            env=env, stdout=subprocess.PIPE, check=True)
+        return json.loads(completed.stdout)
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmarks(scales, samples, seed):
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'commit': _git_commit(),
+            'samples': samples,
+            'seed': seed
+        },
+        'results': []
+    }
+    for scale in scales:
+        start = time.perf_counter()
+        outcome = _run_scale_subprocess(scale, samples, seed)
+        report['meta']['rdkit'] = outcome['rdkit']
+        for case, stats in outcome['cases'].items():
+            report['results'].append(dict(scale=scale, case=case, **stats))
+            print(f"{scale:>7} {case:<42} p50 {stats['p50_ms']:10.3f} ms  p95 {stats['p95_ms']:10.3f} ms"
+                  f"  ({stats['ops']} ops)", file=sys.stderr)
+        print(f"{scale:>7} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return report
+
+def compare(current, baseline, threshold=0.25, min_delta_ms=0.05):
+    """Regressions as (scale, case, baseline p50, current p50) where current is slower than allowed"""
+    previous = {(r['scale'], r['case']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['scale'], result['case']))
+        if before is None:
+            continue
+        old, new = before['p50_ms'], result['p50_ms']
+        if new - old > min_delta_ms and new > old * (1 + threshold):
+            regressions.append((result['scale'], result['case'], old, new))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the organic synthesis hot paths")
+    parser.add_argument('-o', '--output', help="write results JSON here")
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated data set sizes (default: %(default)s)")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help="calls per case")
+    parser.add_argument('--seed', type=int, default=0, help="seed for synthetic data and inputs")
+    parser.add_argument('--baseline', help="results JSON to compare against")
+    parser.add_argument('--compare', help="compare this results JSON instead of running")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative p50 slowdown")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="ignore slowdowns smaller than this")
+    parser.add_argument('--run-scale', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_scale is not None:
+        json.dump(run_scale(args.run_scale, args.samples, args.seed), sys.stdout)
+        return 0
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare needs --baseline")
+        with open(args.compare, encoding='utf-8') as handle:
+            report = json.load(handle)
+    else:
+        if not args.output:
+            parser.error("-o/--output is required when running benchmarks")
+        scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+        report = run_benchmarks(scales, args.samples, args.seed)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        for scale, case, old, new in regressions:
+            print(f"REGRESSION {scale:>7} {case:<42} p50 {old:.3f} -> {new:.3f} ms ({new / old - 1:+.0%})",
+                  file=sys.stderr)
+        print(f"{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
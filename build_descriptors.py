@@ -0,0 +1,68 @@
+"""Precompute molecular descriptors for the compound library into a columnar table.
+
+Usage:
+    python build_descriptors.py
+    python build_descriptors.py --workers 8
+    python build_descriptors.py --query "mol_wt=100:200,logp=:2"
+
+Computes the numeric properties (molecular weight, heavy atoms, rotatable
+bonds, H-bond donors/acceptors, LogP, TPSA) of every compound in
+data/compounds.json and ORGSYN_COMPOUND_FILES, from the molecule store when
+one is built, and saves them to ORGSYN_DESCRIPTOR_PATH (default
+.cache/descriptors.npz). The comprehensive app's Property Filter reads that
+file and never computes descriptors itself: rerun this script after the
+library changes, until then the filter asks for it.
+
+--query filters the saved table (inclusive low:high ranges, either side may be
+empty) and prints the matching compounds instead of rebuilding.
+"""
+import argparse
+import sys
+import time
+
+from orgsyn.descriptors import DESCRIPTOR_COLUMNS, DESCRIPTOR_PATH, DescriptorTable, build_descriptor_table
+
+def parse_ranges(query):
+    """{column: (low, high)} from "column=low:high,..." with optional bounds"""
+    ranges = {}
+    for part in query.split(','):
+        column, _, bounds = part.partition('=')
+        column = column.strip()
+        if column not in DESCRIPTOR_COLUMNS or ':' not in bounds:
+            raise ValueError(f"bad range {part!r}; expected column=low:high with column one of {', '.join(DESCRIPTOR_COLUMNS)}")
+        low, high = bounds.split(':', 1)
+        ranges[column] = (float(low) if low.strip() else None, float(high) if high.strip() else None)
+    return ranges
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the precomputed descriptor table")
+    parser.add_argument('-o', '--output', default=DESCRIPTOR_PATH, help=f"table file (default: {DESCRIPTOR_PATH})")
+    parser.add_argument('--workers', type=int, default=None, help="property worker processes (default: CPU count)")
+    parser.add_argument('--query', help="print compounds within these ranges, e.g. mol_wt=100:200,logp=:2")
+    parser.add_argument('--sort-by', choices=DESCRIPTOR_COLUMNS, help="order --query results by this column")
+    parser.add_argument('--limit', type=int, default=50, help="--query rows printed (default: 50)")
+    args = parser.parse_args(argv)
+
+    if args.query:
+        try:
+            ranges = parse_ranges(args.query)
+        except ValueError as exc:
+            parser.error(str(exc))
+        table = DescriptorTable.load(args.output)
+        start = time.perf_counter()
+        matches = table.filter(ranges)
+        rows = table.rows(matches, args.sort_by, limit=args.limit)
+        elapsed = time.perf_counter() - start
+        print('\t'.join(['name', 'smiles'] + DESCRIPTOR_COLUMNS))
+        for row in rows:
+            print('\t'.join(str(row[column]) for column in ['name', 'smiles'] + DESCRIPTOR_COLUMNS))
+        print(f"{len(matches)} of {len(table)} compound(s) match ({elapsed * 1000:.1f} ms)", file=sys.stderr)
+        return
+
+    start = time.perf_counter()
+    table = build_descriptor_table(path=args.output, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Stored descriptors for {len(table)} compound(s) in {args.output} in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
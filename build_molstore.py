@@ -0,0 +1,41 @@
+"""Build the memory-mapped molecule store the app and indexes load molecules from.
+
+Usage:
+    python build_molstore.py
+    python build_molstore.py --workers 8
+    ORGSYN_COMPOUND_FILES=library.smi python build_molstore.py
+    python build_molstore.py --input vendor.smi -o vendor.bin
+
+Parses every compound of data/compounds.json and ORGSYN_COMPOUND_FILES once,
+deduplicates them by InChIKey and writes canonical SMILES, InChIKeys and
+binary RDKit molecules to ORGSYN_MOLSTORE_PATH (default .cache/molecules.bin).
+Processes started afterwards map that file instead of re-parsing SMILES; a
+store built from other data files or another RDKit version is ignored until
+it is rebuilt. --input files build a standalone store for MoleculeStore.
+"""
+import argparse
+import sys
+import time
+
+from orgsyn.molstore import MOLSTORE_PATH, build_molecule_store, read_compound_file
+
+def _file_records(paths):
+    for path in paths:
+        yield from read_compound_file(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the binary molecule store")
+    parser.add_argument('-o', '--output', default=MOLSTORE_PATH, help=f"store file (default: {MOLSTORE_PATH})")
+    parser.add_argument('--input', nargs='+', help="build from these .smi/.csv/.json files instead of the library")
+    parser.add_argument('--workers', type=int, default=None, help="parsing worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    records = _file_records(args.input) if args.input else None
+    stats = build_molecule_store(records, args.output, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Stored {stats['written']} molecule(s) from {stats['read']} record(s) in {args.output} "
+          f"({stats['duplicates']} duplicate(s), {stats['invalid']} invalid) in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
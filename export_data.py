@@ -0,0 +1,73 @@
+"""Export reactions, compounds or pathway solutions to CSV, Parquet or SDF.
+
+Usage:
+    python export_data.py reactions -o reactions.parquet
+    python export_data.py reactions -o hofmann.csv --query hofmann --search-by Chemist
+    python export_data.py reactions -o radical.csv --facet century=1800 --facet mechanism=radical
+    python export_data.py compounds -o compounds.sdf --query acid --workers 8
+    python export_data.py pathways -o pathways.csv
+    python export_data.py pathways -o solution.sdf --problem "Benzene on nitration gives Compound A" --reactions nitration,reduction
+
+The format comes from the output extension unless --format is given.
+Reactions and compounds are read from the SQLite store (data/*.json plus
+anything imported with import_store.py); pathways are every pathway in
+data/reaction_pathways.json, or the pathways solving --problem. Reactions can
+be narrowed by facet (century, chemist, mechanism, reaction_type): values of
+one facet are alternatives, different facets must all match. Compound and
+pathway rows carry computed molecular properties. Rows are written in
+chunks, so memory stays flat however many records are exported. Parquet
+needs the optional pyarrow package.
+"""
+import argparse
+import sys
+import time
+
+from orgsyn.export import EXPORT_FORMATS, export_compounds, export_pathways, export_reactions, format_for_path
+from orgsyn.facets import FACETS
+from orgsyn.search import SEARCH_BY_FIELDS
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export reactions, compounds or pathways")
+    parser.add_argument('kind', choices=['reactions', 'compounds', 'pathways'])
+    parser.add_argument('-o', '--output', required=True, help="output file (.csv, .parquet or .sdf)")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help="output format (default: from the extension)")
+    parser.add_argument('--query', help="only reactions/compounds matching this search")
+    parser.add_argument('--search-by', choices=list(SEARCH_BY_FIELDS), default="All Fields",
+                        help="reaction fields the query searches")
+    parser.add_argument('--facet', action='append', default=[], metavar='FACET=VALUE',
+                        help=f"only reactions with this facet value ({', '.join(FACETS)}); repeatable")
+    parser.add_argument('--problem', help="export the pathways solving this problem text")
+    parser.add_argument('--reactions', help="comma-separated reaction types for --problem (default: detected)")
+    parser.add_argument('--no-properties', action='store_true', help="skip computed molecular properties")
+    parser.add_argument('--workers', type=int, default=None, help="property worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or format_for_path(args.output)
+    if fmt not in EXPORT_FORMATS:
+        parser.error(f"cannot tell the format of {args.output!r}; use --format")
+
+    facets = {}
+    for facet_filter in args.facet:
+        facet, _, value = facet_filter.partition('=')
+        if facet not in FACETS or not value:
+            parser.error(f"bad --facet {facet_filter!r}; expected FACET=VALUE with FACET one of {', '.join(FACETS)}")
+        facets.setdefault(facet, []).append(value)
+
+    start = time.perf_counter()
+    if args.kind == 'reactions':
+        written = export_reactions(args.output, fmt, args.query, SEARCH_BY_FIELDS[args.search_by], facets)
+    elif args.kind == 'compounds':
+        written = export_compounds(args.output, fmt, args.query, not args.no_properties, args.workers)
+    else:
+        pathways = None
+        if args.problem:
+            from orgsyn.parsing import parse_problem
+            from orgsyn.solver import solve_chemistry_problem
+            reactions = [r.strip() for r in args.reactions.split(',') if r.strip()] if args.reactions else None
+            pathways = solve_chemistry_problem(args.problem, reactions or parse_problem(args.problem)[1])
+        written = export_pathways(args.output, fmt, pathways, not args.no_properties)
+    elapsed = time.perf_counter() - start
+    print(f"Exported {written} {args.kind} row(s) to {args.output} in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Bulk-load external reaction and compound collections into the SQLite store.
+
+Usage:
+    python import_store.py reactions uspto.rsmi --source uspto
+    python import_store.py compounds library.smi --source vendor
+    python import_store.py delete --source uspto
+
+Reaction files are reaction SMILES (one per line, optionally followed by a
+name), CSV (a reaction_smiles column and/or name, reactants, products,
+chemist, year, description, mechanism), JSONL with the same fields, or a
+named_reactions.json-style file. Compound files are .smi, .csv or
+compounds.json-style, as for ORGSYN_COMPOUND_FILES.
+
+Files are streamed and committed every --batch-size records, so memory stays
+flat however large the input is. The store lives at ORGSYN_STORE_PATH
+(default .cache/orgsyn.sqlite3); the bundled data/*.json files are synced
+into it automatically under the "builtin" source.
+"""
+import argparse
+import os
+import sys
+import time
+
+from orgsyn.store import BUILTIN_SOURCE, IMPORT_BATCH_SIZE, get_reaction_store, read_reaction_file
+
+def _compound_records(paths):
+    # read_compound_file lives with the molecule store, which loads numpy
+    from orgsyn.molstore import read_compound_file
+    for path in paths:
+        for name, smiles in read_compound_file(path):
+            yield {'name': name, 'smiles': smiles}
+
+def _reaction_records(paths):
+    for path in paths:
+        yield from read_reaction_file(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import reactions or compounds into the SQLite store")
+    parser.add_argument('kind', choices=['reactions', 'compounds', 'delete'])
+    parser.add_argument('files', nargs='*', help="input files")
+    parser.add_argument('--source', help="source name recorded with each row (default: first file name)")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="records per commit")
+    parser.add_argument('--replace', action='store_true', help="delete existing rows from this source first")
+    args = parser.parse_args(argv)
+
+    source = args.source or (os.path.basename(args.files[0]) if args.files else None)
+    if not source:
+        parser.error("--source is required")
+    if source == BUILTIN_SOURCE:
+        parser.error(f"'{BUILTIN_SOURCE}' is reserved for the bundled data files")
+    if args.kind != 'delete' and not args.files:
+        parser.error("no input files")
+
+    store = get_reaction_store()
+    if args.kind == 'delete' or args.replace:
+        store.delete_source(source)
+    if args.kind == 'delete':
+        print(f"Deleted source {source!r}", file=sys.stderr)
+        return
+
+    start = time.perf_counter()
+    if args.kind == 'reactions':
+        imported = store.import_reactions(_reaction_records(args.files), source, args.batch_size)
+    else:
+        imported = store.import_compounds(_compound_records(args.files), source, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Imported {imported} {args.kind} from {len(args.files)} file(s) in {elapsed:.1f}s "
+          f"({imported / elapsed if elapsed else 0:.0f}/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
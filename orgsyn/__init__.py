@@ -0,0 +1,62 @@
+"""Core logic behind the organic synthesis apps, importable without Streamlit.
+
+Submodules:
+    data         versioned JSON data files (compounds, pathways, named reactions)
+    cache        process-wide molecule and image caches
+    chemistry    RDKit helpers: validation, naming, properties, drawing
+    molstore     memory-mapped binary store of pre-parsed library molecules
+    fingerprints substructure and similarity search
+    descriptors  precomputed descriptor columns with range filtering
+    parsing      compound and reaction detection in problem text
+    fuzzy        typo-tolerant name lookup (trigram index, bounded edit distance)
+    solver       reaction route graph and problem solving
+    prediction   template-based forward product prediction
+    metrics      opt-in per-stage timing and Prometheus export
+    search       reaction search fields, weights and text normalization
+    store        SQLite/FTS5 store for bulk-imported reactions and compounds
+    facets       century/chemist/mechanism/reaction-type facet bitmaps for the store
+    api          asyncio HTTP/JSON server with micro-batched RDKit work
+    workers      fork-safe process pools and chunked batch scheduling
+
+RDKit and pandas are imported on first use, so importing this package (or
+the parsing, search and data modules) stays cheap for CLI tools and workers.
+Names below are re-exported lazily: ``from orgsyn import parse_problem``
+only loads the submodule that defines it.
+"""
+import importlib
+
+_EXPORTS = {
+    'get_compound_database': 'data',
+    'get_reaction_pathways': 'data',
+    'get_named_reactions': 'data',
+    'get_common_names': 'data',
+    'get_molecule_cache': 'cache',
+    'get_image_cache': 'cache',
+    'validate_smiles': 'chemistry',
+    'get_compound_name': 'chemistry',
+    'draw_molecule': 'chemistry',
+    'calculate_molecular_properties': 'chemistry',
+    'calculate_properties_batch': 'chemistry',
+    'create_reaction_flow_diagram': 'chemistry',
+    'get_molecule_store': 'molstore',
+    'get_substructure_index': 'fingerprints',
+    'get_similarity_index': 'fingerprints',
+    'get_descriptor_table': 'descriptors',
+    'parse_problem': 'parsing',
+    'find_compound_mentions': 'parsing',
+    'get_name_index': 'parsing',
+    'solve_chemistry_problem': 'solver',
+    'find_problem_routes': 'solver',
+    'analyze_problem': 'solver',
+    'predict_products': 'prediction',
+    'get_reaction_store': 'store',
+    'get_metrics': 'metrics',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module}", __name__), name)
@@ -0,0 +1,482 @@
+"""Asyncio HTTP/JSON API over search, parsing, solving, properties and drawing.
+
+One event loop serves every connection (HTTP/1.1 with keep-alive). Reaction
+search and problem parsing run on a small thread pool; RDKit work (solving,
+properties, structure images) runs on the long-lived process pool. Requests
+for the same key (canonical SMILES, problem, query) that arrive while one is still
+being computed share that computation, and concurrent RDKit requests are
+collected for up to ORGSYN_API_BATCH_WINDOW seconds into one pool task per
+batch, so a burst of calls costs a few round trips to the workers instead
+of one each.
+
+Endpoints (GET with query parameters or POST with a JSON object):
+    /search      query, search_by, facets, limit, offset
+    /parse       problem
+    /solve       problem, reactions
+    /properties  smiles (one or a list)
+    /draw        smiles, size (300 or 300x200), format (svg, png, webp)
+    /health      batching and deduplication counters
+    /metrics     stage timings in the Prometheus text format
+"""
+import asyncio
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import get_molecule_cache
+from .chemistry import (_check_image_format, _discard_render_pool, calculate_numeric_properties,
+                        draw_molecule, format_molecular_properties, get_render_pool, start_render_pool)
+from .facets import FACETS
+from .metrics import get_metrics, is_enabled
+from .parsing import parse_problem
+from .search import SEARCH_BY_FIELDS
+from .solver import analyze_problem
+from .store import get_reaction_store
+
+API_HOST = os.environ.get('ORGSYN_API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('ORGSYN_API_PORT', '8000'))
+API_WORKERS = int(os.environ.get('ORGSYN_API_WORKERS') or os.cpu_count() or 1)
+API_THREADS = int(os.environ.get('ORGSYN_API_THREADS', '4'))
+BATCH_SIZE = int(os.environ.get('ORGSYN_API_BATCH_SIZE', '64'))
+BATCH_WINDOW = float(os.environ.get('ORGSYN_API_BATCH_WINDOW', '0.002'))
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+KEEPALIVE_TIMEOUT = 30
+MAX_SEARCH_LIMIT = 1000
+MAX_IMAGE_SIZE = 2000
+IMAGE_CONTENT_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png', 'webp': 'image/webp'}
+
+class ApiError(Exception):
+    """Request failure reported to the client with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# Pool tasks
+def _properties_batch(smiles_list):
+    """Numeric properties (or None) for each SMILES; runs inside pool workers"""
+    results = []
+    for smiles in smiles_list:
+        try:
+            properties = calculate_numeric_properties(smiles)
+        except Exception:
+            properties = None
+        results.append(dict(properties) if properties else None)
+    return results
+
+def _draw_batch(requests):
+    """Image data (or None) for each (smiles, size, fmt); runs inside pool workers"""
+    return [draw_molecule(smiles, size, fmt=fmt) for smiles, size, fmt in requests]
+
+def _solve_batch(problems):
+    """analyze_problem summary, or the error, for each (problem, reactions); runs inside pool workers"""
+    results = []
+    for problem, reactions in problems:
+        try:
+            results.append(analyze_problem(problem, list(reactions) if reactions is not None else None))
+        except Exception as exc:
+            # Exceptions from arbitrary code may not pickle; ship a plain one back
+            results.append(RuntimeError(f"{type(exc).__name__}: {exc}"))
+    return results
+
+class MicroBatcher:
+    """Coalesce concurrent calls into batches run on an executor, one computation per distinct key"""
+
+    def __init__(self, function, executor, max_batch=BATCH_SIZE, window=BATCH_WINDOW, max_running=2, on_broken=None):
+        self.function = function        # list of items -> list of results (or exceptions), in order
+        self.executor = executor        # () -> executor, so a broken pool can be replaced
+        self.max_batch = max_batch
+        self.window = window
+        self.max_running = max_running
+        self.on_broken = on_broken
+        self._in_flight = {}            # key -> future, from the first request until its batch finishes
+        self._pending = []              # (key, item) not yet handed to the executor
+        self._timer = None
+        self._running = 0
+        self.stats = {'requests': 0, 'deduplicated': 0, 'batches': 0, 'items': 0}
+
+    async def submit(self, key, item):
+        self.stats['requests'] += 1
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._in_flight[key] = loop.create_future()
+            self._pending.append((key, item))
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        else:
+            self.stats['deduplicated'] += 1
+        # A client hanging up must not cancel a computation other requests share
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        # At most max_running batches in the pool; the rest waits and grows into bigger batches
+        while self._pending and self._running < self.max_running:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._running += 1
+            self.stats['batches'] += 1
+            self.stats['items'] += len(batch)
+            try:
+                task = loop.run_in_executor(self.executor(), self.function, [item for _, item in batch])
+            except (BrokenProcessPool, RuntimeError) as exc:
+                task = loop.create_future()
+                task.set_exception(exc)
+            task.add_done_callback(functools.partial(self._finish, batch))
+
+    def _finish(self, batch, task):
+        self._running -= 1
+        error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+        if isinstance(error, BrokenProcessPool) and self.on_broken is not None:
+            self.on_broken()
+        results = task.result() if error is None else None
+        for position, (key, _) in enumerate(batch):
+            future = self._in_flight.pop(key)
+            if future.done():
+                continue
+            result = error if error is not None else results[position]
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+                # Nobody may be waiting any more (every caller hung up); mark it retrieved
+                future.exception()
+            else:
+                future.set_result(result)
+        if self._pending:
+            self._flush()
+
+    def __len__(self):
+        return len(self._in_flight)
+
+# Request parameters
+def _smiles_key(smiles):
+    """Batch dedup key for a SMILES: its canonical form, so 'OCC' and 'CCO' share one computation"""
+    return get_molecule_cache().canonical(smiles) or smiles
+
+def _param(params, name, default=None, required=False):
+    value = params.get(name, default)
+    if required and (value is None or value == ''):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"missing parameter: {name}")
+    if value is not None and not isinstance(value, str):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be a string")
+    return value
+
+def _int_param(params, name, default, low, high):
+    value = params.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be between {low} and {high}")
+    return value
+
+def _list_param(params, name):
+    """A list given as a JSON array, repeated query parameters or a comma-separated string"""
+    value = params.get(name)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be a list of strings")
+    return [part.strip() for item in value for part in item.split(',') if part.strip()]
+
+def _image_size(params):
+    size = params.get('size', 300)
+    if isinstance(size, list) and len(size) == 2:
+        width, height = size
+    elif isinstance(size, str) and 'x' in size:
+        width, height = size.split('x', 1)
+    else:
+        width = height = size
+    try:
+        width, height = int(width), int(height)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "size must be N, WxH or [W, H]")
+    if not (0 < width <= MAX_IMAGE_SIZE and 0 < height <= MAX_IMAGE_SIZE):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"image sides must be between 1 and {MAX_IMAGE_SIZE}")
+    return width, height
+
+def _facet_filters(params):
+    facets = params.get('facets') or {}
+    if isinstance(facets, (str, list)):
+        # Query strings carry facets as facets=century:1800,mechanism:radical, possibly repeated
+        pairs = [part.partition(':') for part in _list_param(params, 'facets')]
+        if not all(separator and facet.strip() and value.strip() for facet, separator, value in pairs):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "facets must be given as name:value")
+        facets = {}
+        for facet, _, value in pairs:
+            facets.setdefault(facet.strip(), []).append(value.strip())
+    if not isinstance(facets, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "facets must map facet names to values")
+    filters = {}
+    for facet, values in facets.items():
+        if facet not in FACETS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"unknown facet {facet!r} (expected one of {', '.join(FACETS)})")
+        # A single value may be given bare, e.g. {"century": 1800}
+        values = list(values) if isinstance(values, (list, tuple)) else [values]
+        if not all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"facet {facet!r} must be a value or a list of values")
+        filters[facet] = [str(value) for value in values]
+    return filters
+
+class ApiServer:
+    """HTTP/JSON front end; start() binds the socket, serve_forever() runs it"""
+
+    def __init__(self, workers=API_WORKERS, threads=API_THREADS, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW):
+        self.workers = workers
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='orgsyn-api')
+        self._shared = {}       # key -> future of thread-pool work in flight
+        self.stats = {'requests': 0, 'errors': 0, 'deduplicated': 0}
+        batcher = functools.partial(MicroBatcher, executor=self._executor, max_batch=batch_size, window=batch_window,
+                                    max_running=max(1, workers) * 2, on_broken=self._reset_pool)
+        self.batchers = {
+            'properties': batcher(_properties_batch),
+            'draw': batcher(_draw_batch),
+            'solve': batcher(_solve_batch)
+        }
+        self.routes = {
+            '/search': self.search,
+            '/parse': self.parse,
+            '/solve': self.solve,
+            '/properties': self.properties,
+            '/draw': self.draw,
+            '/health': self.health,
+            '/metrics': self.metrics
+        }
+        self.server = None
+
+    # Executors
+    def _executor(self):
+        # With one worker, RDKit calls share the thread pool instead of a process pool
+        return get_render_pool(self.workers) if self.workers > 1 else self._threads
+
+    def _reset_pool(self):
+        _discard_render_pool(self.workers)
+
+    async def _in_thread(self, key, function, *args):
+        """Run function on the thread pool; identical concurrent calls share one run"""
+        future = self._shared.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self._threads, function, *args)
+            self._shared[key] = future
+            future.add_done_callback(lambda _: self._shared.pop(key, None))
+        else:
+            self.stats['deduplicated'] += 1
+        return await asyncio.shield(future)
+
+    async def _batched(self, kind, key, item):
+        try:
+            return await self.batchers[kind].submit(key, item)
+        except BrokenProcessPool:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "worker pool restarted; retry the request")
+
+    # Endpoints
+    async def search(self, params):
+        query = _param(params, 'query', '')
+        search_by = _param(params, 'search_by', 'All Fields')
+        if search_by not in SEARCH_BY_FIELDS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"search_by must be one of {', '.join(SEARCH_BY_FIELDS)}")
+        facets = _facet_filters(params)
+        limit = _int_param(params, 'limit', 100, 1, MAX_SEARCH_LIMIT)
+        offset = _int_param(params, 'offset', 0, 0, sys.maxsize)
+        key = ('search', query, search_by, json.dumps(facets, sort_keys=True), limit, offset)
+        total, reactions, counts = await self._in_thread(key, self._search, query, SEARCH_BY_FIELDS[search_by],
+                                                         facets, limit, offset)
+        return {'total': total, 'reactions': reactions, 'facets': counts}
+
+    @staticmethod
+    def _search(query, fields, facets, limit, offset):
+        return get_reaction_store().filter_reactions(query or None, fields, facets, limit, offset)
+
+    async def parse(self, params):
+        problem = _param(params, 'problem', required=True)
+        compounds, reactions = await self._in_thread(('parse', problem), parse_problem, problem)
+        return {'compounds': compounds, 'reactions': reactions}
+
+    async def solve(self, params):
+        problem = _param(params, 'problem', required=True)
+        reactions = _list_param(params, 'reactions')
+        reactions = tuple(reactions) if reactions is not None else None
+        return await self._batched('solve', (problem, reactions), (problem, reactions))
+
+    async def properties(self, params):
+        smiles = params.get('smiles')
+        single = isinstance(smiles, str)
+        smiles_list = [smiles] if single else smiles
+        if not smiles_list or not all(isinstance(item, str) and item for item in smiles_list):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "smiles must be a SMILES string or a list of them")
+        results = await asyncio.gather(*(self._batched('properties', _smiles_key(item), item) for item in smiles_list))
+        rows = [{'smiles': item, 'properties': properties,
+                 'display': format_molecular_properties(properties) if properties else None}
+                for item, properties in zip(smiles_list, results)]
+        if single:
+            if rows[0]['properties'] is None:
+                raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, f"invalid SMILES: {smiles}")
+            return rows[0]
+        return {'results': rows}
+
+    async def draw(self, params):
+        smiles = _param(params, 'smiles', required=True)
+        size = _image_size(params)
+        try:
+            fmt = _check_image_format(_param(params, 'format'))
+        except ValueError as exc:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(exc))
+        data = await self._batched('draw', (_smiles_key(smiles), size, fmt), (smiles, size, fmt))
+        if data is None:
+            raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, f"invalid SMILES: {smiles}")
+        return IMAGE_CONTENT_TYPES[fmt], data.encode('utf-8') if isinstance(data, str) else data
+
+    async def health(self, params):
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'requests': self.stats,
+            'batches': {kind: dict(batcher.stats, in_flight=len(batcher)) for kind, batcher in self.batchers.items()}
+        }
+
+    async def metrics(self, params):
+        return 'text/plain; version=0.0.4', get_metrics().prometheus_text().encode('utf-8')
+
+    # HTTP
+    async def dispatch(self, method, target, body):
+        """(status, content type, body bytes) for one request"""
+        url = urlsplit(target)
+        handler = self.routes.get(url.path.rstrip('/') or '/')
+        if handler is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"no such endpoint: {url.path}")
+        if method not in ('GET', 'POST'):
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed; use GET or POST")
+        params = {name: values if len(values) > 1 else values[0]
+                  for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+            if not isinstance(payload, dict):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+            params.update(payload)
+
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await handler(params)
+            failed = False
+        finally:
+            if is_enabled():
+                get_metrics().observe(f"api{url.path.rstrip('/').replace('/', '_')}", time.perf_counter() - start, failed)
+        if isinstance(result, tuple):
+            content_type, data = result
+            return HTTPStatus.OK, content_type, data
+        return HTTPStatus.OK, 'application/json', json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+    async def _respond(self, method, target, body):
+        self.stats['requests'] += 1
+        try:
+            return await self.dispatch(method, target, body)
+        except ApiError as exc:
+            status, message = exc.status, str(exc)
+        except Exception as exc:
+            status, message = HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(exc).__name__}: {exc}"
+        self.stats['errors'] += 1
+        return status, 'application/json', json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+
+    async def _read_request(self, reader):
+        """(method, target, version, headers, body), or None when the client closed the connection"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise ApiError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "too many headers")
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise ApiError(HTTPStatus.LENGTH_REQUIRED, "chunked request bodies are not supported")
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "bad Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"request bodies are limited to {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length > 0 else b''
+        return method.upper(), target, version.upper(), headers, body
+
+    @staticmethod
+    def _write_response(writer, status, content_type, data, keep_alive):
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client or an error closes it"""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ApiError as exc:
+                    body = json.dumps({'error': str(exc)}).encode('utf-8')
+                    self._write_response(writer, exc.status, 'application/json', body, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                status, content_type, data = await self._respond(method, target, body)
+                self._write_response(writer, status, content_type, data, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutdown; the connection goes with it
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=API_HOST, port=API_PORT):
+        if self.workers > 1:
+            # Workers load RDKit while the first connections come in
+            start_render_pool(self.workers)
+        self.server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        return self.server
+
+    async def serve_forever(self, host=API_HOST, port=API_PORT):
+        server = self.server or await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self._threads.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,286 @@
+"""Process-wide caches: parsed molecules and encoded molecule images"""
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from . import metrics
+from ._lazy import lazy_import
+from .data import PROJECT_DIR
+
+Chem = lazy_import('rdkit.Chem')
+molstore = lazy_import('orgsyn.molstore')
+
+# Shared Molecule Cache
+class MoleculeCache:
+    """Bounded LRU cache of sanitized molecules and derived results, keyed by canonical SMILES"""
+
+    def __init__(self, max_entries=5000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # canonical SMILES -> {'mol', 'results', 'size'}
+        self._aliases = OrderedDict()   # input SMILES -> canonical SMILES (None if invalid)
+        self._lock = threading.RLock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _parse(self, smiles):
+        # Library compounds come pre-parsed from the molecule store when one is built
+        store = molstore.get_molecule_store()
+        row = store.find(smiles) if store is not None else None
+        if row is not None:
+            return store.smiles(row), store.mol(row)
+        try:
+            mol = Chem.MolFromSmiles(smiles)
+        except Exception:
+            mol = None
+        if mol is None:
+            return None, None
+        return Chem.MolToSmiles(mol), mol
+
+    def _remember_alias(self, smiles, canonical):
+        self._aliases[smiles] = canonical
+        self._aliases.move_to_end(smiles)
+        # Aliases are tiny; bound them by count alongside the entries
+        while len(self._aliases) > self.max_entries * 4:
+            self._aliases.popitem(last=False)
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self.bytes_used > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.bytes_used -= entry['size']
+
+    def _lookup(self, smiles):
+        """Return the cache entry for a SMILES string, parsing it on a miss"""
+        with self._lock:
+            if smiles in self._aliases:
+                canonical = self._aliases[smiles]
+                self._aliases.move_to_end(smiles)
+                if canonical is None:
+                    self.hits += 1
+                    metrics.cache_lookup('molecule', True)
+                    return None, None
+                entry = self._entries.get(canonical)
+                if entry is not None:
+                    self._entries.move_to_end(canonical)
+                    self.hits += 1
+                    metrics.cache_lookup('molecule', True)
+                    return canonical, entry
+            self.misses += 1
+        metrics.cache_lookup('molecule', False)
+
+        canonical, mol = self._parse(smiles)
+
+        with self._lock:
+            self._remember_alias(smiles, canonical)
+            if canonical is None:
+                return None, None
+            entry = self._entries.get(canonical)
+            if entry is None:
+                # Approximate footprint: the binary pickle plus per-object overhead
+                entry = {'mol': mol, 'results': {}, 'size': len(mol.ToBinary()) + 512}
+                self._entries[canonical] = entry
+                self.bytes_used += entry['size']
+                self._evict()
+            self._remember_alias(canonical, canonical)
+            return canonical, entry
+
+    def get_mol(self, smiles):
+        """Return the shared sanitized Mol for a SMILES string, or None if invalid"""
+        _, entry = self._lookup(smiles)
+        return entry['mol'] if entry else None
+
+    def canonical(self, smiles):
+        """Return the canonical SMILES, or None if the input does not parse"""
+        canonical, _ = self._lookup(smiles)
+        return canonical
+
+    def get_result(self, smiles, key, compute, size=256):
+        """Return compute(mol) for a SMILES string, memoized under key"""
+        canonical, entry = self._lookup(smiles)
+        if entry is None:
+            return None
+        with self._lock:
+            if key in entry['results']:
+                metrics.cache_lookup('result', True)
+                return entry['results'][key]
+        metrics.cache_lookup('result', False)
+        result = compute(entry['mol'])
+        with self._lock:
+            if key not in entry['results'] and self._entries.get(canonical) is entry:
+                entry['results'][key] = result
+                entry['size'] += size
+                self.bytes_used += size
+                self._evict()
+        return result
+
+    def has_result(self, smiles, key):
+        """True if a result for key is already memoized for this molecule (not counted as a lookup)"""
+        with self._lock:
+            canonical = self._aliases.get(smiles)
+            entry = self._entries.get(canonical) if canonical is not None else None
+            return entry is not None and key in entry['results']
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes_used,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self.bytes_used = 0
+            self.hits = 0
+            self.misses = 0
+
+@functools.lru_cache(maxsize=None)
+def get_molecule_cache():
+    """One molecule cache per process, shared by every helper and session"""
+    return MoleculeCache()
+
+# Molecule Image Cache
+IMAGE_CACHE_DIR = os.environ.get(
+    'ORGSYN_IMAGE_CACHE_DIR',
+    os.path.join(PROJECT_DIR, '.cache', 'images')
+)
+
+class ImageCache:
+    """Two-tier (memory + disk) LRU cache of encoded molecule images"""
+
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()   # digest -> encoded image bytes
+        self._memory_bytes = 0
+        self._disk_bytes = None        # measured lazily on first write
+        self._lock = threading.RLock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts):
+        """Digest of the canonical SMILES, size and drawing options of one image"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + '.img')
+
+    def _remember(self, digest, data):
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        self._memory[digest] = data
+        self._memory_bytes += len(data)
+        while self._memory and self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_disk_bytes * 0.9
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= stat.st_size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def _write_disk(self, digest, data):
+        path = self._path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(stat.st_size for _, stat in self._disk_entries())
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def get(self, digest):
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                self.memory_hits += 1
+                metrics.cache_lookup('image', True)
+                return data
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+            os.utime(path)   # keep disk eviction least-recently-used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            metrics.cache_lookup('image', False)
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(digest, data)
+        metrics.cache_lookup('image', True)
+        return data
+
+    def put(self, digest, data):
+        with self._lock:
+            self._remember(digest, data)
+        self._write_disk(digest, data)
+
+    def get_or_render(self, digest, render):
+        """Return cached bytes for digest, calling render() to produce them on a miss"""
+        data = self.get(digest)
+        if data is None:
+            data = render()
+            if data:
+                self.put(digest, data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses
+            }
+
+@functools.lru_cache(maxsize=None)
+def get_image_cache():
+    """One image cache per process, shared by every session"""
+    return ImageCache()
@@ -0,0 +1,378 @@
+"""RDKit helpers: validation, naming, properties and molecule drawing"""
+import functools
+import io
+import os
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+
+from ._lazy import lazy_import
+from .cache import ImageCache, get_image_cache, get_molecule_cache
+from .data import get_compound_database, get_reaction_pathways, rebuild_on_change
+from .metrics import timed
+from .workers import map_chunks, process_pool
+
+Chem = lazy_import('rdkit.Chem')
+rdMolDraw2D = lazy_import('rdkit.Chem.Draw.rdMolDraw2D')
+Descriptors = lazy_import('rdkit.Chem.Descriptors')
+pd = lazy_import('pandas')
+Image = lazy_import('PIL.Image')
+molstore = lazy_import('orgsyn.molstore')
+
+# Advanced Functions
+def validate_smiles(smiles):
+    try:
+        return get_molecule_cache().get_mol(smiles) is not None
+    except:
+        return False
+
+def _compute_inchikey(mol):
+    try:
+        return Chem.MolToInchiKey(mol) or None
+    except:
+        return None
+
+def build_compound_index(database):
+    """Build canonical SMILES and InChIKey reverse indexes for a name -> SMILES dict"""
+    by_smiles = {}
+    by_inchikey = {}
+    cache = get_molecule_cache()
+    store = molstore.get_molecule_store()
+    for name, smiles in database.items():
+        canonical = cache.canonical(smiles)
+        if canonical is None:
+            by_smiles.setdefault(smiles, name)
+            continue
+        by_smiles.setdefault(canonical, name)
+        # The molecule store already holds the (slow to compute) InChIKey
+        row = store.find(smiles) if store is not None else None
+        inchikey = store.inchikey(row) if row is not None else _compute_inchikey(cache.get_mol(smiles))
+        if inchikey:
+            by_inchikey.setdefault(inchikey, name)
+    return {'smiles': by_smiles, 'inchikey': by_inchikey}
+
+@rebuild_on_change('compounds')
+def get_compound_index():
+    """Reverse index over the compound database, rebuilt only when the data file changes"""
+    return build_compound_index(get_compound_database())
+
+def get_compound_name(smiles):
+    index = get_compound_index()
+    if smiles in index['smiles']:
+        return index['smiles'][smiles].title()
+    cache = get_molecule_cache()
+    canonical = cache.canonical(smiles)
+    if canonical is None:
+        return "Unknown compound"
+    name = index['smiles'].get(canonical)
+    if name is None:
+        # Different tautomer/charge spellings still share an InChIKey
+        inchikey = cache.get_result(smiles, 'inchikey', _compute_inchikey, size=64)
+        name = index['inchikey'].get(inchikey)
+    return name.title() if name else "Unknown compound"
+
+IMAGE_FORMATS = ('svg', 'png', 'webp')
+DEFAULT_IMAGE_FORMAT = os.environ.get('ORGSYN_IMAGE_FORMAT', 'svg').lower()
+
+def _check_image_format(fmt):
+    fmt = (fmt or DEFAULT_IMAGE_FORMAT).lower()
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {fmt} (expected one of {', '.join(IMAGE_FORMATS)})")
+    return fmt
+
+def _new_drawer(fmt, width, height, panel_width=-1, panel_height=-1, options=None):
+    """MolDraw2D canvas for the format; options are drawOptions() attributes"""
+    if fmt == 'svg':
+        drawer = rdMolDraw2D.MolDraw2DSVG(width, height, panel_width, panel_height)
+    else:
+        drawer = rdMolDraw2D.MolDraw2DCairo(width, height, panel_width, panel_height)
+    draw_options = drawer.drawOptions()
+    for name, value in (options or {}).items():
+        setattr(draw_options, name, value)
+    return drawer
+
+def _finish_drawing(drawer, fmt):
+    """Encoded bytes of a finished canvas"""
+    drawer.FinishDrawing()
+    data = drawer.GetDrawingText()
+    if fmt == 'svg':
+        # Drop the XML declaration: it names a Latin-1 encoding the text is not stored in
+        return data[data.index('<svg'):].encode('utf-8')
+    if fmt == 'webp':
+        # Flat-colour line drawings compress best losslessly
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(data)).save(buffer, format='WEBP', lossless=True, method=6)
+        return buffer.getvalue()
+    return data
+
+def _for_display(data, fmt):
+    # st.image takes SVG as markup text, raster formats as bytes
+    if data and fmt == 'svg':
+        return data.decode('utf-8')
+    return data
+
+def _molecule_digest(canonical, size, options, fmt):
+    return ImageCache.make_key('molecule', canonical, list(size), options or {}, fmt)
+
+def _render_molecule(mol, size, options, fmt):
+    drawer = _new_drawer(fmt, size[0], size[1], options=options)
+    # Draw a copy so 2D coordinates are never written onto the shared Mol
+    rdMolDraw2D.PrepareAndDrawMolecule(drawer, Chem.Mol(mol))
+    return _finish_drawing(drawer, fmt)
+
+@timed('draw')
+def draw_molecule(smiles, size=(300, 300), options=None, fmt=None):
+    """Render a molecule as SVG text or PNG/WebP bytes, served from the image cache when possible"""
+    fmt = _check_image_format(fmt)
+    try:
+        cache = get_molecule_cache()
+        canonical = cache.canonical(smiles)
+        if canonical is None:
+            return None
+        digest = _molecule_digest(canonical, size, options, fmt)
+        render = lambda: _render_molecule(cache.get_mol(canonical), size, options, fmt)
+        return _for_display(get_image_cache().get_or_render(digest, render), fmt)
+    except:
+        return None
+
+PROPERTY_COLUMNS = [
+    'mol_wt', 'formula', 'heavy_atoms', 'rotatable_bonds',
+    'h_bond_donors', 'h_bond_acceptors', 'logp', 'tpsa'
+]
+INTEGER_PROPERTY_COLUMNS = ['heavy_atoms', 'rotatable_bonds', 'h_bond_donors', 'h_bond_acceptors']
+PROPERTY_CHUNK_SIZE = 1000
+
+def _compute_numeric_properties(mol):
+    return {
+        'mol_wt': Descriptors.MolWt(mol),
+        'formula': Chem.rdMolDescriptors.CalcMolFormula(mol),
+        'heavy_atoms': mol.GetNumHeavyAtoms(),
+        'rotatable_bonds': Descriptors.NumRotatableBonds(mol),
+        'h_bond_donors': Descriptors.NumHDonors(mol),
+        'h_bond_acceptors': Descriptors.NumHAcceptors(mol),
+        'logp': Descriptors.MolLogP(mol),
+        'tpsa': Descriptors.TPSA(mol)
+    }
+
+def format_molecular_properties(properties):
+    """Turn numeric properties into the display strings used by the UI"""
+    return {
+        'Molecular Weight': f"{properties['mol_wt']:.2f} g/mol",
+        'Formula': properties['formula'],
+        'Heavy Atoms': properties['heavy_atoms'],
+        'Rotatable Bonds': properties['rotatable_bonds'],
+        'H-Bond Donors': properties['h_bond_donors'],
+        'H-Bond Acceptors': properties['h_bond_acceptors'],
+        'LogP': f"{properties['logp']:.2f}",
+        'TPSA': f"{properties['tpsa']:.2f} Å²"
+    }
+
+def calculate_numeric_properties(smiles):
+    """Numeric molecular properties for one SMILES, or None if it does not parse"""
+    return get_molecule_cache().get_result(smiles, 'numeric_properties', _compute_numeric_properties)
+
+@timed('properties')
+def calculate_molecular_properties(smiles):
+    """Calculate molecular properties using RDKit"""
+    try:
+        properties = calculate_numeric_properties(smiles)
+        return format_molecular_properties(properties) if properties else {}
+    except:
+        return {}
+
+def _property_rows(smiles_chunk):
+    """Numeric property rows for one chunk of SMILES; runs inside pool workers"""
+    rows = []
+    for smiles in smiles_chunk:
+        row = {'smiles': smiles, 'error': None}
+        try:
+            mol = molstore.load_mol(smiles)
+            if mol is None:
+                row['error'] = 'Invalid SMILES'
+            else:
+                row.update(_compute_numeric_properties(mol))
+        except Exception as exc:
+            row['error'] = f"{type(exc).__name__}: {exc}"
+        rows.append(row)
+    return rows
+
+def iter_molecular_properties(smiles_iter, workers=None, chunk_size=PROPERTY_CHUNK_SIZE):
+    """Yield one numeric property row per input SMILES, in input order.
+
+    Input is consumed in chunks; anything larger than a single chunk is spread
+    over a process pool with a bounded number of chunks in flight. Rows for
+    SMILES that fail to parse carry the reason in 'error'.
+    """
+    for rows in map_chunks(_property_rows, smiles_iter, chunk_size, workers):
+        yield from rows
+
+def calculate_properties_batch(smiles_iter, workers=None, chunk_size=PROPERTY_CHUNK_SIZE):
+    """Numeric molecular properties for many SMILES as a DataFrame (one row per input)"""
+    df = pd.DataFrame(
+        iter_molecular_properties(smiles_iter, workers, chunk_size),
+        columns=['smiles'] + PROPERTY_COLUMNS + ['error']
+    )
+    for column in INTEGER_PROPERTY_COLUMNS:
+        df[column] = df[column].astype('Int64')
+    return df
+
+def _flow_diagram_parts(pathway):
+    """SMILES and panel legends of a pathway's compounds, in A, B, C order"""
+    compounds = []
+    labels = []
+    for comp in ['A', 'B', 'C']:
+        if comp in pathway:
+            compounds.append(pathway[comp])
+            labels.append(f"Compound {comp}\n{get_compound_name(pathway[comp])}")
+    return compounds, labels
+
+def _grid_digest(canonicals, labels, sub_img_size, fmt):
+    return ImageCache.make_key('grid', canonicals, labels, list(sub_img_size), fmt)
+
+def _render_grid(mols, labels, sub_img_size, fmt):
+    # One row of panels on a single canvas
+    mols = [Chem.Mol(mol) for mol in mols]
+    width, height = sub_img_size
+    drawer = _new_drawer(fmt, width * len(mols), height, width, height)
+    drawer.DrawMolecules(mols, legends=labels)
+    return _finish_drawing(drawer, fmt)
+
+@timed('grid')
+def create_reaction_flow_diagram(pathway, sub_img_size=(300, 300), fmt=None):
+    """Create a visual reaction flow diagram as one SVG document or PNG/WebP image"""
+    fmt = _check_image_format(fmt)
+    compounds, labels = _flow_diagram_parts(pathway)
+    
+    if len(compounds) >= 2:
+        try:
+            cache = get_molecule_cache()
+            canonicals = [cache.canonical(smiles) for smiles in compounds]
+            digest = _grid_digest(canonicals, labels, sub_img_size, fmt)
+            render = lambda: _render_grid([cache.get_mol(smiles) for smiles in compounds], labels, sub_img_size, fmt)
+            return _for_display(get_image_cache().get_or_render(digest, render), fmt)
+        except:
+            return None
+    return None
+
+# Concurrent Rendering
+RENDER_WORKERS = int(os.environ.get('ORGSYN_RENDER_WORKERS') or min(4, os.cpu_count() or 1))
+RENDER_TIMEOUT = float(os.environ.get('ORGSYN_RENDER_TIMEOUT', '10'))
+
+def _render_molecule_task(canonical, size, fmt):
+    return _render_molecule(molstore.load_mol(canonical), size, None, fmt)
+
+def _render_grid_task(canonicals, labels, sub_img_size, fmt):
+    return _render_grid([molstore.load_mol(smiles) for smiles in canonicals], labels, sub_img_size, fmt)
+
+def _properties_task(canonical):
+    return _compute_numeric_properties(molstore.load_mol(canonical))
+
+def _store_properties(canonical, properties):
+    get_molecule_cache().get_result(canonical, 'numeric_properties', lambda mol: properties)
+
+@functools.lru_cache(maxsize=None)
+def get_render_pool(workers):
+    """Long-lived process pool for prefetch_pathways, so workers load RDKit once"""
+    return process_pool(workers)
+
+def _load_rdkit():
+    Chem.MolFromSmiles('C')
+
+@functools.lru_cache(maxsize=None)
+def start_render_pool(workers=None):
+    """Start the render pool's workers in the background (once) so the first prefetch does not wait on them"""
+    workers = RENDER_WORKERS if workers is None else workers
+    if workers > 1:
+        pool = get_render_pool(workers)
+        for _ in range(workers):
+            pool.submit(_load_rdkit)
+
+def _discard_render_pool(workers):
+    get_render_pool(workers).shutdown(wait=False, cancel_futures=True)
+    get_render_pool.cache_clear()
+
+@timed('prefetch')
+def prefetch_pathways(pathways, fmt=None, size=(200, 200), sub_img_size=(300, 300), with_properties=True,
+                      with_flow=True, workers=None, timeout=None):
+    """Render structures and flow diagrams and compute properties for many pathways at once.
+
+    Whatever is not cached yet is submitted to a process pool and the results
+    are collected in order into the image and molecule caches, which
+    draw_molecule, create_reaction_flow_diagram and calculate_molecular_properties
+    then hit. A page of pathways so takes about as long as its slowest item.
+    Work still running after timeout seconds, and everything when workers <= 1
+    or the pool breaks, is left to those calls to do serially. Returns the
+    number of results computed in the pool.
+    """
+    fmt = _check_image_format(fmt)
+    workers = RENDER_WORKERS if workers is None else workers
+    timeout = RENDER_TIMEOUT if timeout is None else timeout
+    if workers <= 1:
+        return 0
+
+    cache = get_molecule_cache()
+    images = get_image_cache()
+    tasks = []   # (store the result, task function, task arguments)
+    seen = set()
+    for pathway in pathways:
+        compounds, labels = _flow_diagram_parts(pathway)
+        canonicals = [cache.canonical(smiles) for smiles in compounds]
+        for canonical in canonicals:
+            if canonical is None or canonical in seen:
+                continue
+            seen.add(canonical)
+            digest = _molecule_digest(canonical, size, None, fmt)
+            if images.get(digest) is None:
+                tasks.append((functools.partial(images.put, digest), _render_molecule_task, (canonical, size, fmt)))
+            if with_properties and not cache.has_result(canonical, 'numeric_properties'):
+                tasks.append((functools.partial(_store_properties, canonical), _properties_task, (canonical,)))
+        if with_flow and len(compounds) >= 2 and None not in canonicals:
+            digest = _grid_digest(canonicals, labels, sub_img_size, fmt)
+            if digest not in seen and images.get(digest) is None:
+                seen.add(digest)
+                tasks.append((functools.partial(images.put, digest), _render_grid_task,
+                              (canonicals, labels, sub_img_size, fmt)))
+    if len(tasks) < 2:
+        # Nothing to overlap; the render calls do it inline
+        return 0
+
+    try:
+        pool = get_render_pool(workers)
+        futures = [pool.submit(function, *args) for _, function, args in tasks]
+    except (BrokenProcessPool, OSError, RuntimeError):
+        _discard_render_pool(workers)
+        return 0
+    done, _ = wait(futures, timeout)
+    completed = 0
+    broken = False
+    for (store, _, _), future in zip(tasks, futures):
+        if future not in done:
+            future.cancel()
+            continue
+        exc = future.exception()
+        if exc is not None:
+            broken = broken or isinstance(exc, BrokenProcessPool)
+            continue
+        if future.result():
+            store(future.result())
+            completed += 1
+    if broken:
+        _discard_render_pool(workers)
+    return completed
+
+def warm_image_cache(sizes=((150, 150), (200, 200)), fmt=None):
+    """Pre-render every database compound and every pathway grid into the image cache"""
+    rendered = 0
+    for smiles in get_compound_database().values():
+        for size in sizes:
+            if draw_molecule(smiles, size, fmt=fmt):
+                rendered += 1
+    for pathways in get_reaction_pathways().values():
+        for pathway in pathways:
+            for comp in ['A', 'B', 'C']:
+                if comp in pathway:
+                    for size in sizes:
+                        if draw_molecule(pathway[comp], size, fmt=fmt):
+                            rendered += 1
+            if create_reaction_flow_diagram(pathway, fmt=fmt):
+                rendered += 1
+    return rendered
@@ -0,0 +1,155 @@
+"""Versioned JSON data files: compounds, common names, pathways, named reactions and templates"""
+import functools
+import json
+import os
+import threading
+from types import MappingProxyType
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('ORGSYN_DATA_DIR', os.path.join(PROJECT_DIR, 'data'))
+COMPOUNDS_FILE = os.path.join(DATA_DIR, 'compounds.json')
+PATHWAYS_FILE = os.path.join(DATA_DIR, 'reaction_pathways.json')
+COMMON_NAMES_FILE = os.path.join(DATA_DIR, 'common_names.json')
+NAMED_REACTIONS_FILE = os.path.join(DATA_DIR, 'named_reactions.json')
+TEMPLATES_FILE = os.path.join(DATA_DIR, 'reaction_templates.json')
+SUPPORTED_DATA_VERSIONS = (1,)
+
+def _freeze(value):
+    """Recursively convert parsed JSON into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _load_compounds(payload):
+    smiles = {}
+    synonyms = {}
+    classes = {}
+    for record in payload['compounds']:
+        smiles[record['name']] = record['smiles']
+        if record.get('class'):
+            classes[record['name']] = record['class']
+        for synonym in record.get('synonyms', []):
+            synonyms.setdefault(synonym, record['name'])
+    return MappingProxyType({
+        'smiles': MappingProxyType(smiles),
+        'synonyms': MappingProxyType(synonyms),
+        'classes': MappingProxyType(classes)
+    })
+
+def _load_pathways(payload):
+    return _freeze(payload['pathways'])
+
+def _load_common_names(payload):
+    return MappingProxyType(dict(payload['common_names']))
+
+def _load_named_reactions(payload):
+    return _freeze(payload['reactions'])
+
+def _load_templates(payload):
+    return _freeze(payload['templates'])
+
+class DataFile:
+    """A versioned JSON data file, loaded lazily and reloaded only when it changes on disk"""
+
+    def __init__(self, path, loader):
+        self.path = path
+        self.loader = loader
+        self.stamp = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _current_stamp(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self):
+        stamp = self._current_stamp()
+        if stamp != self.stamp:
+            with self._lock:
+                if stamp != self.stamp:
+                    with open(self.path, encoding='utf-8') as handle:
+                        payload = json.load(handle)
+                    if payload.get('version') not in SUPPORTED_DATA_VERSIONS:
+                        raise ValueError(f"Unsupported data file version in {self.path}: {payload.get('version')}")
+                    self._data = self.loader(payload)
+                    self.stamp = stamp
+        return self._data
+
+@functools.lru_cache(maxsize=None)
+def get_data_files():
+    """Data file handles shared by every caller in the process"""
+    return {
+        'compounds': DataFile(COMPOUNDS_FILE, _load_compounds),
+        'pathways': DataFile(PATHWAYS_FILE, _load_pathways),
+        'common_names': DataFile(COMMON_NAMES_FILE, _load_common_names),
+        'named_reactions': DataFile(NAMED_REACTIONS_FILE, _load_named_reactions),
+        'templates': DataFile(TEMPLATES_FILE, _load_templates)
+    }
+
+def data_stamp(key):
+    """Current (mtime, size) stamp of a data file, loading it if needed"""
+    data_file = get_data_files()[key]
+    data_file.get()
+    return data_file.stamp
+
+def file_stamp(path):
+    """(mtime, size) of any file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def rebuild_on_change(*keys):
+    """Cache a zero-argument builder until any of its inputs change.
+
+    Each key names a data file, or is a zero-argument function returning the
+    current stamp of some other input (e.g. a file_stamp of a built cache).
+    """
+    def decorator(build):
+        lock = threading.Lock()
+        state = {'stamp': None, 'value': None}
+
+        @functools.wraps(build)
+        def wrapper():
+            stamp = tuple(key() if callable(key) else data_stamp(key) for key in keys)
+            if state['stamp'] != stamp:
+                with lock:
+                    if state['stamp'] != stamp:
+                        state['value'] = build()
+                        state['stamp'] = stamp
+            return state['value']
+
+        wrapper.cache_clear = lambda: state.update(stamp=None, value=None)
+        return wrapper
+    return decorator
+
+# Compound Database
+def get_compound_database():
+    """Read-only name -> SMILES mapping from data/compounds.json"""
+    return get_data_files()['compounds'].get()['smiles']
+
+def get_compound_synonyms():
+    """Read-only synonym -> compound name mapping from data/compounds.json"""
+    return get_data_files()['compounds'].get()['synonyms']
+
+def get_common_names():
+    """Read-only common name -> formula mapping from data/common_names.json"""
+    return get_data_files()['common_names'].get()
+
+# Enhanced Reaction Pathways
+def get_reaction_pathways():
+    """Read-only reaction type -> pathways mapping from data/reaction_pathways.json"""
+    return get_data_files()['pathways'].get()
+
+# Named Reactions
+def get_named_reactions():
+    """Read-only reaction name -> details mapping from data/named_reactions.json"""
+    return get_data_files()['named_reactions'].get()
+
+# Reaction Templates
+def get_reaction_templates():
+    """Read-only reaction type -> reaction SMARTS templates from data/reaction_templates.json"""
+    return get_data_files()['templates'].get()
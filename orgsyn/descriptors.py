@@ -0,0 +1,238 @@
+"""Precomputed descriptor table: one NumPy column per molecular property, filtered by value ranges.
+
+Descriptors for every library compound are computed once and saved as an
+uncompressed .npz (ORGSYN_DESCRIPTOR_PATH): the numeric property columns,
+each column's sort order, and names and SMILES as UTF-8 blobs with offsets.
+A range query binary-searches the most selective column's sorted values and
+masks only the surviving rows against the other ranges; broad queries mask
+whole columns instead.
+"""
+import json
+import os
+import tempfile
+from collections import deque
+
+from ._lazy import lazy_import
+from .chemistry import INTEGER_PROPERTY_COLUMNS, PROPERTY_COLUMNS, iter_molecular_properties
+from .data import PROJECT_DIR, file_stamp, rebuild_on_change
+from .molstore import get_molecule_store, library_records, library_sources
+
+np = lazy_import('numpy')
+
+DESCRIPTOR_PATH = os.environ.get('ORGSYN_DESCRIPTOR_PATH', os.path.join(PROJECT_DIR, '.cache', 'descriptors.npz'))
+# Every numeric property; the formula is text and stays with calculate_numeric_properties
+DESCRIPTOR_COLUMNS = [column for column in PROPERTY_COLUMNS if column != 'formula']
+DESCRIPTOR_LABELS = {
+    'mol_wt': 'Molecular Weight', 'heavy_atoms': 'Heavy Atoms', 'rotatable_bonds': 'Rotatable Bonds',
+    'h_bond_donors': 'H-Bond Donors', 'h_bond_acceptors': 'H-Bond Acceptors', 'logp': 'LogP', 'tpsa': 'TPSA'
+}
+# Above this fraction of rows, masking whole columns beats gathering the candidates of a sorted range
+_FULL_SCAN_FRACTION = 0.25
+ROW_CHUNK_SIZE = 1000
+
+def _library_records():
+    # The molecule store holds the deduplicated library; fall back to the raw records without one
+    store = get_molecule_store()
+    if store is None:
+        return library_records()
+    return ((store.name(row), store.smiles(row)) for row in range(len(store)))
+
+def _descriptor_rows(records, workers):
+    """(name, property row) for every record that parses, computed over the property pool"""
+    names = deque()
+    def smiles_stream():
+        for name, smiles in records:
+            names.append(name)
+            yield smiles
+    for row in iter_molecular_properties(smiles_stream(), workers):
+        name = names.popleft()
+        if row['error'] is None:
+            yield name, row
+
+def _blob(strings):
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype='u1'), offsets
+
+class DescriptorTable:
+    """Columnar descriptors for a compound library with vectorized range queries"""
+
+    def __init__(self, names, smiles, columns, orders=None, sources=None):
+        """names/smiles are (UTF-8 blob, offsets) pairs; columns maps each descriptor to its array"""
+        self._names = names
+        self._smiles = smiles
+        self._values = columns
+        self._orders = orders or {column: np.argsort(values, kind='stable').astype('<u4')
+                                  for column, values in columns.items()}
+        self._sorted = {}
+        self.sources = sources
+        self._count = len(names[1]) - 1
+
+    @classmethod
+    def build(cls, records=None, workers=None):
+        """Compute descriptors for (name, SMILES) records (default: the compound library)"""
+        sources = library_sources() if records is None else None
+        names, smiles = [], []
+        values = {column: [] for column in DESCRIPTOR_COLUMNS}
+        for name, row in _descriptor_rows(_library_records() if records is None else records, workers):
+            names.append(str(name))
+            smiles.append(row['smiles'])
+            for column in DESCRIPTOR_COLUMNS:
+                values[column].append(row[column])
+        columns = {column: np.array(values[column], dtype='<i4' if column in INTEGER_PROPERTY_COLUMNS else '<f8')
+                   for column in DESCRIPTOR_COLUMNS}
+        return cls(_blob(names), _blob(smiles), columns, sources=sources)
+
+    @classmethod
+    def load(cls, path=DESCRIPTOR_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes())
+            if meta.get('version') != 1 or meta.get('columns') != DESCRIPTOR_COLUMNS:
+                raise ValueError(f"Unsupported descriptor table in {path}")
+            return cls((data['names'], data['name_offsets']), (data['smiles'], data['smiles_offsets']),
+                       {column: data[f'values_{column}'] for column in DESCRIPTOR_COLUMNS},
+                       {column: data[f'order_{column}'] for column in DESCRIPTOR_COLUMNS},
+                       meta['sources'])
+
+    def save(self, path=DESCRIPTOR_PATH):
+        """Write the table to path atomically"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        meta = json.dumps({'version': 1, 'columns': DESCRIPTOR_COLUMNS, 'sources': self.sources}).encode('utf-8')
+        arrays = {
+            'meta': np.frombuffer(meta, dtype='u1'),
+            'names': self._names[0], 'name_offsets': self._names[1],
+            'smiles': self._smiles[0], 'smiles_offsets': self._smiles[1]
+        }
+        for column in DESCRIPTOR_COLUMNS:
+            arrays[f'values_{column}'] = self._values[column]
+            arrays[f'order_{column}'] = self._orders[column]
+        handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as out:
+                np.savez(out, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def __len__(self):
+        return self._count
+
+    def column(self, column):
+        """All values of one descriptor, in row order"""
+        return self._values[column]
+
+    def bounds(self, column):
+        """(min, max) of a descriptor, or (None, None) for an empty table"""
+        if not self._count:
+            return None, None
+        order = self._orders[column]
+        values = self._values[column]
+        return values[order[0]].item(), values[order[-1]].item()
+
+    def name(self, row):
+        blob, offsets = self._names
+        return blob[offsets[row]:offsets[row + 1]].tobytes().decode('utf-8')
+
+    def smiles(self, row):
+        blob, offsets = self._smiles
+        return blob[offsets[row]:offsets[row + 1]].tobytes().decode('utf-8')
+
+    def _sorted_values(self, column):
+        values = self._sorted.get(column)
+        if values is None:
+            values = self._sorted[column] = self._values[column][self._orders[column]]
+        return values
+
+    def _span(self, column, low, high):
+        values = self._sorted_values(column)
+        start = np.searchsorted(values, low, 'left') if low is not None else 0
+        stop = np.searchsorted(values, high, 'right') if high is not None else len(values)
+        return int(start), int(max(start, stop))
+
+    def filter(self, ranges):
+        """Ascending row indices whose descriptors lie within every {column: (low, high)} range.
+
+        Bounds are inclusive; None leaves that side open.
+        """
+        ranges = {column: bounds for column, bounds in ranges.items() if bounds[0] is not None or bounds[1] is not None}
+        if not ranges:
+            return np.arange(self._count)
+        spans = {column: self._span(column, low, high) for column, (low, high) in ranges.items()}
+        narrowest = min(spans, key=lambda column: spans[column][1] - spans[column][0])
+        start, stop = spans[narrowest]
+        if stop - start > self._count * _FULL_SCAN_FRACTION:
+            mask = np.ones(self._count, dtype=bool)
+            for column, (low, high) in ranges.items():
+                values = self._values[column]
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+            return np.flatnonzero(mask)
+        rows = np.sort(self._orders[narrowest][start:stop])
+        for column, (low, high) in ranges.items():
+            if column == narrowest or not len(rows):
+                continue
+            values = self._values[column][rows]
+            mask = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            rows = rows[mask]
+        return rows
+
+    def _ordered(self, indices, sort_by, descending, limit):
+        indices = np.asarray(indices)
+        if sort_by is not None:
+            values = self._values[sort_by][indices]
+            keys = -values if descending else values
+            if limit is not None and limit < len(indices):
+                # Partial sort: only the rows that are kept get ordered
+                top = np.argpartition(keys, limit - 1)[:limit]
+                return indices[top[np.argsort(keys[top], kind='stable')]]
+            return indices[np.argsort(keys, kind='stable')]
+        return indices[:limit] if limit is not None else indices
+
+    def _row_dicts(self, indices):
+        columns = {column: self._values[column][indices].tolist() for column in DESCRIPTOR_COLUMNS}
+        return [dict({'name': self.name(row), 'smiles': self.smiles(row)},
+                     **{column: columns[column][position] for column in DESCRIPTOR_COLUMNS})
+                for position, row in enumerate(indices.tolist())]
+
+    def rows(self, indices, sort_by=None, descending=False, limit=None):
+        """Row dicts (name, smiles and descriptors) for indices, optionally sorted and truncated"""
+        return self._row_dicts(self._ordered(indices, sort_by, descending, limit))
+
+    def iter_rows(self, indices, sort_by=None, descending=False, chunk_size=ROW_CHUNK_SIZE):
+        """Like rows(), but materialized one chunk at a time, for exports of large matches"""
+        indices = self._ordered(indices, sort_by, descending, None)
+        for start in range(0, len(indices), chunk_size):
+            yield from self._row_dicts(indices[start:start + chunk_size])
+
+def build_descriptor_table(records=None, path=DESCRIPTOR_PATH, workers=None):
+    """Compute and save the descriptor table; returns it"""
+    table = DescriptorTable.build(records, workers)
+    table.save(path)
+    return table
+
+def descriptor_table_stamp():
+    """(mtime, size) of the saved table, so a run of build_descriptors.py is picked up"""
+    return file_stamp(DESCRIPTOR_PATH)
+
+@rebuild_on_change(library_sources, descriptor_table_stamp)
+def get_descriptor_table():
+    """Saved descriptor table if it was built from the current library, else None.
+
+    Never builds: computing a whole library's descriptors is build_descriptors.py's job,
+    not something to do inside an app request.
+    """
+    try:
+        table = DescriptorTable.load(DESCRIPTOR_PATH)
+    except (OSError, ValueError, KeyError):
+        return None
+    return table if table.sources == library_sources() else None
@@ -0,0 +1,206 @@
+"""Streaming export of reactions, compounds and pathways to CSV, Parquet and SDF"""
+import csv
+import itertools
+import os
+import tempfile
+from collections import deque
+
+from ._lazy import lazy_import
+from .chemistry import (
+    PROPERTY_COLUMNS, calculate_numeric_properties, get_compound_name, iter_molecular_properties
+)
+from .data import get_reaction_pathways
+from .store import REACTION_COLUMNS, get_reaction_store, split_reaction_smiles
+from .workers import chunked
+
+Chem = lazy_import('rdkit.Chem')
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+
+EXPORT_FORMATS = ('csv', 'parquet', 'sdf')
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_MIME_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet', 'sdf': 'chemical/x-mdl-sdfile'}
+
+REACTION_EXPORT_COLUMNS = ['id'] + REACTION_COLUMNS + ['source']
+COMPOUND_EXPORT_COLUMNS = ['name', 'smiles', 'canonical_smiles', 'class', 'source'] + PROPERTY_COLUMNS
+PATHWAY_EXPORT_COLUMNS = [
+    'pathway_index', 'pathway', 'reaction_type', 'role', 'smiles', 'compound', 'reagents', 'description', 'mechanism'
+] + PROPERTY_COLUMNS
+# Parquet column types; every other column is a string
+_INTEGER_COLUMNS = {'id', 'year', 'pathway_index', 'heavy_atoms', 'rotatable_bonds', 'h_bond_donors', 'h_bond_acceptors'}
+_FLOAT_COLUMNS = {'mol_wt', 'logp', 'tpsa'}
+
+def parquet_available():
+    try:
+        pa.__version__
+    except ImportError:
+        return False
+    return True
+
+def available_formats():
+    """Export formats usable here; Parquet needs the optional pyarrow package"""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or parquet_available()]
+
+def format_for_path(path):
+    """Export format implied by a file extension, or None"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return {'pq': 'parquet', 'sd': 'sdf', 'mol': 'sdf'}.get(extension, extension) if extension else None
+
+# Row Sources
+def iter_reaction_rows(query=None, fields=None, facets=None):
+    """Stored reactions (all, or the matches of a search query and/or facet filters)"""
+    return get_reaction_store().iter_reactions(query, fields, facets=facets)
+
+def reaction_structure(row):
+    """SDF structure of a reaction row: the product side of its reaction SMILES"""
+    _, products = split_reaction_smiles(row.get('reaction_smiles'))
+    return '.'.join(products) or None
+
+def iter_compound_rows(query=None, with_properties=True, workers=None):
+    """Stored compounds (all, or those matching a name query), with computed properties.
+
+    Properties come from iter_molecular_properties, so large tables are spread
+    over a process pool; only the rows whose properties are in flight are held.
+    """
+    compounds = get_reaction_store().iter_compounds(query)
+    if not with_properties:
+        yield from compounds
+        return
+    pending = deque()
+    def smiles_stream():
+        for row in compounds:
+            pending.append(row)
+            yield row['smiles']
+    for properties in iter_molecular_properties(smiles_stream(), workers):
+        row = pending.popleft()
+        row.update((column, properties.get(column)) for column in PROPERTY_COLUMNS)
+        yield row
+
+def iter_pathway_rows(pathways=None, with_properties=True):
+    """One row per compound of each pathway (default: every pathway in the data file)"""
+    reaction_pathways = get_reaction_pathways()
+    reaction_types = {id(pathway): reaction_type
+                      for reaction_type, group in reaction_pathways.items() for pathway in group}
+    if pathways is None:
+        pathways = [pathway for group in reaction_pathways.values() for pathway in group]
+    for index, pathway in enumerate(pathways, 1):
+        for role in ['A', 'B', 'C']:
+            if role not in pathway:
+                continue
+            smiles = pathway[role]
+            row = {
+                'pathway_index': index,
+                'pathway': pathway.get('name'),
+                'reaction_type': pathway.get('reaction_type') or reaction_types.get(id(pathway)),
+                'role': role,
+                'smiles': smiles,
+                'compound': get_compound_name(smiles),
+                'reagents': '; '.join(pathway.get('reagents', [])),
+                'description': pathway.get('description'),
+                'mechanism': pathway.get('mechanism')
+            }
+            if with_properties:
+                properties = calculate_numeric_properties(smiles) or {}
+                row.update((column, properties.get(column)) for column in PROPERTY_COLUMNS)
+            yield row
+
+# Writers
+def _write_csv(chunks, path, columns):
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.DictWriter(handle, columns, extrasaction='ignore')
+        writer.writeheader()
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+def _parquet_schema(columns):
+    def column_type(column):
+        if column in _INTEGER_COLUMNS:
+            return pa.int64()
+        if column in _FLOAT_COLUMNS:
+            return pa.float64()
+        return pa.string()
+    return pa.schema([(column, column_type(column)) for column in columns])
+
+def _write_parquet(chunks, path, columns):
+    if not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = _parquet_schema(columns)
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        # One row group per chunk
+        for chunk in chunks:
+            table = pa.Table.from_pylist(
+                [{column: row.get(column) for column in columns} for row in chunk], schema=schema)
+            writer.write_table(table)
+
+def _write_sdf(chunks, path, columns, structure):
+    with open(path, 'w', encoding='utf-8') as handle:
+        writer = Chem.SDWriter(handle)
+        try:
+            for chunk in chunks:
+                for row in chunk:
+                    smiles = structure(row)
+                    mol = Chem.MolFromSmiles(smiles) if smiles else None
+                    # Records without a usable structure keep their data on an empty molecule
+                    mol = mol if mol is not None else Chem.Mol()
+                    mol.SetProp('_Name', str(row.get('name') or row.get('pathway') or ''))
+                    for column in columns:
+                        value = row.get(column)
+                        if value is not None and value != '':
+                            mol.SetProp(column, str(value))
+                    writer.write(mol)
+                writer.flush()
+        finally:
+            writer.close()
+
+def export_rows(rows, path, fmt=None, columns=None, structure=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write row dicts to path as CSV, Parquet or SDF, one chunk at a time; returns the row count.
+
+    columns defaults to the keys of the first row. For SDF, structure(row)
+    gives the SMILES to draw from (default: the row's 'smiles').
+    """
+    fmt = (fmt or format_for_path(path) or '').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt or path} (expected one of {', '.join(EXPORT_FORMATS)})")
+    count = 0
+    chunks = chunked(rows, chunk_size)
+    first = next(chunks, [])
+    columns = list(columns or (first[0].keys() if first else []))
+    def counted():
+        nonlocal count
+        for chunk in itertools.chain([first], chunks):
+            count += len(chunk)
+            yield chunk
+
+    if fmt == 'csv':
+        _write_csv(counted(), path, columns)
+    elif fmt == 'parquet':
+        _write_parquet(counted(), path, columns)
+    else:
+        _write_sdf(counted(), path, columns, structure or (lambda row: row.get('smiles')))
+    return count
+
+def export_reactions(path, fmt=None, query=None, fields=None, facets=None):
+    """Stored reactions (or a search's matches) to a file; SDF structures are the products"""
+    return export_rows(iter_reaction_rows(query, fields, facets), path, fmt, REACTION_EXPORT_COLUMNS,
+                       reaction_structure)
+
+def export_compounds(path, fmt=None, query=None, with_properties=True, workers=None):
+    """Stored compounds (or a name filter's matches) with their properties to a file"""
+    columns = COMPOUND_EXPORT_COLUMNS if with_properties else COMPOUND_EXPORT_COLUMNS[:-len(PROPERTY_COLUMNS)]
+    return export_rows(iter_compound_rows(query, with_properties, workers), path, fmt, columns)
+
+def export_pathways(path, fmt=None, pathways=None, with_properties=True):
+    """Pathway compounds (solved pathways, or every pathway) with their properties to a file"""
+    columns = PATHWAY_EXPORT_COLUMNS if with_properties else PATHWAY_EXPORT_COLUMNS[:-len(PROPERTY_COLUMNS)]
+    return export_rows(iter_pathway_rows(pathways, with_properties), path, fmt, columns)
+
+def export_bytes(export, fmt):
+    """Run export(path, fmt) into a temporary file and return its contents, for download buttons"""
+    handle, path = tempfile.mkstemp(suffix=f'.{fmt}')
+    os.close(handle)
+    try:
+        export(path, fmt)
+        with open(path, 'rb') as exported:
+            return exported.read()
+    finally:
+        os.remove(path)
@@ -0,0 +1,176 @@
+"""Facet index over named reactions: century, chemist, mechanism class and reaction type.
+
+Each facet value holds a bitmap (a Python int, bit i = reaction id i) of the
+reactions carrying it, plus a running count. Filters OR the bitmaps of the
+values chosen within a facet and AND across facets; drill-down counts are
+popcounts of each value's bitmap against the selection made on the other
+facets. New reactions are folded in batch by batch, so the index never has
+to be rebuilt while records are only being added.
+"""
+import re
+import threading
+from collections import defaultdict
+
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+FACETS = {
+    'century': 'Century',
+    'chemist': 'Chemist',
+    'mechanism': 'Mechanism Class',
+    'reaction_type': 'Reaction Type'
+}
+# Bumped whenever the classification below changes, so stores recompute their facet rows
+FACETS_VERSION = 1
+OTHER_VALUE = 'other'
+
+# Keyword stems matched against the lowercased mechanism (and, for reaction
+# types, the name and description); a reaction may fall into several classes
+MECHANISM_CLASSES = {
+    'radical': ['radical', 'single electron'],
+    'carbocation': ['carbocation', 'e1 ', 'ion pair'],
+    'electrophilic aromatic substitution': ['electrophilic aromatic', 'electrophilic substitution'],
+    'nucleophilic addition': ['cyanohydrin', 'iminium', 'nucleophilic addition', 'grignard'],
+    'hydride transfer': ['hydride'],
+    'rearrangement': ['rearrangement', 'migration', 'enolization'],
+    'elimination': ['elimination', 'decarboxylation', 'decomposition'],
+    'condensation': ['condensation', 'cyclization']
+}
+REACTION_TYPES = {
+    'oxidation': ['oxid'],
+    'reduction': ['reduc', 'hydride'],
+    'rearrangement': ['rearrang'],
+    'elimination': ['eliminat'],
+    'substitution': ['substitut', 'carboxylation', 'acylation', 'alkylation'],
+    'addition': ['addition', 'markovnikov'],
+    'condensation': ['condensation', 'cycliz', 'synthesis'],
+    'coupling': ['coupling'],
+    'degradation': ['degradation', 'decarboxyl', 'loss of one carbon', 'chain shortening'],
+    'homologation': ['homologation', 'chain extension', 'chain lengthening'],
+    'hydrolysis': ['hydrolys'],
+    'halogenation': ['halogen', 'bromin', 'chlorin', 'iodin']
+}
+_CHEMIST_SEPARATORS = re.compile(r',\s*(?:and\s+)?|\s+and\s+|\s*&\s*|;\s*')
+
+def split_chemists(chemist):
+    """Individual names from a chemist field such as "Hans Meerwein, Wolfgang Ponndorf, and Albert Verley" """
+    return [name.strip() for name in _CHEMIST_SEPARATORS.split(chemist or '') if name.strip()]
+
+def _classify(text, classes):
+    return [value for value, stems in classes.items() if any(stem in text for stem in stems)] or [OTHER_VALUE]
+
+def reaction_facet_values(record):
+    """(facet, value) pairs for a reaction dict; every reaction gets a mechanism class and reaction type"""
+    values = []
+    year = record.get('year')
+    if year:
+        values.append(('century', str(int(year) // 100 * 100)))
+    values.extend(('chemist', name) for name in dict.fromkeys(split_chemists(record.get('chemist'))))
+    mechanism = f" {(record.get('mechanism') or '').lower()} "
+    values.extend(('mechanism', value) for value in _classify(mechanism, MECHANISM_CLASSES))
+    text = ' '.join(record.get(field) or '' for field in ('name', 'description', 'mechanism')).lower()
+    values.extend(('reaction_type', value) for value in _classify(text, REACTION_TYPES))
+    return values
+
+# Bitmaps
+def bitmap_of(ids):
+    """Bitmap with the bits of the given non-negative ids set"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return 0
+    bits = np.zeros(int(ids.max()) + 1, dtype=bool)
+    bits[ids] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+def _bits(bitmap):
+    data = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(data, bitorder='little').view(bool)
+
+def ids_of(bitmap):
+    """Ascending ids set in a bitmap"""
+    return np.flatnonzero(_bits(bitmap))
+
+def contains(bitmap, ids):
+    """Boolean mask: which of the ids are set in the bitmap"""
+    ids = np.asarray(ids, dtype=np.int64)
+    bits = _bits(bitmap)
+    inside = ids < len(bits)
+    mask = np.zeros(len(ids), dtype=bool)
+    mask[inside] = bits[ids[inside]]
+    return mask
+
+class FacetIndex:
+    """Per-value reaction bitmaps and counts for every facet, extended incrementally"""
+
+    def __init__(self, generation=None):
+        self.generation = generation    # store generation this index reflects (see ReactionStore.facet_index)
+        self.max_id = 0
+        self.all = 0
+        self._bitmaps = {facet: {} for facet in FACETS}
+        self._counts = {facet: defaultdict(int) for facet in FACETS}
+        self._lock = threading.Lock()
+        self.name_order = None          # ids in name order, cached by the store until reactions are added
+
+    def add(self, reaction_ids, rows):
+        """Fold in new reactions: their ids and their (reaction id, facet, value) rows"""
+        grouped = defaultdict(list)
+        for reaction_id, facet, value in rows:
+            if facet in self._bitmaps:
+                grouped[facet, value].append(reaction_id)
+        added = bitmap_of(reaction_ids)
+        with self._lock:
+            self.all |= added
+            for (facet, value), ids in grouped.items():
+                bitmap = bitmap_of(ids)
+                previous = self._bitmaps[facet].get(value, 0)
+                self._bitmaps[facet][value] = previous | bitmap
+                self._counts[facet][value] += (bitmap & ~previous).bit_count()
+            if len(reaction_ids):
+                self.max_id = max(self.max_id, int(max(reaction_ids)))
+
+    def __len__(self):
+        return self.all.bit_count()
+
+    def select(self, filters, exclude=None):
+        """Bitmap of reactions matching any chosen value of every filtered facet (all reactions if none)"""
+        selection = self.all
+        for facet, values in (filters or {}).items():
+            if facet == exclude or not values:
+                continue
+            bitmaps = self._bitmaps[facet]
+            chosen = 0
+            for value in values:
+                chosen |= bitmaps.get(value, 0)
+            selection &= chosen
+        return selection
+
+    def counts(self, filters=None, within=None):
+        """{facet: {value: count}}, each facet counted under the filters on the other facets.
+
+        within narrows every count to a bitmap (e.g. the matches of a text
+        search); without filters or within, the running counts are returned.
+        """
+        result = {}
+        for facet in FACETS:
+            if within is None and not any(values for other, values in (filters or {}).items() if other != facet):
+                counts = dict(self._counts[facet])
+            else:
+                base = self.select(filters, exclude=facet)
+                if within is not None:
+                    base &= within
+                counts = {value: (bitmap & base).bit_count() for value, bitmap in self._bitmaps[facet].items()}
+            result[facet] = dict(sorted(counts.items(), key=_value_order(facet)))
+        return result
+
+def _value_order(facet):
+    if facet == 'century':
+        return lambda item: int(item[0])
+    # Most common first; the catch-all class goes last
+    return lambda item: (item[0] == OTHER_VALUE, -item[1], item[0])
+
+def facet_label(facet, value):
+    """Display text for a facet value"""
+    if facet == 'century':
+        return f"{value}s"
+    return value.title() if facet != 'chemist' else value
@@ -0,0 +1,202 @@
+"""Fingerprint indexes: SMARTS substructure search and Tanimoto nearest neighbours"""
+import threading
+from collections import OrderedDict
+
+from ._lazy import lazy_import
+from .cache import get_molecule_cache
+from .chemistry import get_compound_name
+from .data import rebuild_on_change
+from .molstore import get_molecule_store, library_records, library_sources, molecule_store_stamp
+
+Chem = lazy_import('rdkit.Chem')
+AllChem = lazy_import('rdkit.Chem.AllChem')
+DataStructs = lazy_import('rdkit.DataStructs')
+np = lazy_import('numpy')
+
+# Substructure Search
+SUBSTRUCTURE_FP_SIZE = 2048
+
+def _pack_fingerprint(fp):
+    """Pack an RDKit bit vector into uint64 words"""
+    bits = np.zeros((fp.GetNumBits(),), dtype=np.uint8)
+    DataStructs.ConvertToNumpyArray(fp, bits)
+    return np.packbits(bits).view(np.uint64)
+
+def _parse_records(records):
+    """(name, SMILES, Mol) for every record that parses"""
+    for name, smiles in records:
+        # Parse directly: a large library would only thrash the shared molecule cache
+        try:
+            mol = Chem.MolFromSmiles(smiles)
+        except Exception:
+            mol = None
+        if mol is not None:
+            yield name, smiles, mol
+
+def _store_records(store):
+    """(name, canonical SMILES, Mol) for every molecule in a molecule store, without parsing"""
+    for row in range(len(store)):
+        yield store.name(row), store.smiles(row), store.mol(row)
+
+class SubstructureIndex:
+    """Packed pattern-fingerprint matrix with a vectorized screen in front of HasSubstructMatch"""
+
+    def __init__(self, records=(), fp_size=SUBSTRUCTURE_FP_SIZE, store=None):
+        """Index (name, SMILES) records, or every molecule of a MoleculeStore when one is given"""
+        self.fp_size = fp_size
+        self.names = []
+        self.smiles = []
+        self._mols = []     # binary Mol pickles, only unpickled for screen survivors
+        self._store = store # ...or rows of the mapped store, which already holds them
+        rows = []
+        for name, smiles, mol in (_store_records(store) if store is not None else _parse_records(records)):
+            self.names.append(name)
+            self.smiles.append(smiles)
+            if store is None:
+                self._mols.append(mol.ToBinary())
+            rows.append(_pack_fingerprint(Chem.PatternFingerprint(mol, fpSize=fp_size)))
+        words = fp_size // 64
+        self.fingerprints = np.vstack(rows) if rows else np.zeros((0, words), dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.names)
+
+    def screen(self, query):
+        """Row indices whose fingerprint contains every bit of the query fingerprint"""
+        query_fp = _pack_fingerprint(Chem.PatternFingerprint(query, fpSize=self.fp_size))
+        mask = ((self.fingerprints & query_fp) == query_fp).all(axis=1)
+        return np.flatnonzero(mask)
+
+    def search(self, smarts, limit=None):
+        """Return [(name, SMILES)] of compounds containing the SMARTS pattern"""
+        query = Chem.MolFromSmarts(smarts)
+        if query is None:
+            raise ValueError(f"Invalid SMARTS: {smarts}")
+        query.UpdatePropertyCache(strict=False)
+        matches = []
+        for row in self.screen(query):
+            mol = self._store.mol(row) if self._store is not None else Chem.Mol(self._mols[row])
+            if mol.HasSubstructMatch(query):
+                matches.append((self.names[row], self.smiles[row]))
+                if limit is not None and len(matches) >= limit:
+                    break
+        return matches
+
+@rebuild_on_change(library_sources, molecule_store_stamp)
+def get_substructure_index():
+    """Substructure index over the compound database and ORGSYN_COMPOUND_FILES (molecule store if built)"""
+    store = get_molecule_store()
+    return SubstructureIndex(store=store) if store is not None else SubstructureIndex(library_records())
+
+# Similarity Search
+SIMILARITY_FP_SIZE = 1024
+SIMILARITY_RADIUS = 2
+SIMILARITY_BLOCK_ROWS = 8192
+CLOSEST_CACHE_SIZE = 128
+# SWAR masks as plain ints, so importing this module does not load NumPy
+_SWAR_MASKS = (0x5555555555555555, 0x3333333333333333, 0x0f0f0f0f0f0f0f0f, 0x00ff00ff00ff00ff)
+
+def _popcount_rows(words):
+    """Number of set bits in each row of a packed uint64 matrix"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+    # SWAR popcount: per-byte counts, summed across the row before the final fold
+    m1, m2, m4, m8 = (np.uint64(mask) for mask in _SWAR_MASKS)
+    s1, s2, s4, s8, s16, s32 = (np.uint64(shift) for shift in (1, 2, 4, 8, 16, 32))
+    counts = np.zeros(len(words), dtype=np.int32)
+    for start in range(0, words.shape[1], 31):   # byte sums stay <= 8 * 31
+        x = words[:, start:start + 31].copy()
+        x -= (x >> s1) & m1
+        x = (x & m2) + ((x >> s2) & m2)
+        x += x >> s4
+        x &= m4
+        y = x.sum(axis=1, dtype=np.uint64)
+        y = (y & m8) + ((y >> s8) & m8)
+        y += y >> s16
+        y += y >> s32
+        counts += (y & np.uint64(0xffff)).astype(np.int32)
+    return counts
+
+def _morgan_fingerprint(mol, fp_size=SIMILARITY_FP_SIZE):
+    return _pack_fingerprint(AllChem.GetMorganFingerprintAsBitVect(mol, SIMILARITY_RADIUS, nBits=fp_size))
+
+class SimilarityIndex:
+    """Packed Morgan fingerprints with vectorized Tanimoto top-k search"""
+
+    def __init__(self, records=(), fp_size=SIMILARITY_FP_SIZE, store=None):
+        """Index (name, SMILES) records, or every molecule of a MoleculeStore when one is given"""
+        self.fp_size = fp_size
+        self.names = []
+        self.smiles = []
+        rows = []
+        for name, smiles, mol in (_store_records(store) if store is not None else _parse_records(records)):
+            self.names.append(name)
+            self.smiles.append(smiles)
+            rows.append(_morgan_fingerprint(mol, fp_size))
+        words = fp_size // 64
+        self.fingerprints = np.vstack(rows) if rows else np.zeros((0, words), dtype=np.uint64)
+        self.bit_counts = _popcount_rows(self.fingerprints)
+        self._closest = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def scores(self, query_fp):
+        """Tanimoto similarity of a packed query fingerprint against every row"""
+        query_count = _popcount_rows(query_fp[np.newaxis, :])[0]
+        scores = np.empty(len(self.names), dtype=np.float32)
+        # Work in blocks so the AND temporary stays small for large libraries
+        for start in range(0, len(self.names), SIMILARITY_BLOCK_ROWS):
+            block = slice(start, start + SIMILARITY_BLOCK_ROWS)
+            common = _popcount_rows(self.fingerprints[block] & query_fp)
+            union = self.bit_counts[block] + query_count - common
+            scores[block] = np.divide(common, union, out=np.zeros(len(common), dtype=np.float32),
+                                      where=union > 0)
+        return scores
+
+    def nearest(self, smiles, k=5, threshold=0.0):
+        """Return up to k (name, SMILES, score) with Tanimoto >= threshold, best first"""
+        mol = get_molecule_cache().get_mol(smiles)
+        if mol is None or not self.names:
+            return []
+        scores = self.scores(_morgan_fingerprint(mol, self.fp_size))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.names[i], self.smiles[i], float(scores[i])) for i in top if scores[i] >= threshold]
+
+    def closest(self, smiles, threshold=0.3):
+        """(name, score) of the most similar indexed compound, or None below the threshold; memoized"""
+        key = (smiles, threshold)
+        with self._lock:
+            if key in self._closest:
+                self._closest.move_to_end(key)
+                return self._closest[key]
+        nearest = self.nearest(smiles, k=1, threshold=threshold)
+        result = (nearest[0][0], nearest[0][2]) if nearest else None
+        with self._lock:
+            self._closest[key] = result
+            if len(self._closest) > CLOSEST_CACHE_SIZE:
+                self._closest.popitem(last=False)
+        return result
+
+@rebuild_on_change(library_sources, molecule_store_stamp)
+def get_similarity_index():
+    """Similarity index over the compound database and ORGSYN_COMPOUND_FILES (molecule store if built)"""
+    store = get_molecule_store()
+    return SimilarityIndex(store=store) if store is not None else SimilarityIndex(library_records())
+
+def get_closest_compound(smiles, threshold=0.3):
+    """(name, score) of the most similar known compound, or None below the threshold"""
+    return get_similarity_index().closest(smiles, threshold)
+
+def describe_compound_name(smiles):
+    """Compound name, or the closest known compound and its similarity when unknown"""
+    name = get_compound_name(smiles)
+    if name != "Unknown compound":
+        return name
+    closest = get_closest_compound(smiles)
+    if closest:
+        return f"≈ {closest[0].title()} (Tanimoto {closest[1]:.2f})"
+    return name
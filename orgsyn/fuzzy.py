@@ -0,0 +1,135 @@
+"""Typo-tolerant name lookup: a trigram index with bounded edit-distance verification.
+
+Each name is indexed under its distinct (space-padded) trigrams. k edits
+remove at most 3k trigrams from either side, so a name within distance k
+of the query shares at least max(|T(query)|, |T(name)|) - 3k of them; only
+names passing that count and a length filter reach the Levenshtein check.
+Lookups therefore touch the posting lists of the query's trigrams, not the
+whole vocabulary.
+"""
+import functools
+from array import array
+from collections import OrderedDict, defaultdict
+
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+FUZZY_CACHE_SIZE = 4096
+
+def normalize_name(text):
+    return ' '.join(text.lower().split())
+
+def default_max_distance(length):
+    """Edit budget for a name of this length: exact below 4 characters, 1 edit below 8, else 2"""
+    if length < 4:
+        return 0
+    return 1 if length < 8 else 2
+
+def _trigrams(term):
+    padded = f'  {term}  '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def bounded_levenshtein(a, b, limit):
+    """Levenshtein distance of a and b, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, 1):
+        current = [i]
+        row_min = i
+        for j, char_a in enumerate(a, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            current.append(cost)
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+class FuzzyNameIndex:
+    """Trigram index over a name vocabulary, queried within an edit-distance budget"""
+
+    def __init__(self, terms):
+        # terms: surface form -> payload, as for MentionScanner; later spellings win
+        self.terms = []
+        self.payloads = []
+        positions = {}
+        postings = defaultdict(lambda: array('i'))
+        gram_counts = array('i')
+        lengths = array('i')
+        for term, payload in terms.items():
+            term = normalize_name(term)
+            if not term:
+                continue
+            if term in positions:
+                self.payloads[positions[term]] = payload
+                continue
+            index = positions[term] = len(self.terms)
+            self.terms.append(term)
+            self.payloads.append(payload)
+            grams = _trigrams(term)
+            for gram in grams:
+                postings[gram].append(index)
+            gram_counts.append(len(grams))
+            lengths.append(len(term))
+        self._positions = positions
+        self._postings = {gram: np.frombuffer(ids, dtype=np.intc) for gram, ids in postings.items()}
+        self._gram_counts = np.frombuffer(gram_counts, dtype=np.intc)
+        self._lengths = np.frombuffer(lengths, dtype=np.intc)
+        self.max_words = max((term.count(' ') + 1 for term in self.terms), default=0)
+        # Problem texts and search boxes repeat the same words; remember recent lookups
+        self.search = functools.lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._search)
+        # Callers' own per-phrase results (e.g. parsing's suffix-checked match), dropped with the index
+        self.resolved = OrderedDict()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _candidates(self, query, max_distance):
+        grams = _trigrams(query)
+        if len(grams) - 3 * max_distance <= 0:
+            # Too short for the trigram bound to prune anything: every name is a candidate
+            ids = np.arange(len(self.terms))
+        else:
+            lists = [self._postings[gram] for gram in grams if gram in self._postings]
+            if not lists:
+                return []
+            ids, shared = np.unique(np.concatenate(lists), return_counts=True)
+            ids = ids[shared >= np.maximum(self._gram_counts[ids], len(grams)) - 3 * max_distance]
+        return ids[np.abs(self._lengths[ids] - len(query)) <= max_distance].tolist()
+
+    def _search(self, query, max_distance=None, limit=None):
+        """(term, payload, distance) of names within max_distance edits (default: by length), closest first"""
+        query = normalize_name(query)
+        if not query or not self.terms:
+            return ()
+        if max_distance is None:
+            max_distance = default_max_distance(len(query))
+        if max_distance == 0:
+            index = self._positions.get(query)
+            return ((query, self.payloads[index], 0),) if index is not None else ()
+        results = []
+        for index in self._candidates(query, max_distance):
+            distance = bounded_levenshtein(query, self.terms[index], max_distance)
+            if distance <= max_distance:
+                results.append((distance, self.terms[index], index))
+        results.sort()
+        return tuple((term, self.payloads[index], distance) for distance, term, index in results[:limit])
+
+    def best_match(self, query, max_distance=None, accept=None):
+        """(term, payload, distance) of the single closest accepted name; None when there is none or a tie"""
+        best = None
+        for term, payload, distance in self.search(query, max_distance):
+            if accept is not None and not accept(term, payload):
+                continue
+            if best is None:
+                best = (term, payload, distance)
+            elif distance > best[2]:
+                break
+            elif payload != best[1]:
+                return None
+        return best
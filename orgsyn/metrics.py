@@ -0,0 +1,233 @@
+"""Opt-in per-stage timing: latency histograms, call counts and cache hit rates.
+
+Instrumentation is off unless ORGSYN_METRICS=1 or enable() is called; while
+off, a timed() function costs one attribute check and stage_timer() returns a
+shared no-op context. With ORGSYN_METRICS_FILE set, a daemon thread rewrites
+that file in Prometheus text format every ORGSYN_METRICS_INTERVAL seconds.
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Upper bounds in seconds: Prometheus' defaults, extended down for cached calls
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_FILE = os.environ.get('ORGSYN_METRICS_FILE')
+METRICS_INTERVAL = float(os.environ.get('ORGSYN_METRICS_INTERVAL', '60'))
+
+class StageStats:
+    """Latency histogram, call and error counts, and cache lookups for one stage"""
+
+    __slots__ = ('buckets', 'count', 'errors', 'total', 'max', 'cache')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)   # last bucket is +Inf
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.cache = {}   # cache name -> [hits, misses]
+
+    def observe(self, seconds, failed):
+        index = 0
+        while index < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.errors += failed
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Latency quantile in seconds, interpolated within its histogram bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+class MetricsRegistry:
+    """Process-wide stage statistics; recording is a no-op while disabled"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._dumper = None
+
+    def _stage(self, stage):
+        stats = self._stages.get(stage)
+        if stats is None:
+            stats = self._stages.setdefault(stage, StageStats())
+        return stats
+
+    def active_stages(self):
+        """Stages currently being timed on this thread, outermost first"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def observe(self, stage, seconds, failed=False):
+        with self._lock:
+            self._stage(stage).observe(seconds, failed)
+
+    def cache_lookup(self, cache, hit):
+        """Count a cache hit or miss against the innermost stage running on this thread"""
+        stack = self.active_stages()
+        if not stack:
+            return
+        with self._lock:
+            counts = self._stage(stack[-1]).cache.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self):
+        """Per-stage summary rows, sorted by total time spent"""
+        with self._lock:
+            rows = []
+            for stage, stats in self._stages.items():
+                row = {
+                    'stage': stage,
+                    'calls': stats.count,
+                    'errors': stats.errors,
+                    'total_s': stats.total,
+                    'mean_ms': stats.total / stats.count * 1000 if stats.count else 0.0,
+                    'p50_ms': stats.quantile(0.5) * 1000,
+                    'p95_ms': stats.quantile(0.95) * 1000,
+                    'max_ms': stats.max * 1000
+                }
+                for cache, (hits, misses) in sorted(stats.cache.items()):
+                    row[f'{cache}_hit_rate'] = hits / (hits + misses) if hits + misses else None
+                rows.append(row)
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def prometheus_text(self):
+        """All stage statistics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP orgsyn_stage_duration_seconds Time spent in each instrumented stage.',
+            '# TYPE orgsyn_stage_duration_seconds histogram'
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+            for stage, stats in stages:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += count
+                    lines.append(f'orgsyn_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'orgsyn_stage_duration_seconds_sum{{stage="{stage}"}} {stats.total:.6f}')
+                lines.append(f'orgsyn_stage_duration_seconds_count{{stage="{stage}"}} {stats.count}')
+            lines.append('# HELP orgsyn_stage_errors_total Calls to each stage that raised.')
+            lines.append('# TYPE orgsyn_stage_errors_total counter')
+            for stage, stats in stages:
+                lines.append(f'orgsyn_stage_errors_total{{stage="{stage}"}} {stats.errors}')
+            lines.append('# HELP orgsyn_stage_cache_lookups_total Cache lookups made directly by each stage.')
+            lines.append('# TYPE orgsyn_stage_cache_lookups_total counter')
+            for stage, stats in stages:
+                for cache, (hits, misses) in sorted(stats.cache.items()):
+                    lines.append(f'orgsyn_stage_cache_lookups_total{{stage="{stage}",cache="{cache}",result="hit"}} {hits}')
+                    lines.append(f'orgsyn_stage_cache_lookups_total{{stage="{stage}",cache="{cache}",result="miss"}} {misses}')
+        lines.append('# HELP orgsyn_metrics_start_time_seconds When statistics were last reset.')
+        lines.append('# TYPE orgsyn_metrics_start_time_seconds gauge')
+        lines.append(f'orgsyn_metrics_start_time_seconds {self.started:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Atomically replace path with the current statistics"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            handle.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def start_dumping(self, path, interval):
+        """Rewrite path every interval seconds from a daemon thread (once per process)"""
+        with self._lock:
+            if self._dumper is not None:
+                return
+            def dump():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.write_prometheus(path)
+                    except OSError:
+                        pass
+            self._dumper = threading.Thread(target=dump, name='orgsyn-metrics', daemon=True)
+            self._dumper.start()
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.started = time.time()
+
+class _StageTimer:
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.registry.active_stages().append(self.stage)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self.start
+        self.registry.active_stages().pop()
+        self.registry.observe(self.stage, elapsed, exc_type is not None)
+        return False
+
+_NULL_TIMER = nullcontext()
+_registry = MetricsRegistry(os.environ.get('ORGSYN_METRICS', '').lower() in ('1', 'true', 'yes', 'on'))
+
+def get_metrics():
+    """The process-wide metrics registry"""
+    return _registry
+
+def is_enabled():
+    return _registry.enabled
+
+def enable(path=METRICS_FILE, interval=METRICS_INTERVAL):
+    """Start recording; also start the periodic Prometheus dump when a path is given"""
+    _registry.enabled = True
+    if path:
+        _registry.start_dumping(path, interval)
+
+def disable():
+    """Stop recording; statistics gathered so far are kept"""
+    _registry.enabled = False
+
+def stage_timer(stage):
+    """Context manager timing one stage; a shared no-op while instrumentation is off"""
+    return _StageTimer(_registry, stage) if _registry.enabled else _NULL_TIMER
+
+def timed(stage):
+    """Decorator timing every call of a function as the named stage"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _registry.enabled:
+                return function(*args, **kwargs)
+            with _StageTimer(_registry, stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def cache_lookup(cache, hit):
+    """Attribute a cache hit or miss to the current stage (no-op while disabled)"""
+    if _registry.enabled:
+        _registry.cache_lookup(cache, hit)
+
+if _registry.enabled and METRICS_FILE:
+    _registry.start_dumping(METRICS_FILE, METRICS_INTERVAL)
@@ -0,0 +1,286 @@
+"""Memory-mapped binary molecule store: pre-parsed RDKit Mol pickles, deduplicated by InChIKey.
+
+File layout: a 24-byte header (magic, table-of-contents offset and length),
+then 8-byte aligned sections, then a JSON table of contents naming each
+section's offset, dtype and length. Sections are the Mol pickle, name and
+canonical SMILES blobs with their offset arrays, the InChIKeys with a sorted
+lookup, and sorted 64-bit hashes of every canonical and input SMILES spelling.
+Readers map the file and unpickle single molecules on demand, so opening a
+large library costs neither parsing, sanitizing nor a private copy per worker.
+"""
+import csv
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+from ._lazy import lazy_import
+from .data import PROJECT_DIR, data_stamp, file_stamp, get_compound_database, rebuild_on_change
+from .workers import map_chunks
+
+Chem = lazy_import('rdkit.Chem')
+rdkit = lazy_import('rdkit')
+np = lazy_import('numpy')
+
+MOLSTORE_PATH = os.environ.get('ORGSYN_MOLSTORE_PATH', os.path.join(PROJECT_DIR, '.cache', 'molecules.bin'))
+MOLSTORE_CHUNK_SIZE = 1000
+COMPOUND_FILES = [path for path in os.environ.get('ORGSYN_COMPOUND_FILES', '').split(os.pathsep) if path]
+_MAGIC = b'ORGSYNM1'
+_HEADER = struct.Struct('<8sQQ')
+
+# Compound Library
+def read_compound_file(path):
+    """Yield (name, SMILES) from a .smi, .csv or compounds.json-style file"""
+    lower = path.lower()
+    with open(path, encoding='utf-8', newline='') as handle:
+        if lower.endswith('.json'):
+            for record in json.load(handle)['compounds']:
+                yield record['name'], record['smiles']
+        elif lower.endswith('.csv'):
+            for row in csv.DictReader(handle):
+                smiles = row.get('smiles') or row.get('SMILES')
+                if smiles:
+                    yield row.get('name') or row.get('Name') or smiles, smiles
+        else:
+            for line in handle:
+                parts = line.split(None, 1)
+                if parts and not parts[0].startswith('#'):
+                    yield (parts[1].strip() if len(parts) > 1 else parts[0]), parts[0]
+
+def library_records():
+    """(name, SMILES) of the compound database followed by every ORGSYN_COMPOUND_FILES entry"""
+    yield from get_compound_database().items()
+    for path in COMPOUND_FILES:
+        yield from read_compound_file(path)
+
+def library_sources():
+    """Stamps of everything library_records() reads, to tell whether a store is current"""
+    files = []
+    for path in COMPOUND_FILES:
+        stat = os.stat(path)
+        files.append([os.path.abspath(path), stat.st_mtime_ns, stat.st_size])
+    return {'compounds': list(data_stamp('compounds')), 'files': files, 'rdkit': rdkit.__version__}
+
+def smiles_hash(smiles):
+    return int.from_bytes(hashlib.blake2b(smiles.encode('utf-8'), digest_size=8).digest(), 'little')
+
+# Build
+def _store_rows(chunk):
+    """(name, input SMILES, canonical SMILES, InChIKey, Mol pickle) per parsable record; runs in pool workers"""
+    rows = []
+    for name, smiles in chunk:
+        try:
+            mol = Chem.MolFromSmiles(smiles)
+        except Exception:
+            mol = None
+        if mol is None:
+            rows.append(None)
+            continue
+        try:
+            inchikey = Chem.MolToInchiKey(mol) or ''
+        except Exception:
+            inchikey = ''
+        rows.append((name, smiles, Chem.MolToSmiles(mol), inchikey, mol.ToBinary()))
+    return rows
+
+def _iter_store_rows(records, workers, chunk_size):
+    for rows in map_chunks(_store_rows, records, chunk_size, workers):
+        yield from rows
+
+class _SectionWriter:
+    """Appends 8-byte aligned sections to a file and records them for the table of contents"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.sections = {}
+
+    def _align(self):
+        padding = -self.handle.tell() % 8
+        if padding:
+            self.handle.write(b'\0' * padding)
+
+    def array(self, name, values):
+        self._align()
+        values = np.ascontiguousarray(values)
+        self.sections[name] = [self.handle.tell(), values.dtype.str, len(values)]
+        self.handle.write(values.tobytes())
+
+    def blob(self, name, source):
+        self._align()
+        start = self.handle.tell()
+        source.seek(0)
+        shutil.copyfileobj(source, self.handle)
+        self.sections[name] = [start, '|u1', self.handle.tell() - start]
+
+def build_molecule_store(records=None, path=MOLSTORE_PATH, workers=None, chunk_size=MOLSTORE_CHUNK_SIZE):
+    """Parse, canonicalize and deduplicate (by InChIKey) compounds into a molecule store file.
+
+    records defaults to the compound library, in which case the file records
+    its sources and get_molecule_store() uses it until they change. The file
+    is written beside the target and swapped in atomically. Returns counts of
+    records read, molecules written, duplicates and unparsable SMILES.
+    """
+    sources = library_sources() if records is None else None
+    records = iter(library_records() if records is None else records)
+    workers = workers or os.cpu_count() or 1
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    stats = {'read': 0, 'written': 0, 'duplicates': 0, 'invalid': 0}
+
+    mol_offsets, name_offsets, smiles_offsets = [0], [0], [0]
+    inchikeys = []
+    seen = {}         # InChIKey (or canonical SMILES without one) -> (row, canonical SMILES)
+    spellings = {}    # SMILES hash -> row, for canonical and input spellings
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as out, \
+                tempfile.TemporaryFile() as names, tempfile.TemporaryFile() as smiles_blob:
+            out.write(_HEADER.pack(_MAGIC, 0, 0))
+            writer = _SectionWriter(out)
+            mols_start = out.tell()
+            for row in _iter_store_rows(records, workers, chunk_size):
+                stats['read'] += 1
+                if row is None:
+                    stats['invalid'] += 1
+                    continue
+                name, smiles, canonical, inchikey, pickle = row
+                key = inchikey or canonical
+                if key in seen:
+                    stats['duplicates'] += 1
+                    # InChIKeys merge tautomers; only alias spellings of the very same structure
+                    index, stored = seen[key]
+                    if canonical == stored:
+                        spellings.setdefault(smiles_hash(smiles), index)
+                    continue
+                index = len(inchikeys)
+                seen[key] = (index, canonical)
+                out.write(pickle)
+                mol_offsets.append(out.tell() - mols_start)
+                name_offsets.append(name_offsets[-1] + names.write(str(name).encode('utf-8')))
+                smiles_offsets.append(smiles_offsets[-1] + smiles_blob.write(canonical.encode('utf-8')))
+                inchikeys.append(inchikey.encode('ascii'))
+                spellings.setdefault(smiles_hash(canonical), index)
+                spellings.setdefault(smiles_hash(smiles), index)
+            writer.sections['mols'] = [mols_start, '|u1', out.tell() - mols_start]
+            writer.blob('names', names)
+            writer.blob('smiles', smiles_blob)
+            writer.array('mol_offsets', np.array(mol_offsets, dtype='<u8'))
+            writer.array('name_offsets', np.array(name_offsets, dtype='<u8'))
+            writer.array('smiles_offsets', np.array(smiles_offsets, dtype='<u8'))
+            keys = np.array(inchikeys, dtype='S27')
+            order = np.argsort(keys, kind='stable')
+            writer.array('inchikeys', keys)
+            writer.array('inchikeys_sorted', keys[order])
+            writer.array('inchikey_rows', order.astype('<u4'))
+            hashes = np.fromiter(spellings.keys(), dtype='<u8', count=len(spellings))
+            rows = np.fromiter(spellings.values(), dtype='<u4', count=len(spellings))
+            order = np.argsort(hashes, kind='stable')
+            writer.array('smiles_hashes', hashes[order])
+            writer.array('smiles_hash_rows', rows[order])
+            toc = json.dumps({'version': 1, 'count': len(inchikeys), 'sources': sources,
+                              'rdkit': rdkit.__version__, 'sections': writer.sections}).encode('utf-8')
+            toc_offset = out.tell()
+            out.write(toc)
+            out.seek(0)
+            out.write(_HEADER.pack(_MAGIC, toc_offset, len(toc)))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    stats['written'] = len(inchikeys)
+    return stats
+
+# Read
+class MoleculeStore:
+    """Read-only view of a molecule store file; molecules are unpickled from the mapping on demand"""
+
+    def __init__(self, path=MOLSTORE_PATH):
+        self.path = path
+        with open(path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, toc_offset, toc_length = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or not toc_offset:
+            raise ValueError(f"Not a molecule store: {path}")
+        toc = json.loads(self._map[toc_offset:toc_offset + toc_length])
+        if toc.get('version') != 1:
+            raise ValueError(f"Unsupported molecule store version in {path}: {toc.get('version')}")
+        self.sources = toc['sources']
+        self.rdkit_version = toc['rdkit']
+        self._count = toc['count']
+        self._sections = toc['sections']
+        self._mol_offsets = self._array('mol_offsets')
+        self._name_offsets = self._array('name_offsets')
+        self._smiles_offsets = self._array('smiles_offsets')
+        self._inchikeys = self._array('inchikeys')
+        self._inchikeys_sorted = self._array('inchikeys_sorted')
+        self._inchikey_rows = self._array('inchikey_rows')
+        self._hashes = self._array('smiles_hashes')
+        self._hash_rows = self._array('smiles_hash_rows')
+
+    def _array(self, name):
+        offset, dtype, length = self._sections[name]
+        return np.frombuffer(self._map, dtype=np.dtype(dtype), count=length, offset=offset)
+
+    def _slice(self, section, offsets, row):
+        start = self._sections[section][0]
+        return self._map[start + int(offsets[row]):start + int(offsets[row + 1])]
+
+    def __len__(self):
+        return self._count
+
+    def mol(self, row):
+        """The stored Mol for a row, unpickled without parsing or sanitizing"""
+        return Chem.Mol(self._slice('mols', self._mol_offsets, row))
+
+    def name(self, row):
+        return self._slice('names', self._name_offsets, row).decode('utf-8')
+
+    def smiles(self, row):
+        """Canonical SMILES of a row"""
+        return self._slice('smiles', self._smiles_offsets, row).decode('utf-8')
+
+    def inchikey(self, row):
+        return self._inchikeys[row].decode('ascii') or None
+
+    def find(self, smiles):
+        """Row for a SMILES string spelled as stored (canonical or as imported), or None"""
+        key = np.uint64(smiles_hash(smiles))
+        index = np.searchsorted(self._hashes, key)
+        if index < len(self._hashes) and self._hashes[index] == key:
+            return int(self._hash_rows[index])
+        return None
+
+    def find_inchikey(self, inchikey):
+        key = inchikey.encode('ascii')
+        index = np.searchsorted(self._inchikeys_sorted, key)
+        if index < len(self._inchikeys_sorted) and self._inchikeys_sorted[index] == key:
+            return int(self._inchikey_rows[index])
+        return None
+
+    def get_mol(self, smiles):
+        """Stored Mol for a SMILES spelling, or None when it is not in the store"""
+        row = self.find(smiles)
+        return self.mol(row) if row is not None else None
+
+def molecule_store_stamp():
+    """(mtime, size) of the store file, so a rebuilt or newly written store is picked up"""
+    return file_stamp(MOLSTORE_PATH)
+
+@rebuild_on_change(library_sources, molecule_store_stamp)
+def get_molecule_store():
+    """Store at ORGSYN_MOLSTORE_PATH if it was built from the current library with this RDKit, else None"""
+    try:
+        store = MoleculeStore(MOLSTORE_PATH)
+    except (OSError, ValueError, KeyError):
+        return None
+    return store if store.sources == library_sources() else None
+
+def load_mol(smiles):
+    """Mol for a SMILES string: from the current molecule store when it holds it, else parsed"""
+    store = get_molecule_store()
+    mol = store.get_mol(smiles) if store is not None else None
+    return mol if mol is not None else Chem.MolFromSmiles(smiles)
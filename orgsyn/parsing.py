@@ -0,0 +1,244 @@
+"""Problem-text parsing: compound mentions and reaction types"""
+import re
+from collections import deque
+
+from .data import get_common_names, get_compound_database, get_compound_synonyms, rebuild_on_change
+from .fuzzy import FUZZY_CACHE_SIZE, FuzzyNameIndex
+from .metrics import timed
+
+# Compound Mention Scanner
+def _normalize_mention_text(text):
+    return ' '.join(text.lower().split())
+
+class MentionScanner:
+    """Aho-Corasick automaton that finds whole-word, longest vocabulary matches in one pass"""
+
+    def __init__(self, terms):
+        # terms: surface form -> payload
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]       # (length, term, payload) ending at this state
+        self._dict_link = [0]       # nearest proper suffix state with an output
+        for term, payload in terms.items():
+            self._add(_normalize_mention_text(term), payload)
+        self._build_links()
+
+    def __len__(self):
+        return sum(1 for output in self._output if output)
+
+    def _add(self, term, payload):
+        if not term:
+            return
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._dict_link.append(0)
+            state = next_state
+        # Later terms win, so callers add their most specific vocabulary last
+        self._output[state] = (len(term), term, payload)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fail_state = self._fail[child]
+                self._dict_link[child] = fail_state if self._output[fail_state] else self._dict_link[fail_state]
+                queue.append(child)
+
+    def scan(self, text):
+        """Return (term, payload) for each non-overlapping, leftmost-longest whole-word match"""
+        return [(term, payload) for _, _, term, payload in self.scan_spans(text)]
+
+    def scan_spans(self, text):
+        """Like scan, as (start, end, term, payload) offsets into the normalized text"""
+        text = _normalize_mention_text(text)
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        dict_link = self._dict_link
+        candidates = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match_state = state if output[state] else dict_link[state]
+            while match_state:
+                length, term, payload = output[match_state]
+                start = end - length
+                if ((start == 0 or not text[start - 1].isalnum())
+                        and (end == len(text) or not text[end].isalnum())):
+                    candidates.append((start, -length, term, payload))
+                match_state = dict_link[match_state]
+
+        matches = []
+        last_end = 0
+        for start, negative_length, term, payload in sorted(candidates):
+            if start >= last_end:
+                matches.append((start, start - negative_length, term, payload))
+                last_end = start - negative_length
+        return matches
+
+def _mention_terms(database, synonyms, common_names):
+    # Compound names are added last so they win over a common name with the same spelling
+    terms = {}
+    for name in common_names:
+        terms[name] = ('common_name', name)
+    for synonym, name in synonyms.items():
+        terms[synonym] = ('compound', name)
+    for name in database:
+        terms[name] = ('compound', name)
+    return terms
+
+def build_mention_scanner(database, synonyms, common_names):
+    """Scanner over compound names, their synonyms and the common-name vocabulary"""
+    return MentionScanner(_mention_terms(database, synonyms, common_names))
+
+@rebuild_on_change('compounds', 'common_names')
+def get_mention_scanner():
+    """Mention scanner, rebuilt only when the compound or common-name data files change"""
+    return build_mention_scanner(get_compound_database(), get_compound_synonyms(), get_common_names())
+
+def build_name_index(database, synonyms, common_names):
+    """Typo-tolerant index over the same vocabulary as the mention scanner"""
+    return FuzzyNameIndex(_mention_terms(database, synonyms, common_names))
+
+@rebuild_on_change('compounds', 'common_names')
+def get_name_index():
+    """Fuzzy name index, rebuilt only when the compound or common-name data files change"""
+    return build_name_index(get_compound_database(), get_compound_synonyms(), get_common_names())
+
+# Fuzzy Mentions
+MIN_FUZZY_MENTION_LENGTH = 6
+_MENTION_WORD = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+# Names that differ only in their functional-group ending are different compounds
+_FUNCTIONAL_SUFFIXES = ('one', 'ane', 'ene', 'yne', 'ine', 'ide', 'ate', 'ite', 'al', 'ol')
+
+def _functional_suffix(term):
+    last_word = term.rsplit(' ', 1)[-1]
+    return next((suffix for suffix in _FUNCTIONAL_SUFFIXES if last_word.endswith(suffix)), None)
+
+def _resolve_fuzzy(index, phrase):
+    """Closest name to a phrase whose functional-group ending does not contradict it, or None"""
+    resolved = index.resolved
+    if phrase in resolved:
+        return resolved[phrase]
+    phrase_suffix = _functional_suffix(phrase)
+    def accept(term, payload):
+        term_suffix = _functional_suffix(term)
+        return phrase_suffix is None or term_suffix is None or phrase_suffix == term_suffix
+    match = index.best_match(phrase, accept=accept)
+    if len(resolved) >= FUZZY_CACHE_SIZE:
+        resolved.popitem(last=False)
+    resolved[phrase] = match
+    return match
+
+def _uncovered_runs(text, covered):
+    """Runs of adjacent word spans (single space apart) that no exact match overlaps"""
+    runs = []
+    run = []
+    covered = iter(covered)
+    blocker = next(covered, None)
+    for match in _MENTION_WORD.finditer(text):
+        start, end = match.span()
+        while blocker is not None and blocker[1] <= start:
+            blocker = next(covered, None)
+        if blocker is not None and blocker[0] < end:
+            if run:
+                runs.append(run)
+            run = []
+            continue
+        if run and start != run[-1][1] + 1:
+            runs.append(run)
+            run = []
+        run.append((start, end))
+    if run:
+        runs.append(run)
+    return runs
+
+def _fuzzy_spans(text, covered, index):
+    """(start, end, term, payload) for misspelled names among the words no exact match covered"""
+    spans = []
+    for run in _uncovered_runs(text, covered):
+        position = 0
+        while position < len(run):
+            for width in range(min(index.max_words, len(run) - position), 0, -1):
+                start, end = run[position][0], run[position + width - 1][1]
+                if end - start < MIN_FUZZY_MENTION_LENGTH:
+                    continue
+                match = _resolve_fuzzy(index, text[start:end])
+                if match is not None:
+                    spans.append((start, end, match[0], match[1]))
+                    position += width
+                    break
+            else:
+                position += 1
+    return spans
+
+def find_compound_mentions(problem_text, fuzzy=True):
+    """Return (kind, name) for every compound or common name mentioned in the text.
+
+    With fuzzy, words that match nothing exactly are also resolved to the
+    closest vocabulary name within a small edit distance ("benzaldehide").
+    """
+    spans = get_mention_scanner().scan_spans(problem_text)
+    if fuzzy:
+        covered = [(start, end) for start, end, _, _ in spans]
+        spans = sorted(spans + _fuzzy_spans(_normalize_mention_text(problem_text), covered, get_name_index()))
+    return [payload for _, _, _, payload in spans]
+
+@timed('parse')
+def parse_problem(problem_text):
+    """Enhanced problem parsing with better pattern matching"""
+    problem_lower = problem_text.lower()
+    
+    # Identify compounds mentioned
+    compounds_found = {}
+    database = get_compound_database()
+    
+    # Look for compound names (whole words, longest match, single pass)
+    for kind, name in find_compound_mentions(problem_text):
+        if kind == 'compound':
+            compounds_found[name] = database[name]
+    
+    # Look for compound patterns (A, B, C)
+    compound_pattern = r'compound\s+([A-Z])'
+    matches = re.finditer(compound_pattern, problem_lower)
+    for match in matches:
+        compounds_found[match.group(1)] = None
+    
+    # Identify reaction types with better matching
+    reaction_keywords = {
+        'oxidation': ['oxid'],
+        'reduction': ['reduc'],
+        'esterification': ['esterif'],
+        'hydrolysis': ['hydrolys'],
+        'acetylation': ['acetylat'],
+        'halogenation': ['halogenat', 'bromin', 'chlorin'],
+        'nitration': ['nitrat'],
+        'alkylation': ['alkylat'],
+        'acylation': ['acylat'],
+        'grignard': ['grignard']
+    }
+    
+    # In the order the problem mentions them, so route ranking can follow the sequence
+    first_mention = {}
+    for reaction_type, keywords in reaction_keywords.items():
+        positions = [problem_lower.find(keyword) for keyword in keywords if keyword in problem_lower]
+        if positions:
+            first_mention[reaction_type] = min(positions)
+    reactions_found = sorted(first_mention, key=first_mention.get)
+    
+    return compounds_found, reactions_found
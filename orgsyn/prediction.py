@@ -0,0 +1,116 @@
+"""Forward product prediction from per-reaction-type reaction SMARTS templates"""
+from ._lazy import lazy_import
+from .cache import get_molecule_cache
+from .data import data_stamp, get_reaction_templates, rebuild_on_change
+from .metrics import timed
+from .workers import map_chunks
+
+Chem = lazy_import('rdkit.Chem')
+rdChemReactions = lazy_import('rdkit.Chem.rdChemReactions')
+molstore = lazy_import('orgsyn.molstore')
+
+PREDICTION_CHUNK_SIZE = 200
+MAX_MATCHES_PER_TEMPLATE = 100
+
+class ReactionTemplate:
+    """One compiled single-reactant reaction SMARTS template"""
+
+    __slots__ = ('reaction_type', 'name', 'smarts', 'reagents', 'reaction')
+
+    def __init__(self, reaction_type, name, smarts, reagents=None):
+        reaction = rdChemReactions.ReactionFromSmarts(smarts)
+        if reaction.GetNumReactantTemplates() != 1:
+            raise ValueError(f"Template {name!r} must have exactly one reactant: {smarts}")
+        reaction.Initialize()
+        self.reaction_type = reaction_type
+        self.name = name
+        self.smarts = smarts
+        self.reagents = reagents
+        self.reaction = reaction
+
+    def apply(self, mol):
+        """Distinct canonical product SMILES of every match of the template on mol"""
+        products = {}
+        for outcome in self.reaction.RunReactants((mol,), MAX_MATCHES_PER_TEMPLATE):
+            try:
+                smiles = []
+                for product in outcome:
+                    Chem.SanitizeMol(product)
+                    smiles.append(Chem.MolToSmiles(product))
+            except Exception:
+                # The template matched, but the product has an impossible valence
+                continue
+            products.setdefault('.'.join(sorted(smiles)), None)
+        return list(products)
+
+@rebuild_on_change('templates')
+def get_compiled_templates():
+    """Reaction type -> compiled templates, compiled once per version of the data file"""
+    return {
+        reaction_type: tuple(
+            ReactionTemplate(reaction_type, record['name'], record['smarts'], record.get('reagents'))
+            for record in records
+        )
+        for reaction_type, records in get_reaction_templates().items()
+    }
+
+def _predict(mol, reaction_types, templates):
+    predictions = []
+    seen = set()
+    starting_material = Chem.MolToSmiles(mol)
+    for reaction_type in reaction_types:
+        for template in templates.get(reaction_type, ()):
+            for product in template.apply(mol):
+                if product == starting_material or (reaction_type, product) in seen:
+                    continue
+                seen.add((reaction_type, product))
+                predictions.append({
+                    'reaction_type': reaction_type,
+                    'template': template.name,
+                    'reagents': template.reagents,
+                    'product': product
+                })
+    return predictions
+
+@timed('predict')
+def predict_products(smiles, reaction_types=None):
+    """Products of one molecule under each reaction type's templates, deduplicated per type.
+
+    Returns dicts with reaction_type, template, reagents and product (canonical
+    SMILES); an empty list for invalid SMILES or when no template applies.
+    """
+    templates = get_compiled_templates()
+    reaction_types = tuple(templates if reaction_types is None else reaction_types)
+    key = ('predict', reaction_types, data_stamp('templates'))
+    predictions = get_molecule_cache().get_result(
+        smiles, key, lambda mol: tuple(_predict(mol, reaction_types, templates)), size=1024)
+    return [dict(prediction) for prediction in predictions or ()]
+
+def _prediction_rows(smiles_chunk, reaction_types):
+    """Prediction rows for one chunk of SMILES; runs inside pool workers"""
+    templates = get_compiled_templates()
+    reaction_types = tuple(templates if reaction_types is None else reaction_types)
+    rows = []
+    for smiles in smiles_chunk:
+        row = {'smiles': smiles, 'predictions': [], 'error': None}
+        try:
+            mol = molstore.load_mol(smiles)
+            if mol is None:
+                row['error'] = 'Invalid SMILES'
+            else:
+                row['predictions'] = _predict(mol, reaction_types, templates)
+        except Exception as exc:
+            row['error'] = f"{type(exc).__name__}: {exc}"
+        rows.append(row)
+    return rows
+
+def iter_predictions(smiles_iter, reaction_types=None, workers=None, chunk_size=PREDICTION_CHUNK_SIZE):
+    """Yield one prediction row per input SMILES, in input order.
+
+    Same scheduling as iter_molecular_properties: small inputs run inline,
+    larger ones over a process pool with a bounded number of chunks in flight.
+    Each worker compiles the templates once and reuses them for every chunk.
+    """
+    reaction_types = tuple(reaction_types) if reaction_types is not None else None
+    for rows in map_chunks(_prediction_rows, smiles_iter, chunk_size, workers, (reaction_types,)):
+        yield from rows
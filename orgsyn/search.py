@@ -0,0 +1,20 @@
+"""Reaction search fields, their ranking weights and query text normalization"""
+import unicodedata
+
+SEARCH_FIELDS = {
+    "name": 5.0, "chemist": 3.0, "reactants": 2.0,
+    "products": 2.0, "description": 1.0, "mechanism": 1.0
+}
+SEARCH_BY_FIELDS = {
+    "All Fields": list(SEARCH_FIELDS),
+    "Reaction Name": ["name"],
+    "Chemist": ["chemist"],
+    "Reactants": ["reactants"],
+    "Products": ["products"],
+    "Mechanism": ["mechanism"]
+}
+_SEARCH_TRANSLATION = str.maketrans({"\u2212": "-", "\u2010": "-", "\u2013": "-"})
+
+def normalize_search_text(text):
+    """Case-fold and flatten Unicode sub/superscripts so CH2N2 matches CH₂N₂"""
+    return unicodedata.normalize("NFKC", str(text)).casefold().translate(_SEARCH_TRANSLATION)
@@ -0,0 +1,217 @@
+"""Problem solving: reaction route graph, pathway matching and full analysis"""
+import threading
+from collections import OrderedDict, deque
+from types import MappingProxyType
+
+from .cache import get_molecule_cache
+from .chemistry import calculate_numeric_properties
+from .data import get_reaction_pathways, rebuild_on_change
+from .metrics import timed
+from .parsing import parse_problem
+
+# Routes gathered per search before ranking, as a multiple of the k returned
+ROUTE_CANDIDATES = 3
+
+# Reaction Route Graph
+class ReactionGraph:
+    """Directed graph of pathway steps between canonical SMILES, with memoized route search"""
+
+    def __init__(self, reaction_pathways, max_expansions=20000):
+        self.forward = {}    # canonical SMILES -> outgoing step edges
+        self.backward = {}   # canonical SMILES -> incoming step edges
+        self.max_expansions = max_expansions
+        self._routes = OrderedDict()
+        self._lock = threading.Lock()
+        cache = get_molecule_cache()
+        for reaction_type, pathways in reaction_pathways.items():
+            for pathway in pathways:
+                chain = [cache.canonical(pathway[comp]) for comp in ['A', 'B', 'C'] if comp in pathway]
+                # Each step is labelled with its own reaction; pathways without "steps" are one type throughout
+                step_types = pathway.get('steps') or [reaction_type] * (len(chain) - 1)
+                for step, (source, target) in enumerate(zip(chain, chain[1:]), 1):
+                    if source is None or target is None or source == target:
+                        continue
+                    edge = {
+                        'source': source,
+                        'target': target,
+                        'reaction_type': step_types[step - 1],
+                        'pathway': pathway,
+                        'step': step
+                    }
+                    self.forward.setdefault(source, []).append(edge)
+                    self.backward.setdefault(target, []).append(edge)
+
+    def _search(self, origin, goal, reverse, k, max_steps, reaction_types):
+        """Breadth-first enumeration of simple routes, shortest first"""
+        adjacency = self.backward if reverse else self.forward
+        routes = []
+        expansions = 0
+        queue = deque([(origin, (), frozenset([origin]))])
+        while queue and len(routes) < k and expansions < self.max_expansions:
+            node, path, visited = queue.popleft()
+            expansions += 1
+            if len(path) >= max_steps:
+                continue
+            for edge in adjacency.get(node, []):
+                if reaction_types is not None and edge['reaction_type'] not in reaction_types:
+                    continue
+                following = edge['source'] if reverse else edge['target']
+                if following in visited:
+                    continue
+                extended = path + (edge,)
+                if goal is None or following == goal:
+                    routes.append(list(reversed(extended)) if reverse else list(extended))
+                    if len(routes) >= k:
+                        break
+                if goal is None or following != goal:
+                    queue.append((following, extended, visited | {following}))
+        return routes
+
+    def find_routes(self, start=None, target=None, k=3, max_steps=4, reaction_types=None):
+        """Up to k routes (lists of step edges) from start to target, fewest steps first.
+
+        Either end may be None to mean "any compound"; both are canonical SMILES.
+        """
+        if start is None and target is None:
+            return []
+        reaction_types = frozenset(reaction_types) if reaction_types is not None else None
+        key = (start, target, k, max_steps, reaction_types)
+        with self._lock:
+            if key in self._routes:
+                self._routes.move_to_end(key)
+                return self._routes[key]
+        if start is not None:
+            routes = self._search(start, target, False, k, max_steps, reaction_types)
+        else:
+            routes = self._search(target, None, True, k, max_steps, reaction_types)
+        with self._lock:
+            self._routes[key] = routes
+            if len(self._routes) > 1024:
+                self._routes.popitem(last=False)
+        return routes
+
+@rebuild_on_change('pathways')
+def get_reaction_graph():
+    """Route graph over the reaction pathways, rebuilt only when the data file changes"""
+    return ReactionGraph(get_reaction_pathways())
+
+def _parsed(problem_text, compounds_found, reactions_found):
+    """parse_problem results, reusing whatever the caller has already parsed"""
+    if compounds_found is None or reactions_found is None:
+        parsed_compounds, parsed_reactions = parse_problem(problem_text)
+        compounds_found = parsed_compounds if compounds_found is None else compounds_found
+        reactions_found = parsed_reactions if reactions_found is None else reactions_found
+    return compounds_found, reactions_found
+
+def _route_rank(route, reactions_found):
+    """Sort key: named reactions left out, unnamed steps, named steps out of text order, step count"""
+    step_types = [edge['reaction_type'] for edge in route]
+    named = [reaction_type for reaction_type in step_types if reaction_type in reactions_found]
+    missing = sum(1 for reaction_type in reactions_found if reaction_type not in named)
+    positions = [reactions_found.index(reaction_type) for reaction_type in named]
+    out_of_order = sum(1 for earlier, later in zip(positions, positions[1:]) if later < earlier)
+    return (missing, len(step_types) - len(named), out_of_order, len(route))
+
+@timed('routes')
+def find_problem_routes(problem_text, selected_reactions=None, k=3, max_steps=4, compounds_found=None,
+                        reactions_found=None):
+    """Routes between the first and last known compounds mentioned in a problem.
+
+    Routes covering the reactions the problem names, in the order it names
+    them, come first; step count only breaks ties. Pass the compounds and
+    reactions from parse_problem to skip parsing the text again.
+    """
+    compounds_found, reactions_found = _parsed(problem_text, compounds_found, reactions_found)
+    cache = get_molecule_cache()
+    mentioned = [cache.canonical(smiles) for smiles in compounds_found.values() if smiles]
+    mentioned = [smiles for smiles in dict.fromkeys(mentioned) if smiles]
+    if not mentioned:
+        return []
+
+    graph = get_reaction_graph()
+    candidates = k * ROUTE_CANDIDATES
+    routes = []
+    if len(mentioned) >= 2:
+        routes = graph.find_routes(mentioned[0], mentioned[-1], candidates, max_steps, selected_reactions)
+    if not routes:
+        # The first compound may be the starting material and the last the product
+        routes = (graph.find_routes(mentioned[0], None, candidates, max_steps, selected_reactions)
+                  + graph.find_routes(None, mentioned[-1], candidates, max_steps, selected_reactions))
+    return sorted(routes, key=lambda route: _route_rank(route, reactions_found))[:k]
+
+@timed('solve')
+def solve_chemistry_problem(problem_text, selected_reactions=None, compounds_found=None, reactions_found=None):
+    """Pathways on routes linking the compounds a problem mentions.
+
+    When no route uses only the selected reaction types, routes over every
+    type are returned with 'outside_selection' set; [] when nothing links them.
+    """
+    if selected_reactions is None:
+        selected_reactions = ['oxidation']
+    
+    # Only pathways on routes between the compounds the problem mentions
+    relevant_pathways = _route_pathways(find_problem_routes(
+        problem_text, selected_reactions, compounds_found=compounds_found, reactions_found=reactions_found))
+    if relevant_pathways:
+        return relevant_pathways
+    
+    # No route within the selection: try every reaction type, marking the results as outside it
+    return [{**pathway, 'outside_selection': True} for pathway in _route_pathways(find_problem_routes(
+        problem_text, None, compounds_found=compounds_found, reactions_found=reactions_found))]
+
+def _route_pathways(routes):
+    """Distinct pathways along the given routes, in route order"""
+    pathways = []
+    for route in routes:
+        for edge in route:
+            if not any(edge['pathway'] is pathway for pathway in pathways):
+                pathways.append(edge['pathway'])
+    return pathways
+
+def describe_route(route):
+    """Route as plain data: compound SMILES in order plus one entry per step"""
+    return {
+        'compounds': [route[0]['source']] + [edge['target'] for edge in route],
+        'steps': [
+            {
+                'reaction_type': edge['reaction_type'],
+                'pathway': edge['pathway']['name'],
+                'step': edge['step']
+            }
+            for edge in route
+        ]
+    }
+
+def _thaw(value):
+    """Convert read-only data-file structures back into plain JSON types"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(item) for item in value]
+    return value
+
+def analyze_problem(problem_text, selected_reactions=None):
+    """Parse and solve one problem, returning a JSON-serializable summary"""
+    compounds_found, reactions_found = parse_problem(problem_text)
+    if selected_reactions is None:
+        selected_reactions = reactions_found
+    pathways = solve_chemistry_problem(problem_text, selected_reactions, compounds_found, reactions_found)
+    routes = find_problem_routes(problem_text, selected_reactions if not pathways or not
+                                 pathways[0].get('outside_selection') else None,
+                                 compounds_found=compounds_found, reactions_found=reactions_found)
+
+    properties = {}
+    smiles_seen = [smiles for smiles in compounds_found.values() if smiles]
+    for pathway in pathways:
+        smiles_seen.extend(pathway[comp] for comp in ['A', 'B', 'C'] if comp in pathway)
+    for smiles in dict.fromkeys(smiles_seen):
+        numeric = calculate_numeric_properties(smiles)
+        properties[smiles] = dict(numeric) if numeric else None
+
+    return {
+        'compounds': compounds_found,
+        'reactions': reactions_found,
+        'pathways': [_thaw(pathway) for pathway in pathways],
+        'routes': [describe_route(route) for route in routes],
+        'properties': properties
+    }
@@ -0,0 +1,561 @@
+"""SQLite store for compounds, named reactions and common names, with FTS5 search"""
+import csv
+import functools
+import itertools
+import json
+import os
+import sqlite3
+import threading
+
+from ._lazy import lazy_import
+from .data import PROJECT_DIR, data_stamp, get_data_files
+from .facets import FACETS_VERSION, FacetIndex, bitmap_of, contains, reaction_facet_values
+from .search import SEARCH_FIELDS, normalize_search_text
+
+Chem = lazy_import('rdkit.Chem')
+np = lazy_import('numpy')
+
+STORE_PATH = os.environ.get('ORGSYN_STORE_PATH', os.path.join(PROJECT_DIR, '.cache', 'orgsyn.sqlite3'))
+IMPORT_BATCH_SIZE = 10000
+BUILTIN_SOURCE = 'builtin'
+# Bumped whenever sync_builtin stores the bundled records differently, so existing stores resync
+BUILTIN_SYNC_VERSION = 2
+BUILTIN_DATA_KEYS = ('compounds', 'common_names', 'named_reactions')
+FACET_FETCH_SIZE = 1000
+REACTION_COLUMNS = ['name', 'reaction_smiles', 'reactants', 'products', 'chemist', 'year', 'description', 'mechanism']
+
+# FTS tables hold normalized copies of the text (rowid = base table id); the
+# trigram tokenizer matches substrings of 3+ characters, so "hofm" finds Hofmann
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+
+CREATE TABLE IF NOT EXISTS compounds (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    smiles TEXT NOT NULL,
+    canonical_smiles TEXT,
+    class TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS compounds_canonical ON compounds (canonical_smiles);
+CREATE INDEX IF NOT EXISTS compounds_name ON compounds (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS compounds_source ON compounds (source);
+CREATE VIRTUAL TABLE IF NOT EXISTS compounds_fts USING fts5(name, synonyms, tokenize='trigram');
+
+CREATE TABLE IF NOT EXISTS reactions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    reaction_smiles TEXT,
+    reactants TEXT,
+    products TEXT,
+    chemist TEXT,
+    year INTEGER,
+    description TEXT,
+    mechanism TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reactions_name ON reactions (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS reactions_source ON reactions (source);
+CREATE INDEX IF NOT EXISTS reactions_year ON reactions (year);
+CREATE VIRTUAL TABLE IF NOT EXISTS reactions_fts USING fts5(
+    name, chemist, reactants, products, description, mechanism, tokenize='trigram'
+);
+
+CREATE TABLE IF NOT EXISTS reaction_molecules (
+    reaction_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    canonical_smiles TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reaction_molecules_smiles ON reaction_molecules (canonical_smiles, role);
+CREATE INDEX IF NOT EXISTS reaction_molecules_reaction ON reaction_molecules (reaction_id);
+
+CREATE TABLE IF NOT EXISTS reaction_facets (
+    reaction_id INTEGER NOT NULL,
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reaction_facets_reaction ON reaction_facets (reaction_id);
+CREATE INDEX IF NOT EXISTS reaction_facets_value ON reaction_facets (facet, value);
+
+CREATE TABLE IF NOT EXISTS common_names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    formula TEXT,
+    source TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS common_names_fts USING fts5(name, formula, tokenize='trigram');
+"""
+
+@functools.lru_cache(maxsize=65536)
+def canonical_smiles(smiles):
+    """Canonical SMILES without atom-map numbers, or None if RDKit cannot parse it"""
+    # Bounded memo: solvents and reagents repeat across most reactions in bulk files
+    try:
+        mol = Chem.MolFromSmiles(smiles)
+    except Exception:
+        mol = None
+    if mol is None:
+        return None
+    for atom in mol.GetAtoms():
+        atom.SetAtomMapNum(0)
+    return Chem.MolToSmiles(mol)
+
+def split_reaction_smiles(reaction_smiles):
+    """(reactant SMILES, product SMILES) lists of a reactants>agents>products string"""
+    parts = reaction_smiles.split()[0].split('>') if reaction_smiles and reaction_smiles.strip() else []
+    if len(parts) != 3:
+        return [], []
+    return [s for s in parts[0].split('.') if s], [s for s in parts[2].split('.') if s]
+
+def read_reaction_file(path):
+    """Yield reaction records from a reaction-SMILES, CSV, JSONL or named_reactions.json file"""
+    lower = path.lower()
+    with open(path, encoding='utf-8', newline='') as handle:
+        if lower.endswith('.json'):
+            for name, data in json.load(handle)['reactions'].items():
+                yield dict(data, name=name)
+        elif lower.endswith('.jsonl'):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        elif lower.endswith('.csv'):
+            for row in csv.DictReader(handle):
+                row = {key.strip().lower(): value for key, value in row.items() if key}
+                row.setdefault('reaction_smiles', row.get('reactionsmiles') or row.get('rxn_smiles'))
+                yield row
+        else:
+            # One reaction SMILES per line, optionally followed by a name (USPTO-style .rsmi)
+            for line in handle:
+                parts = line.rstrip('\r\n').split(None, 1)
+                if parts and not parts[0].startswith('#'):
+                    yield {'reaction_smiles': parts[0], 'name': parts[1].strip() if len(parts) > 1 else ''}
+
+def _batches(records, size):
+    iterator = iter(records)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _fts_query(terms, columns):
+    phrases = " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+    return "{" + " ".join(columns) + "} : (" + phrases + ")"
+
+def _like_pattern(term):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+class ReactionStore:
+    """On-disk compound and reaction store; one SQLite connection per thread"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._facets = None
+        self._facet_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+        self._update_facet_rows()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            # WAL lets app sessions keep reading while an import commits batches
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    # Import
+    def _insert_compounds(self, connection, batch, source):
+        for record in batch:
+            name = record.get('name') or record['smiles']
+            cursor = connection.execute(
+                "INSERT INTO compounds (name, smiles, canonical_smiles, class, source) VALUES (?, ?, ?, ?, ?)",
+                (name, record['smiles'], canonical_smiles(record['smiles']), record.get('class'), source))
+            synonyms = " ".join(normalize_search_text(s) for s in record.get('synonyms') or [])
+            connection.execute("INSERT INTO compounds_fts (rowid, name, synonyms) VALUES (?, ?, ?)",
+                               (cursor.lastrowid, normalize_search_text(name), synonyms))
+
+    def _insert_reactions(self, connection, batch, source):
+        for record in batch:
+            reaction_smiles = record.get('reaction_smiles') or None
+            reactant_smiles, product_smiles = split_reaction_smiles(reaction_smiles)
+            values = {
+                'name': record.get('name') or reaction_smiles or '',
+                'reaction_smiles': reaction_smiles,
+                'reactants': record.get('reactants') or '.'.join(reactant_smiles) or None,
+                'products': record.get('products') or '.'.join(product_smiles) or None,
+                'chemist': record.get('chemist') or None,
+                'year': int(record['year']) if str(record.get('year') or '').strip().isdigit() else None,
+                'description': record.get('description') or None,
+                'mechanism': record.get('mechanism') or None
+            }
+            cursor = connection.execute(
+                f"INSERT INTO reactions ({', '.join(REACTION_COLUMNS)}, source) "
+                f"VALUES ({', '.join('?' * len(REACTION_COLUMNS))}, ?)",
+                [values[column] for column in REACTION_COLUMNS] + [source])
+            reaction_id = cursor.lastrowid
+            connection.execute(
+                "INSERT INTO reactions_fts (rowid, name, chemist, reactants, products, description, mechanism) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [reaction_id] + [normalize_search_text(values[field] or '') for field in SEARCH_FIELDS])
+            molecules = [('reactant', s) for s in reactant_smiles] + [('product', s) for s in product_smiles]
+            rows = []
+            for role, smiles in molecules:
+                canonical = canonical_smiles(smiles)
+                if canonical:
+                    rows.append((reaction_id, role, canonical))
+            connection.executemany(
+                "INSERT INTO reaction_molecules (reaction_id, role, canonical_smiles) VALUES (?, ?, ?)", rows)
+            connection.executemany(
+                "INSERT INTO reaction_facets (reaction_id, facet, value) VALUES (?, ?, ?)",
+                [(reaction_id, facet, value) for facet, value in reaction_facet_values(values)])
+
+    def _insert_common_names(self, connection, batch, source):
+        for name, formula in batch:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO common_names (name, formula, source) VALUES (?, ?, ?)", (name, formula, source))
+            if cursor.rowcount:
+                connection.execute("INSERT INTO common_names_fts (rowid, name, formula) VALUES (?, ?, ?)",
+                                   (cursor.lastrowid, normalize_search_text(name), normalize_search_text(formula or '')))
+
+    def _import(self, insert, records, source, batch_size):
+        connection = self._connection()
+        imported = 0
+        for batch in _batches(records, batch_size):
+            with connection:
+                insert(connection, batch, source)
+            imported += len(batch)
+        return imported
+
+    def import_compounds(self, records, source, batch_size=IMPORT_BATCH_SIZE):
+        """Stream compound dicts (name, smiles, optional class/synonyms) in, committing per batch"""
+        return self._import(self._insert_compounds, records, source, batch_size)
+
+    def import_reactions(self, records, source, batch_size=IMPORT_BATCH_SIZE):
+        """Stream reaction dicts (reaction_smiles and/or named-reaction fields) in, committing per batch"""
+        return self._import(self._insert_reactions, records, source, batch_size)
+
+    def import_common_names(self, items, source, batch_size=IMPORT_BATCH_SIZE):
+        """Stream (common name, formula) pairs in; names already present are kept"""
+        return self._import(self._insert_common_names, items, source, batch_size)
+
+    def _delete_source(self, connection, source):
+        for table in ('compounds', 'reactions', 'common_names'):
+            connection.execute(f"DELETE FROM {table}_fts WHERE rowid IN (SELECT id FROM {table} WHERE source = ?)",
+                               (source,))
+        for table in ('reaction_molecules', 'reaction_facets'):
+            connection.execute(f"DELETE FROM {table} WHERE reaction_id IN "
+                               "(SELECT id FROM reactions WHERE source = ?)", (source,))
+        for table in ('compounds', 'reactions', 'common_names'):
+            connection.execute(f"DELETE FROM {table} WHERE source = ?", (source,))
+        # Deleted ids can be reused, so in-memory facet indexes must start over
+        self._bump_generation(connection)
+
+    def delete_source(self, source):
+        """Remove every record imported under a source name"""
+        connection = self._connection()
+        with connection:
+            self._delete_source(connection, source)
+
+    def sync_builtin(self):
+        """Reload the bundled data/*.json records if those files changed since the last sync"""
+        stamp = json.dumps([BUILTIN_SYNC_VERSION] + [data_stamp(key) for key in BUILTIN_DATA_KEYS])
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM meta WHERE key = 'builtin_stamp'").fetchone()
+        if row and row['value'] == stamp:
+            return False
+        data_files = get_data_files()
+        compounds = data_files['compounds'].get()
+        synonyms = {}
+        for synonym, name in compounds['synonyms'].items():
+            synonyms.setdefault(name, []).append(synonym)
+        with connection:
+            # IMMEDIATE takes the write lock up front so concurrent processes sync once
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT value FROM meta WHERE key = 'builtin_stamp'").fetchone()
+            if row and row['value'] == stamp:
+                return False
+            self._delete_source(connection, BUILTIN_SOURCE)
+            self._insert_compounds(connection, [
+                {'name': name, 'smiles': smiles, 'class': compounds['classes'].get(name), 'synonyms': synonyms.get(name)}
+                for name, smiles in compounds['smiles'].items()], BUILTIN_SOURCE)
+            self._insert_reactions(connection, [
+                dict(data, name=name) for name, data in data_files['named_reactions'].get().items()], BUILTIN_SOURCE)
+            self._insert_common_names(connection, list(data_files['common_names'].get().items()), BUILTIN_SOURCE)
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('builtin_stamp', ?)", (stamp,))
+        return True
+
+    # Facets
+    def _meta(self, connection, key):
+        row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _bump_generation(self, connection):
+        generation = int(self._meta(connection, 'reactions_generation') or 0) + 1
+        connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('reactions_generation', ?)",
+                           (str(generation),))
+
+    def _update_facet_rows(self):
+        """Recompute every reaction's facet rows when the classification changed (or predates this store)"""
+        connection = self._connection()
+        if self._meta(connection, 'facets_version') == str(FACETS_VERSION):
+            return
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            if self._meta(connection, 'facets_version') == str(FACETS_VERSION):
+                return
+            connection.execute("DELETE FROM reaction_facets")
+            select = connection.execute("SELECT id, name, chemist, year, description, mechanism FROM reactions")
+            while True:
+                rows = select.fetchmany(IMPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                connection.executemany(
+                    "INSERT INTO reaction_facets (reaction_id, facet, value) VALUES (?, ?, ?)",
+                    [(row['id'], facet, value) for row in rows for facet, value in reaction_facet_values(dict(row))])
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('facets_version', ?)",
+                               (str(FACETS_VERSION),))
+            self._bump_generation(connection)
+
+    def facet_index(self):
+        """In-memory FacetIndex over the stored reactions, extended with reactions added since the last call"""
+        connection = self._connection()
+        generation = self._meta(connection, 'reactions_generation')
+        with self._facet_lock:
+            index = self._facets
+            if index is None or index.generation != generation:
+                index = FacetIndex(generation)
+            reaction_ids = [row[0] for row in connection.execute(
+                "SELECT id FROM reactions WHERE id > ? ORDER BY id", (index.max_id,))]
+            if reaction_ids:
+                rows = connection.execute(
+                    "SELECT reaction_id, facet, value FROM reaction_facets WHERE reaction_id > ? AND reaction_id <= ?",
+                    (index.max_id, reaction_ids[-1])).fetchall()
+                index.add(reaction_ids, rows)
+                index.name_order = None
+            self._facets = index
+        return index
+
+    def _reactions_by_ids(self, ids):
+        placeholders = ', '.join('?' * len(ids))
+        rows = self._connection().execute(f"SELECT * FROM reactions WHERE id IN ({placeholders})", ids).fetchall()
+        by_id = {row['id']: dict(row) for row in rows}
+        return [by_id[reaction_id] for reaction_id in ids if reaction_id in by_id]
+
+    def _reaction_ids(self, query, fields):
+        """Ids of a text query's matches, best first"""
+        weights = ", ".join(str(SEARCH_FIELDS[field]) for field in SEARCH_FIELDS)
+        rows = self._text_search('reactions', list(SEARCH_FIELDS), query, fields, f"bm25(reactions_fts, {weights})",
+                                 "t.id", None, 0)
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+    def _name_order(self, index):
+        # Every reaction id in name order, kept with the facet index until reactions are added
+        order = index.name_order
+        if order is None:
+            rows = self._connection().execute("SELECT id FROM reactions ORDER BY name").fetchall()
+            order = index.name_order = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        return order
+
+    def _filtered_ids(self, index, query, fields, facets):
+        # (matching ids in result order, bitmap of the text matches or None)
+        has_query = bool(query and query.split())
+        ids = self._reaction_ids(query, fields) if has_query else self._name_order(index)
+        within = bitmap_of(ids) if has_query else None
+        if facets and any(facets.values()):
+            ids = ids[contains(index.select(facets), ids)]
+        return ids, within
+
+    def filter_reactions(self, query=None, fields=None, facets=None, limit=100, offset=0):
+        """(total, page of reaction dicts, facet counts) for a text query and/or facet filters.
+
+        facets maps facet names to the values to keep: values of one facet
+        are alternatives, different facets must all match. Matches come best
+        first for a query, else in name order; counts are those of
+        FacetIndex.counts within the query's matches.
+        """
+        index = self.facet_index()
+        ids, within = self._filtered_ids(index, query, fields, facets)
+        page = ids[offset:offset + limit].tolist()
+        return len(ids), self._reactions_by_ids(page) if page else [], index.counts(facets, within)
+
+    # Queries
+    def _text_search_sql(self, table, columns, query, fields, order, select, limit, offset):
+        terms = normalize_search_text(query).split()
+        # Trigram MATCH needs 3+ characters; shorter terms fall back to LIKE on the same columns
+        long_terms = [term for term in terms if len(term) >= 3]
+        short_terms = [term for term in terms if len(term) < 3]
+        fields = list(fields or columns)
+        sql = f"SELECT {select} FROM {table}_fts JOIN {table} t ON t.id = {table}_fts.rowid"
+        where = []
+        params = []
+        if long_terms:
+            where.append(f"{table}_fts MATCH ?")
+            params.append(_fts_query(long_terms, fields))
+        for term in short_terms:
+            where.append("(" + " OR ".join(f"{table}_fts.{field} LIKE ? ESCAPE '\\'" for field in fields) + ")")
+            params.extend([_like_pattern(term)] * len(fields))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if order and long_terms:
+            sql += f" ORDER BY {order}, t.name"
+        else:
+            sql += " ORDER BY t.name"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        return sql, params
+
+    def _text_search(self, table, columns, query, fields, order, select, limit, offset):
+        sql, params = self._text_search_sql(table, columns, query, fields, order, select, limit, offset)
+        return self._connection().execute(sql, params).fetchall()
+
+    def _iter_rows(self, sql, params, batch_size):
+        cursor = self._connection().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
+
+    def search_reactions(self, query, fields=None, limit=100, offset=0):
+        """Reaction dicts matching every query term, best match first"""
+        weights = ", ".join(str(SEARCH_FIELDS[field]) for field in SEARCH_FIELDS)
+        rows = self._text_search('reactions', list(SEARCH_FIELDS), query, fields, f"bm25(reactions_fts, {weights})",
+                                 "t.*", limit, offset)
+        return [dict(row) for row in rows]
+
+    def count_reactions(self, query=None, fields=None):
+        """Number of reactions, or of reactions matching a search query"""
+        if not query or not query.split():
+            return self._connection().execute("SELECT COUNT(*) FROM reactions").fetchone()[0]
+        return self._text_search('reactions', list(SEARCH_FIELDS), query, fields, None,
+                                 "COUNT(*)", None, 0)[0][0]
+
+    def list_reactions(self, limit=100, offset=0):
+        """Reaction dicts in name order, one page at a time"""
+        rows = self._connection().execute(
+            "SELECT * FROM reactions ORDER BY name LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _iter_ids(self, ids, batch_size):
+        for start in range(0, len(ids), batch_size):
+            yield from self._reactions_by_ids(ids[start:start + batch_size].tolist())
+
+    def iter_reactions(self, query=None, fields=None, batch_size=IMPORT_BATCH_SIZE, facets=None):
+        """Stream every reaction dict (or every match of a query and/or facets, as ordered by filter_reactions)"""
+        if facets and any(facets.values()):
+            ids, _ = self._filtered_ids(self.facet_index(), query, fields, facets)
+            # Bounded IN lists: SQLite caps the number of bound parameters
+            return self._iter_ids(ids, min(batch_size, FACET_FETCH_SIZE))
+        if not query or not query.split():
+            return self._iter_rows("SELECT * FROM reactions ORDER BY name", [], batch_size)
+        weights = ", ".join(str(SEARCH_FIELDS[field]) for field in SEARCH_FIELDS)
+        sql, params = self._text_search_sql('reactions', list(SEARCH_FIELDS), query, fields,
+                                            f"bm25(reactions_fts, {weights})", "t.*", None, 0)
+        return self._iter_rows(sql, params, batch_size)
+
+    def reactions_by_century(self):
+        """{century: count} over reactions with a known year, from the facet index's running counts"""
+        return {int(century): count for century, count in self.facet_index().counts()['century'].items() if count}
+
+    def find_reactions_by_smiles(self, smiles, role=None, limit=100):
+        """Reactions with the compound as a reactant or product (role: 'reactant'/'product')"""
+        canonical = canonical_smiles(smiles)
+        if canonical is None:
+            return []
+        sql = ("SELECT DISTINCT t.* FROM reaction_molecules m JOIN reactions t ON t.id = m.reaction_id "
+               "WHERE m.canonical_smiles = ?")
+        params = [canonical]
+        if role:
+            sql += " AND m.role = ?"
+            params.append(role)
+        sql += " ORDER BY t.name LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._connection().execute(sql, params).fetchall()]
+
+    def search_compounds(self, query, limit=50, offset=0):
+        """(name, SMILES) of compounds whose name or a synonym contains every query term"""
+        if not query or not query.split():
+            rows = self._connection().execute(
+                "SELECT name, smiles FROM compounds ORDER BY name LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        else:
+            rows = self._text_search('compounds', ['name', 'synonyms'], query, None, "compounds_fts.rank",
+                                     "t.name, t.smiles", limit, offset)
+        return [(row['name'], row['smiles']) for row in rows]
+
+    def iter_compounds(self, query=None, batch_size=IMPORT_BATCH_SIZE):
+        """Stream compound dicts (name, smiles, canonical_smiles, class, source), filtered like search_compounds"""
+        select = "t.name, t.smiles, t.canonical_smiles, t.class, t.source"
+        if not query or not query.split():
+            return self._iter_rows(f"SELECT {select} FROM compounds t ORDER BY t.name", [], batch_size)
+        sql, params = self._text_search_sql('compounds', ['name', 'synonyms'], query, None, "compounds_fts.rank",
+                                            select, None, 0)
+        return self._iter_rows(sql, params, batch_size)
+
+    def find_compounds_by_smiles(self, smiles, limit=50):
+        """(name, SMILES) of stored compounds with the same canonical structure"""
+        canonical = canonical_smiles(smiles)
+        if canonical is None:
+            return []
+        rows = self._connection().execute(
+            "SELECT name, smiles FROM compounds WHERE canonical_smiles = ? ORDER BY name LIMIT ?",
+            (canonical, limit)).fetchall()
+        return [(row['name'], row['smiles']) for row in rows]
+
+    def search_common_names(self, query=None, limit=None, offset=0):
+        """(common name, formula) pairs, filtered by name when a query is given"""
+        if not query or not query.split():
+            sql = "SELECT name, formula FROM common_names ORDER BY name"
+            params = []
+            if limit is not None:
+                sql += " LIMIT ? OFFSET ?"
+                params = [limit, offset]
+            rows = self._connection().execute(sql, params).fetchall()
+        else:
+            rows = self._text_search('common_names', ['name', 'formula'], query, ['name'], "common_names_fts.rank",
+                                     "t.name, t.formula", limit, offset)
+        return [(row['name'], row['formula']) for row in rows]
+
+    def stats(self):
+        connection = self._connection()
+        return {
+            table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('compounds', 'reactions', 'common_names')
+        }
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_reaction_store(path=None):
+    """Shared store for a database path (default ORGSYN_STORE_PATH), synced when the bundled data files change.
+
+    One store per path for the life of the process: each keeps a SQLite
+    connection per thread, which a fresh store per data change would leak.
+    """
+    path = os.path.abspath(path or STORE_PATH)
+    with _stores_lock:
+        entry = _stores.get(path)
+        if entry is None:
+            entry = _stores[path] = {'store': ReactionStore(path), 'stamp': None}
+    stamp = tuple(data_stamp(key) for key in BUILTIN_DATA_KEYS)
+    if entry['stamp'] != stamp:
+        entry['store'].sync_builtin()
+        entry['stamp'] = stamp
+    return entry['store']
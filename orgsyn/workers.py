@@ -0,0 +1,56 @@
+"""Process pools and chunked scheduling shared by the batch helpers"""
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+def pool_context():
+    """forkserver where available, else spawn.
+
+    fork copies a threaded parent (the Streamlit server, the API's thread
+    pool) along with any locks its other threads hold, which can deadlock the
+    child; these start methods give each worker a fresh interpreter.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def process_pool(workers):
+    """ProcessPoolExecutor whose workers start from pool_context()"""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+
+def chunked(iterable, size):
+    """Successive lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def map_chunks(function, iterable, chunk_size, workers=None, args=()):
+    """Yield function(chunk, *args) for successive chunks of iterable, in input order.
+
+    Runs inline for one worker or when the input fits in a single chunk;
+    otherwise over a process pool with at most two chunks per worker in
+    flight, so memory stays bounded however long the input is. function
+    must be picklable (defined at module level).
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(iterable, chunk_size)
+    first = next(chunks, None)
+    if first is None:
+        return
+    if workers == 1 or len(first) < chunk_size:
+        for chunk in itertools.chain([first], chunks):
+            yield function(chunk, *args)
+        return
+
+    with process_pool(workers) as pool:
+        pending = deque()
+        for chunk in itertools.chain([first], chunks):
+            pending.append(pool.submit(function, chunk, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,49 @@
+"""Predict reaction products for a list of compounds from the reaction templates.
+
+Usage:
+    python predict_products.py library.smi -o predictions.jsonl
+    python predict_products.py library.csv -o predictions.jsonl --reactions oxidation,reduction --workers 8
+
+Input is .smi, .csv or compounds.json-style, as for ORGSYN_COMPOUND_FILES.
+Each output line holds the input name and SMILES plus one entry per distinct
+product: reaction type, template name, reagents and product SMILES. The
+templates come from data/reaction_templates.json.
+"""
+import argparse
+import json
+import sys
+import time
+from collections import deque
+
+from orgsyn.molstore import read_compound_file
+from orgsyn.prediction import PREDICTION_CHUNK_SIZE, iter_predictions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict products for every compound in a file")
+    parser.add_argument('input', help="compounds file (.smi, .csv or .json)")
+    parser.add_argument('-o', '--output', required=True, help="predictions file (JSONL)")
+    parser.add_argument('--reactions', help="comma-separated reaction types (default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=PREDICTION_CHUNK_SIZE, help="compounds per worker task")
+    args = parser.parse_args(argv)
+    reaction_types = [r.strip() for r in args.reactions.split(',') if r.strip()] if args.reactions else None
+
+    # Rows come back in input order, so names queue up alongside the SMILES stream
+    names = deque()
+    def smiles_stream():
+        for name, smiles in read_compound_file(args.input):
+            names.append(name)
+            yield smiles
+
+    start = time.perf_counter()
+    written = products = 0
+    with open(args.output, 'w', encoding='utf-8') as out:
+        for row in iter_predictions(smiles_stream(), reaction_types, args.workers, args.chunk_size):
+            out.write(json.dumps({'name': names.popleft(), **row}, ensure_ascii=False) + '\n')
+            written += 1
+            products += len(row['predictions'])
+    elapsed = time.perf_counter() - start
+    print(f"Predicted {products} products for {written} compounds in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
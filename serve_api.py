@@ -0,0 +1,48 @@
+"""Serve reaction search, problem parsing/solving, properties and structure images over HTTP/JSON.
+
+Usage:
+    python serve_api.py
+    python serve_api.py --host 0.0.0.0 --port 8080 --workers 8
+    curl 'http://127.0.0.1:8000/properties?smiles=CCO'
+    curl -d '{"problem": "Benzene on nitration gives Compound A"}' http://127.0.0.1:8000/solve
+
+A single asyncio process answers every client, so other tools can call the
+same logic as the Streamlit apps without a Streamlit session each. RDKit
+work runs on a process pool; concurrent requests are micro-batched (up to
+--batch-size items, waiting at most --batch-window ms for more) and
+identical requests in flight share one computation. See orgsyn/api.py for
+the endpoints and their parameters.
+"""
+import argparse
+import asyncio
+import sys
+
+from orgsyn.api import API_HOST, API_PORT, API_THREADS, API_WORKERS, BATCH_SIZE, BATCH_WINDOW, ApiServer
+
+async def serve(server, host, port):
+    await server.start(host, port)
+    print(f"Serving the orgsyn API on http://{host}:{port} ({server.workers} worker(s))", file=sys.stderr)
+    await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the orgsyn HTTP/JSON API")
+    parser.add_argument('--host', default=API_HOST, help=f"interface to bind (default: {API_HOST})")
+    parser.add_argument('--port', type=int, default=API_PORT, help=f"port to bind (default: {API_PORT})")
+    parser.add_argument('--workers', type=int, default=API_WORKERS,
+                        help="RDKit worker processes; 1 runs RDKit on the thread pool (default: CPU count)")
+    parser.add_argument('--threads', type=int, default=API_THREADS, help="threads for search and parsing")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="most requests per worker task")
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000,
+                        help="ms to wait for more requests before dispatching a batch")
+    args = parser.parse_args(argv)
+
+    server = ApiServer(args.workers, args.threads, args.batch_size, args.batch_window / 1000)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
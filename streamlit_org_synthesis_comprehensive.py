@@ -1,379 +1,348 @@
 import streamlit as st
-from rdkit import Chem
-from rdkit.Chem import Draw, Descriptors, AllChem
-from rdkit.Chem.Draw import MolDraw2DCairo
 import pandas as pd
-import re
-import io
-from PIL import Image
 
-# Compound Database
-def get_compound_database():
-    return {
-        # Alcohols
-        'benzyl alcohol': 'c1ccccc1CO',
-        'ethanol': 'CCO',
-        'methanol': 'CO',
-        'cyclohexanol': 'OC1CCCCC1',
-        'isopropanol': 'CC(C)O',
-        
-        # Aldehydes
-        'benzaldehyde': 'c1ccccc1C=O',
-        'acetaldehyde': 'CC=O',
-        'formaldehyde': 'C=O',
-        'propionaldehyde': 'CCC=O',
-        
-        # Carboxylic acids
-        'benzoic acid': 'c1ccccc1C(=O)O',
-        'acetic acid': 'CC(=O)O',
-        'formic acid': 'OC=O',
-        'propionic acid': 'CCC(=O)O',
-        
-        # Ketones
-        'acetophenone': 'CC(=O)c1ccccc1',
-        'acetone': 'CC(=O)C',
-        'cyclohexanone': 'O=C1CCCCC1',
-        'butanone': 'CCC(=O)C',
-        
-        # Aromatic compounds
-        'toluene': 'Cc1ccccc1',
-        'benzene': 'c1ccccc1',
-        'phenol': 'Oc1ccccc1',
-        'aniline': 'Nc1ccccc1',
-        'nitrobenzene': 'O=[N+]([O-])c1ccccc1',
-        'bromobenzene': 'Brc1ccccc1',
-        'chlorobenzene': 'Clc1ccccc1',
-        'iodobenzene': 'Ic1ccccc1',
-        'anisole': 'COc1ccccc1',
-        
-        # Esters and derivatives
-        'methyl benzoate': 'COC(=O)c1ccccc1',
-        'ethyl acetate': 'CCOC(=O)C',
-        'acetanilide': 'CC(=O)Nc1ccccc1',
-        'acetyl chloride': 'CC(=O)Cl',
-        'acetic anhydride': 'CC(=O)OC(=O)C',
-        
-        # Amines and amides
-        'methylamine': 'CN',
-        'dimethylamine': 'CNC',
-        'trimethylamine': 'CN(C)C',
-        'acetamide': 'CC(=O)N',
-        
-        # Alkenes and alkanes
-        'ethylene': 'C=C',
-        'acetylene': 'C#C',
-        'cyclohexane': 'C1CCCCC1',
-        'hexane': 'CCCCCC'
-    }
+from orgsyn import metrics
+from orgsyn.cache import get_image_cache, get_molecule_cache
+from orgsyn.chemistry import (
+    DEFAULT_IMAGE_FORMAT, IMAGE_FORMATS, calculate_molecular_properties,
+    create_reaction_flow_diagram, draw_molecule, get_compound_name, prefetch_pathways, start_render_pool,
+    validate_smiles
+)
+from orgsyn.data import get_compound_database, get_reaction_pathways, get_reaction_templates
+from orgsyn.descriptors import DESCRIPTOR_COLUMNS, DESCRIPTOR_LABELS, get_descriptor_table
+from orgsyn.export import (
+    EXPORT_MIME_TYPES, available_formats, export_bytes, export_compounds, export_pathways, export_rows
+)
+from orgsyn.fingerprints import describe_compound_name, get_similarity_index, get_substructure_index
+from orgsyn.parsing import find_compound_mentions, get_name_index, parse_problem
+from orgsyn.prediction import predict_products
+from orgsyn.solver import describe_route, find_problem_routes, solve_chemistry_problem
+from orgsyn.store import get_reaction_store
 
-# Enhanced Reaction Pathways
-def get_reaction_pathways():
-    return {
-        'oxidation': [
-            {
-                'name': 'Primary Alcohol Oxidation',
-                'A': 'c1ccccc1CO',      # Benzyl alcohol
-                'B': 'c1ccccc1C=O',     # Benzaldehyde
-                'C': 'c1ccccc1C(=O)O',  # Benzoic acid
-                'description': 'Primary alcohol → Aldehyde → Carboxylic acid',
-                'reagents': ['KMnO₄', 'K₂Cr₂O₇/H₂SO₄', 'Jones reagent'],
-                'mechanism': 'Stepwise oxidation via chromate ester intermediate'
-            },
-            {
-                'name': 'Toluene Oxidation',
-                'A': 'Cc1ccccc1',       # Toluene
-                'B': 'c1ccccc1C=O',     # Benzaldehyde
-                'C': 'c1ccccc1C(=O)O',  # Benzoic acid
-                'description': 'Alkyl benzene → Aldehyde → Carboxylic acid',
-                'reagents': ['KMnO₄', 'Heat', 'Co/Mn catalysts'],
-                'mechanism': 'Radical mechanism with benzylic hydrogen abstraction'
-            },
-            {
-                'name': 'Alkene Oxidation',
-                'A': 'C=CC',           # Propene
-                'B': 'CC(=O)C',        # Acetone
-                'description': 'Alkene → Ketone (Ozonolysis)',
-                'reagents': ['O₃, then Zn/H₂O'],
-                'mechanism': 'Ozonolysis followed by reductive workup'
-            }
-        ],
-        'reduction': [
-            {
-                'name': 'Nitro Reduction',
-                'A': 'c1ccccc1',           # Benzene
-                'B': 'O=[N+]([O-])c1ccccc1', # Nitrobenzene
-                'C': 'Nc1ccccc1',          # Aniline
-                'description': 'Benzene → Nitrobenzene → Aniline',
-                'reagents': ['HNO₃/H₂SO₄', 'Sn/HCl', 'Fe/HCl', 'H₂/Pd'],
-                'mechanism': 'Electrophilic aromatic substitution followed by nitro reduction'
-            },
-            {
-                'name': 'Carbonyl Reduction',
-                'A': 'CC(=O)c1ccccc1',     # Acetophenone
-                'B': 'CC(O)c1ccccc1',      # 1-Phenylethanol
-                'description': 'Ketone → Secondary alcohol',
-                'reagents': ['NaBH₄', 'LiAlH₄'],
-                'mechanism': 'Nucleophilic addition of hydride ion'
-            },
-            {
-                'name': 'Carboxylic Acid Reduction',
-                'A': 'c1ccccc1C(=O)O',     # Benzoic acid
-                'B': 'c1ccccc1CO',         # Benzyl alcohol
-                'description': 'Carboxylic acid → Primary alcohol',
-                'reagents': ['LiAlH₄', 'BH₃'],
-                'mechanism': 'Nucleophilic acyl substitution followed by reduction'
-            }
-        ],
-        'esterification': [
-            {
-                'name': 'Fischer Esterification',
-                'A': 'c1ccccc1C(=O)O',     # Benzoic acid
-                'B': 'COC(=O)c1ccccc1',    # Methyl benzoate
-                'description': 'Carboxylic acid → Ester',
-                'reagents': ['CH₃OH/H₂SO₄', 'Heat', 'Acid catalyst'],
-                'mechanism': 'Nucleophilic acyl substitution with acid catalysis'
-            },
-            {
-                'name': 'Acyl Chloride Route',
-                'A': 'c1ccccc1C(=O)O',     # Benzoic acid
-                'B': 'CC(=O)Cl',           # Acetyl chloride (intermediate)
-                'C': 'COC(=O)c1ccccc1',    # Methyl benzoate
-                'description': 'Acid → Acyl chloride → Ester',
-                'reagents': ['SOCl₂', 'CH₃OH'],
-                'mechanism': 'Conversion to acyl chloride followed by alcoholysis'
-            }
-        ],
-        'hydrolysis': [
-            {
-                'name': 'Ester Hydrolysis',
-                'A': 'COC(=O)c1ccccc1',    # Methyl benzoate
-                'B': 'c1ccccc1C(=O)O',     # Benzoic acid
-                'description': 'Ester → Carboxylic acid',
-                'reagents': ['NaOH/H₂O', 'H₃O⁺'],
-                'mechanism': 'Nucleophilic acyl substitution (basic or acidic)'
-            },
-            {
-                'name': 'Amide Hydrolysis',
-                'A': 'CC(=O)Nc1ccccc1',    # Acetanilide
-                'B': 'Nc1ccccc1',          # Aniline
-                'C': 'CC(=O)O',            # Acetic acid
-                'description': 'Amide → Amine + Carboxylic acid',
-                'reagents': ['NaOH/H₂O', 'H₃O⁺', 'Heat'],
-                'mechanism': 'Nucleophilic acyl substitution under vigorous conditions'
-            }
-        ],
-        'acetylation': [
-            {
-                'name': 'Amine Acetylation',
-                'A': 'Nc1ccccc1',          # Aniline
-                'B': 'CC(=O)Nc1ccccc1',    # Acetanilide
-                'description': 'Amine → Amide',
-                'reagents': ['Acetic anhydride', 'Pyridine', 'Acetyl chloride'],
-                'mechanism': 'Nucleophilic acyl substitution'
-            },
-            {
-                'name': 'Alcohol Acetylation',
-                'A': 'c1ccccc1CO',         # Benzyl alcohol
-                'B': 'COC(=O)c1ccccc1',    # Benzyl acetate
-                'description': 'Alcohol → Ester',
-                'reagents': ['Acetic anhydride', 'Acetyl chloride', 'Pyridine'],
-                'mechanism': 'Nucleophilic acyl substitution'
-            }
-        ],
-        'halogenation': [
-            {
-                'name': 'Aromatic Bromination',
-                'A': 'c1ccccc1',           # Benzene
-                'B': 'Brc1ccccc1',         # Bromobenzene
-                'description': 'Benzene → Bromobenzene',
-                'reagents': ['Br₂/FeBr₃'],
-                'mechanism': 'Electrophilic aromatic substitution'
-            },
-            {
-                'name': 'Alkene Bromination',
-                'A': 'C=CC',               # Propene
-                'B': 'CC(Br)CBr',          # 1,2-dibromopropane
-                'description': 'Alkene → Dibromide',
-                'reagents': ['Br₂/CCl₄'],
-                'mechanism': 'Electrophilic addition via bromonium ion'
-            },
-            {
-                'name': 'Free Radical Bromination',
-                'A': 'CCCC',               # Butane
-                'B': 'CCC(C)Br',           # 2-bromobutane
-                'description': 'Alkane → Alkyl bromide',
-                'reagents': ['Br₂/hv'],
-                'mechanism': 'Free radical chain reaction'
-            }
-        ],
-        'nitration': [
-            {
-                'name': 'Aromatic Nitration',
-                'A': 'c1ccccc1',           # Benzene
-                'B': 'O=[N+]([O-])c1ccccc1', # Nitrobenzene
-                'description': 'Benzene → Nitrobenzene',
-                'reagents': ['HNO₃/H₂SO₄'],
-                'mechanism': 'Electrophilic aromatic substitution via nitronium ion'
-            }
-        ],
-        'alkylation': [
-            {
-                'name': 'Friedel-Crafts Alkylation',
-                'A': 'c1ccccc1',           # Benzene
-                'B': 'CCc1ccccc1',         # Ethylbenzene
-                'description': 'Benzene → Alkylbenzene',
-                'reagents': ['CH₃CH₂Cl/AlCl₃'],
-                'mechanism': 'Electrophilic aromatic substitution via carbocation'
-            }
-        ],
-        'acylation': [
-            {
-                'name': 'Friedel-Crafts Acylation',
-                'A': 'c1ccccc1',           # Benzene
-                'B': 'CC(=O)c1ccccc1',     # Acetophenone
-                'description': 'Benzene → Ketone',
-                'reagents': ['CH₃COCl/AlCl₃'],
-                'mechanism': 'Electrophilic aromatic substitution via acylium ion'
-            }
-        ],
-        'grignard': [
-            {
-                'name': 'Grignard with Carbonyl',
-                'A': 'Brc1ccccc1',         # Bromobenzene
-                'B': 'C=O',                # Formaldehyde
-                'C': 'COc1ccccc1',         # Benzyl alcohol
-                'description': 'Aryl halide → Grignard → Alcohol',
-                'reagents': ['Mg/ether', 'HCHO', 'H₃O⁺'],
-                'mechanism': 'Formation of Grignard reagent followed by nucleophilic addition'
-            }
-        ]
-    }
+PATHWAY_PAGE_SIZES = [5, 10, 25]
+COMPOUND_LOOKUP_LIMIT = 50
+PREDICTIONS_SHOWN = 5
+FILTER_RESULTS_SHOWN = 200
 
-# Advanced Functions
-def validate_smiles(smiles):
-    try:
-        mol = Chem.MolFromSmiles(smiles)
-        return mol is not None
-    except:
-        return False
+def export_download(label, export, file_stem, key):
+    """Format picker and a download button; the export only runs when the button is clicked"""
+    format_col, button_col = st.columns([1, 2])
+    fmt = format_col.selectbox("Export format:", available_formats(), format_func=str.upper,
+                               key=f"{key}_format", label_visibility="collapsed")
+    button_col.download_button(label, data=lambda: export_bytes(export, fmt), file_name=f"{file_stem}.{fmt}",
+                               mime=EXPORT_MIME_TYPES[fmt], key=key, on_click="ignore")
 
-def get_compound_name(smiles):
-    database = get_compound_database()
-    for name, smi in database.items():
-        if smi == smiles:
-            return name.title()
-    return "Unknown compound"
+# Fragments: each reruns on its own when one of its widgets changes
+@st.fragment
+def smiles_analyzer(show_properties, image_format):
+    """Sidebar SMILES validator with structure, neighbours and properties"""
+    test_smiles = st.text_input("Analyze SMILES:", "c1ccccc1C(=O)O")
+    if test_smiles:
+        if validate_smiles(test_smiles):
+            st.success("✅ Valid SMILES")
+            img = draw_molecule(test_smiles, (200, 200), fmt=image_format)
+            if img:
+                st.image(img, caption=get_compound_name(test_smiles))
+            
+            # Closest known compounds
+            if get_compound_name(test_smiles) == "Unknown compound":
+                neighbours = get_similarity_index().nearest(test_smiles, k=3, threshold=0.2)
+                if neighbours:
+                    st.write("*Closest Known Compounds:*")
+                    for name, _, score in neighbours:
+                        st.write(f"- {name.title()} (Tanimoto {score:.2f})")
+            
+            if show_properties:
+                properties = calculate_molecular_properties(test_smiles)
+                if properties:
+                    st.write("*Molecular Properties:*")
+                    for prop, value in properties.items():
+                        st.write(f"- {prop}: {value}")
+        else:
+            st.error("❌ Invalid SMILES")
 
-def draw_molecule(smiles, size=(300, 300)):
-    try:
-        mol = Chem.MolFromSmiles(smiles)
-        if mol:
-            return Draw.MolToImage(mol, size=size)
-    except:
-        return None
-    return None
+@st.fragment
+def compound_lookup(image_format):
+    """Sidebar structure lookup for a stored compound"""
+    store = get_reaction_store()
+    lookup_filter = st.text_input("Filter compounds:", placeholder="e.g., alcohol")
+    matches = store.search_compounds(lookup_filter, limit=COMPOUND_LOOKUP_LIMIT)
+    if not matches and lookup_filter.strip():
+        # Nothing contains the text as typed: offer the closest spellings instead
+        database = get_compound_database()
+        close_names = dict.fromkeys(name for _, (kind, name), _ in get_name_index().search(lookup_filter)
+                                    if kind == 'compound')
+        matches = [(name, database[name]) for name in close_names]
+        if matches:
+            st.caption(f"No exact match; showing close spellings of \"{lookup_filter}\"")
+    compound_query = st.selectbox("Select compound:", matches, format_func=lambda match: match[0])
+    if compound_query:
+        name, smiles = compound_query
+        st.write(f"*SMILES:* {smiles}")
+        img = draw_molecule(smiles, (150, 150), fmt=image_format)
+        if img:
+            st.image(img, caption=name.title())
+        reactions = store.find_reactions_by_smiles(smiles, limit=COMPOUND_LOOKUP_LIMIT)
+        if reactions:
+            st.write(f"*Stored Reactions:* {', '.join(reaction['name'] for reaction in reactions[:5])}"
+                     + (f" (+{len(reactions) - 5} more)" if len(reactions) > 5 else ""))
+    export_download("⬇ Compounds", lambda path, fmt: export_compounds(path, fmt, lookup_filter),
+                    "compounds", "export_compounds")
 
-def calculate_molecular_properties(smiles):
-    """Calculate molecular properties using RDKit"""
-    try:
-        mol = Chem.MolFromSmiles(smiles)
-        if mol:
-            return {
-                'Molecular Weight': f"{Descriptors.MolWt(mol):.2f} g/mol",
-                'Formula': Chem.rdMolDescriptors.CalcMolFormula(mol),
-                'Heavy Atoms': mol.GetNumHeavyAtoms(),
-                'Rotatable Bonds': Descriptors.NumRotatableBonds(mol),
-                'H-Bond Donors': Descriptors.NumHDonors(mol),
-                'H-Bond Acceptors': Descriptors.NumHAcceptors(mol),
-                'LogP': f"{Descriptors.MolLogP(mol):.2f}",
-                'TPSA': f"{Descriptors.TPSA(mol):.2f} Å²"
-            }
-    except:
-        return {}
-    return {}
+@st.fragment
+def substructure_search():
+    """Sidebar SMARTS search over the compound library"""
+    smarts_query = st.text_input("Compounds containing (SMARTS):", placeholder="e.g., c1ccccc1C(=O)O")
+    if smarts_query:
+        try:
+            hits = get_substructure_index().search(smarts_query)
+        except ValueError as exc:
+            st.error(f"❌ {exc}")
+        else:
+            st.write(f"*{len(hits)} compound(s) found*")
+            if hits:
+                st.dataframe(pd.DataFrame(hits, columns=["Name", "SMILES"]), use_container_width=True)
 
-def parse_problem(problem_text):
-    """Enhanced problem parsing with better pattern matching"""
-    problem_lower = problem_text.lower()
-    
-    # Identify compounds mentioned
-    compounds_found = {}
-    database = get_compound_database()
-    
-    # Look for compound names
-    for name, smiles in database.items():
-        if name in problem_lower:
-            compounds_found[name] = smiles
+@st.fragment
+def cache_statistics():
+    """Molecule and image cache counters, refreshable without a full rerun"""
+    with st.expander("🗄 Molecule Cache"):
+        cache_stats = get_molecule_cache().stats()
+        st.write(f"*Entries:* {cache_stats['entries']} ({cache_stats['bytes'] / 1024:.0f} KB)")
+        st.write(f"*Hits / Misses:* {cache_stats['hits']} / {cache_stats['misses']}")
+        st.write(f"*Hit Rate:* {cache_stats['hit_rate']:.1%}")
+        image_stats = get_image_cache().stats()
+        st.write(f"*Images:* {image_stats['memory_entries']} in memory ({image_stats['memory_bytes'] / 1024:.0f} KB)")
+        st.write(f"*Image Hits (memory / disk) / Misses:* {image_stats['memory_hits']} / {image_stats['disk_hits']} / {image_stats['misses']}")
+        st.button("Refresh", key="refresh_cache_stats")
+
+@st.fragment
+def performance_panel():
+    """Per-stage timings and cache hit rates; only shown with ?debug=1 or ORGSYN_METRICS=1"""
+    with st.expander("⏱ Performance", expanded=True):
+        recording = st.toggle("Record stage timings", value=metrics.is_enabled())
+        if recording and not metrics.is_enabled():
+            metrics.enable()
+        elif not recording and metrics.is_enabled():
+            metrics.disable()
+        rows = metrics.get_metrics().snapshot()
+        if rows:
+            st.dataframe(pd.DataFrame(rows).set_index('stage'), use_container_width=True)
+        else:
+            st.write("No stages recorded yet.")
+        refresh_col, reset_col = st.columns(2)
+        refresh_col.button("Refresh", key="refresh_metrics")
+        if reset_col.button("Reset", key="reset_metrics"):
+            metrics.get_metrics().reset()
+            st.rerun(scope="fragment")
+        if metrics.METRICS_FILE:
+            st.caption(f"Written every {metrics.METRICS_INTERVAL:.0f}s to {metrics.METRICS_FILE}")
+
+@metrics.timed('render_pathway')
+def render_pathway(pathway, show_properties, show_mechanism, show_flow_diagram, image_format):
+    """Compound table, structures and details for one pathway"""
+    # Enhanced compound table
+    results_data = []
+    for compound in ['A', 'B', 'C']:
+        if compound in pathway:
+            smiles = pathway[compound]
+            results_data.append({
+                'Compound': compound,
+                'SMILES': smiles,
+                'Name': describe_compound_name(smiles),
+                'Valid': '✅' if validate_smiles(smiles) else '❌'
+            })
     
-    # Look for compound patterns (A, B, C)
-    compound_pattern = r'compound\s+([A-Z])'
-    matches = re.finditer(compound_pattern, problem_lower)
-    for match in matches:
-        compounds_found[match.group(1)] = None
+    # Display enhanced table
+    if results_data:
+        df = pd.DataFrame(results_data)
+        st.table(df)
+        
+        # Reaction flow diagram
+        if show_flow_diagram:
+            st.write("*Reaction Flow:*")
+            flow_img = create_reaction_flow_diagram(pathway, fmt=image_format)
+            if flow_img:
+                st.image(flow_img, use_column_width=True)
+        
+        # Molecular structures with properties
+        st.write("*Molecular Analysis:*")
+        compounds_to_draw = [c for c in ['A', 'B', 'C'] if c in pathway]
+        cols = st.columns(len(compounds_to_draw))
+        
+        for idx, compound in enumerate(compounds_to_draw):
+            smiles = pathway[compound]
+            with cols[idx]:
+                st.write(f"*Compound {compound}*")
+                img = draw_molecule(smiles, (200, 200), fmt=image_format)
+                if img:
+                    st.image(img, caption=get_compound_name(smiles))
+                
+                if show_properties:
+                    props = calculate_molecular_properties(smiles)
+                    if props:
+                        st.write(f"*MW:* {props['Molecular Weight']}")
+                        st.write(f"*Formula:* {props['Formula']}")
     
-    # Identify reaction types with better matching
-    reactions_found = []
-    reaction_keywords = {
-        'oxidation': ['oxid'],
-        'reduction': ['reduc'],
-        'esterification': ['esterif'],
-        'hydrolysis': ['hydrolys'],
-        'acetylation': ['acetylat'],
-        'halogenation': ['halogenat', 'bromin', 'chlorin'],
-        'nitration': ['nitrat'],
-        'alkylation': ['alkylat'],
-        'acylation': ['acylat'],
-        'grignard': ['grignard']
-    }
+    # Enhanced pathway details
+    st.info(f"*Description:* {pathway['description']}")
     
-    for reaction_type, keywords in reaction_keywords.items():
-        for keyword in keywords:
-            if keyword in problem_lower:
-                reactions_found.append(reaction_type)
-                break
+    if 'reagents' in pathway:
+        st.write("🧪 Typical Reagents:")
+        for reagent in pathway['reagents']:
+            st.write(f"- {reagent}")
     
-    return compounds_found, reactions_found
+    if show_mechanism and 'mechanism' in pathway:
+        st.write("🔬 Reaction Mechanism:")
+        st.write(pathway['mechanism'])
 
-def solve_chemistry_problem(problem_text, selected_reactions=None):
-    """Enhanced problem solving with better matching"""
-    if selected_reactions is None:
-        selected_reactions = ['oxidation']
+@st.fragment
+def pathway_results(analysis, show_properties, show_mechanism, show_flow_diagram, image_format):
+    """Paginated pathway expanders; a body only renders while its expander is open"""
+    pathways = analysis['pathways']
+    if not pathways:
+        st.warning("No route links the compounds parsed from the problem. Try naming the starting material "
+                   "or product.")
+        return
+    if pathways[0].get('outside_selection'):
+        st.info("No route uses only the selected reaction types; showing routes that need other reaction types.")
     
-    all_pathways = get_reaction_pathways()
-    relevant_pathways = []
+    page_size = PATHWAY_PAGE_SIZES[0]
+    page = 1
+    if len(pathways) > PATHWAY_PAGE_SIZES[0]:
+        size_col, page_col = st.columns(2)
+        with size_col:
+            page_size = st.selectbox("Pathways per page:", PATHWAY_PAGE_SIZES, key="pathway_page_size")
+        page_count = -(-len(pathways) // page_size)
+        page_key = f"pathway_page_{analysis['run']}"
+        if st.session_state.get(page_key, 1) > page_count:
+            st.session_state[page_key] = page_count
+        with page_col:
+            page = st.number_input("Page:", min_value=1, max_value=page_count, key=page_key)
     
-    # Get pathways for selected reaction types
-    for reaction_type in selected_reactions:
-        if reaction_type in all_pathways:
-            relevant_pathways.extend(all_pathways[reaction_type])
+    first = (page - 1) * page_size
+    shown = pathways[first:first + page_size]
+    st.caption(f"Showing pathways {first + 1}–{first + len(shown)} of {len(pathways)}")
+    export_download(f"⬇ Export {len(pathways)} pathway(s) with properties",
+                    lambda path, fmt: export_pathways(path, fmt, pathways), "pathways",
+                    f"export_pathways_{analysis['run']}")
+    expanders = []
+    for i, pathway in enumerate(shown, first):
+        steps = len([c for c in ['A', 'B', 'C'] if c in pathway])
+        expander = st.expander(
+            f"Pathway {i+1}: {pathway['name']} ({steps} steps)",
+            expanded=(i == 0),
+            key=f"pathway_{analysis['run']}_{i}",
+            on_change="rerun"
+        )
+        expanders.append((expander, pathway))
     
-    return relevant_pathways
+    # Draw and profile every open pathway's compounds in parallel, then lay them out from the caches
+    open_pathways = [pathway for expander, pathway in expanders if expander.open]
+    prefetch_pathways(open_pathways, image_format, with_properties=show_properties, with_flow=show_flow_diagram)
+    for expander, pathway in expanders:
+        if expander.open:
+            with expander:
+                render_pathway(pathway, show_properties, show_mechanism, show_flow_diagram, image_format)
 
-def create_reaction_flow_diagram(pathway):
-    """Create a visual reaction flow diagram"""
-    compounds = []
-    labels = []
-    
-    for comp in ['A', 'B', 'C']:
-        if comp in pathway:
-            compounds.append(pathway[comp])
-            labels.append(f"Compound {comp}\n{get_compound_name(pathway[comp])}")
-    
-    if len(compounds) >= 2:
-        try:
-            # Create a grid of molecules
-            mols = [Chem.MolFromSmiles(smiles) for smiles in compounds]
-            img = Draw.MolsToGridImage(
-                mols, 
-                molsPerRow=len(compounds),
-                subImgSize=(300, 300),
-                legends=labels,
-                returnPNG=False
-            )
-            return img
-        except:
-            return None
-    return None
+@st.fragment
+def property_calculator(image_format):
+    """Property table and structure for a SMILES string"""
+    st.markdown("### 📊 Molecular Property Calculator")
+    prop_smiles = st.text_input("Enter SMILES for property calculation:", "CCO")
+    if prop_smiles and validate_smiles(prop_smiles):
+        properties = calculate_molecular_properties(prop_smiles)
+        if properties:
+            st.write("*Calculated Properties:*")
+            for prop, value in properties.items():
+                st.write(f"- *{prop}:* {value}")
+            img = draw_molecule(prop_smiles, (200, 200), fmt=image_format)
+            if img:
+                st.image(img, caption=get_compound_name(prop_smiles))
+
+@st.fragment
+def product_prediction(reaction_types, default_reactions, image_format):
+    """Template-based forward prediction for any SMILES"""
+    st.markdown("### 🔮 Product Prediction")
+    predict_col1, predict_col2 = st.columns([1, 2])
+    with predict_col1:
+        start_smiles = st.text_input("Starting material (SMILES):", "c1ccccc1CO")
+        chosen = st.multiselect("Reaction types:", reaction_types, default=[r for r in default_reactions if r in reaction_types])
+    with predict_col2:
+        if start_smiles and not validate_smiles(start_smiles):
+            st.error("❌ Invalid SMILES")
+        elif start_smiles:
+            predictions = predict_products(start_smiles, chosen)
+            if not predictions:
+                st.write("No template applies to this molecule for the selected reactions.")
+            else:
+                st.dataframe(pd.DataFrame([{
+                    'Reaction': prediction['reaction_type'].title(),
+                    'Template': prediction['template'],
+                    'Reagents': prediction['reagents'],
+                    'Product': prediction['product'],
+                    'Name': describe_compound_name(prediction['product'])
+                } for prediction in predictions]), use_container_width=True)
+                cols = st.columns(min(len(predictions), 4))
+                for col, prediction in zip(cols, predictions):
+                    with col:
+                        img = draw_molecule(prediction['product'], (150, 150), fmt=image_format)
+                        if img:
+                            st.image(img, caption=prediction['template'])
+
+@st.fragment
+def property_filter():
+    """Library compounds within descriptor ranges, from the precomputed descriptor table"""
+    st.markdown("### 🎚 Property Filter")
+    table = get_descriptor_table()
+    if table is None:
+        st.info("The descriptor table is missing or out of date for this compound library. "
+                "Run `python build_descriptors.py` to build it.")
+        return
+    if not len(table):
+        st.write("No compounds to filter.")
+        return
+    chosen = st.multiselect("Filter by:", DESCRIPTOR_COLUMNS, default=['mol_wt', 'logp'],
+                            format_func=DESCRIPTOR_LABELS.get)
+    ranges = {}
+    slider_cols = st.columns(max(len(chosen), 1))
+    for col, column in zip(slider_cols, chosen):
+        low, high = table.bounds(column)
+        if low == high:
+            continue
+        with col:
+            if isinstance(low, int):
+                ranges[column] = st.slider(DESCRIPTOR_LABELS[column], low, high, (low, high), key=f"filter_{column}")
+            else:
+                ranges[column] = st.slider(DESCRIPTOR_LABELS[column], float(low), float(high), (float(low), float(high)),
+                                           key=f"filter_{column}")
+    sort_col, order_col = st.columns([2, 1])
+    sort_by = sort_col.selectbox("Sort by:", DESCRIPTOR_COLUMNS, format_func=DESCRIPTOR_LABELS.get)
+    descending = order_col.toggle("Descending")
+    matches = table.filter(ranges)
+    st.write(f"*{len(matches)} of {len(table)} compound(s) match*"
+             + (f" (first {FILTER_RESULTS_SHOWN} shown)" if len(matches) > FILTER_RESULTS_SHOWN else ""))
+    if len(matches):
+        rows = table.rows(matches, sort_by, descending, FILTER_RESULTS_SHOWN)
+        st.dataframe(pd.DataFrame(rows).rename(columns={'name': 'Name', 'smiles': 'SMILES', **DESCRIPTOR_LABELS}), use_container_width=True)
+        export_download("⬇ Matching compounds",
+                        lambda path, fmt: export_rows(table.iter_rows(matches, sort_by, descending), path, fmt),
+                        "filtered_compounds", "export_filtered_compounds")
+
+@st.fragment
+def mechanism_library(reaction_pathways):
+    """Pathway descriptions for one reaction type"""
+    st.markdown("### 🧪 Reaction Mechanism Library")
+    selected_mechanism = st.selectbox("Select reaction type:", list(reaction_pathways.keys()))
+    if selected_mechanism:
+        pathways = reaction_pathways[selected_mechanism]
+        st.write(f"{len(pathways)} pathway(s) available:")
+        for pathway in pathways:
+            with st.expander(pathway['name']):
+                st.write(f"*Description:* {pathway['description']}")
+                if 'mechanism' in pathway:
+                    st.write(f"*Mechanism:* {pathway['mechanism']}")
+                st.write("*Reagents:* " + ", ".join(pathway.get('reagents', [])))
 
 def main():
     st.set_page_config(page_title="Advanced Chemistry Solver", layout="wide")
@@ -384,8 +353,8 @@ def main():
     """)
     
     # Initialize data
-    compound_database = get_compound_database()
     reaction_pathways = get_reaction_pathways()
+    start_render_pool()
     
     # Enhanced example problems
     example_problems = {
@@ -415,38 +384,37 @@ def main():
         show_properties = st.checkbox("Show Molecular Properties", value=True)
         show_mechanism = st.checkbox("Show Reaction Mechanisms", value=True)
         show_flow_diagram = st.checkbox("Show Reaction Flow Diagram", value=True)
+        image_format = st.selectbox(
+            "Image Format:",
+            IMAGE_FORMATS,
+            index=IMAGE_FORMATS.index(DEFAULT_IMAGE_FORMAT),
+            format_func=str.upper,
+            help="SVG is smallest and scales cleanly; WebP is the smallest raster"
+        )
         
         st.markdown("---")
         st.subheader("🔍 Advanced Tools")
         
         # SMILES validator with properties
-        test_smiles = st.text_input("Analyze SMILES:", "c1ccccc1C(=O)O")
-        if test_smiles:
-            if validate_smiles(test_smiles):
-                st.success("✅ Valid SMILES")
-                img = draw_molecule(test_smiles, (200, 200))
-                if img:
-                    st.image(img, caption=get_compound_name(test_smiles))
-                
-                if show_properties:
-                    properties = calculate_molecular_properties(test_smiles)
-                    if properties:
-                        st.write("*Molecular Properties:*")
-                        for prop, value in properties.items():
-                            st.write(f"- {prop}: {value}")
-            else:
-                st.error("❌ Invalid SMILES")
+        smiles_analyzer(show_properties, image_format)
         
         # Quick compound lookup
         st.markdown("---")
         st.subheader("📋 Quick Compound Lookup")
-        compound_query = st.selectbox("Select compound:", list(compound_database.keys()))
-        if compound_query:
-            smiles = compound_database[compound_query]
-            st.write(f"*SMILES:* {smiles}")
-            img = draw_molecule(smiles, (150, 150))
-            if img:
-                st.image(img, caption=compound_query.title())
+        compound_lookup(image_format)
+        
+        # Substructure search
+        st.markdown("---")
+        st.subheader("🔎 Substructure Search")
+        substructure_search()
+        
+        # Molecule cache statistics
+        st.markdown("---")
+        cache_statistics()
+        
+        # Developer performance panel
+        if st.query_params.get("debug") == "1" or metrics.is_enabled():
+            performance_panel()
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -461,119 +429,97 @@ def main():
             help="Describe the reaction sequence with compounds and reaction types"
         )
         
-        # Advanced problem analysis
+        # Advanced problem analysis; kept in session state so fragment reruns can page through it
         if st.button("🔬 Advanced Analysis", type="primary"):
-            with st.spinner("Performing comprehensive analysis..."):
-                # Parse and analyze problem
+            with st.spinner("Performing comprehensive analysis..."), metrics.stage_timer('analysis'):
                 compounds_found, reactions_found = parse_problem(problem_text)
-                
-                # Enhanced analysis display
-                st.subheader("🔍 Detailed Problem Analysis")
-                
-                analysis_col1, analysis_col2, analysis_col3 = st.columns(3)
-                
-                with analysis_col1:
-                    st.markdown("📦 Compounds Identified:")
-                    if compounds_found:
-                        for name, smiles in compounds_found.items():
-                            if smiles:
-                                st.write(f"- *{name.title()}*: {smiles}")
-                                if show_properties:
-                                    props = calculate_molecular_properties(smiles)
-                                    if props:
-                                        st.write(f"  - MW: {props['Molecular Weight']}, Formula: {props['Formula']}")
-                            else:
-                                st.write(f"- *Compound {name}*: Structure unknown")
-                    else:
-                        st.write("- No specific compounds identified")
-                
-                with analysis_col2:
-                    st.markdown("⚗ Reactions Identified:")
-                    if reactions_found:
-                        for reaction in reactions_found:
-                            st.write(f"- {reaction.title()}")
-                            # Show number of available pathways
-                            pathway_count = len(reaction_pathways.get(reaction, []))
-                            st.write(f"  - {pathway_count} pathway(s) available")
-                    else:
-                        st.write("- No specific reactions identified")
-                
-                with analysis_col3:
-                    st.markdown("🎯 Problem Type:")
-                    if 'benzoic acid' in problem_text.lower():
-                        st.write("- Carboxylic acid synthesis")
-                    if 'aniline' in problem_text.lower():
-                        st.write("- Amine synthesis")
-                    if len(reactions_found) > 1:
-                        st.write("- Multi-step synthesis")
-                    else:
-                        st.write("- Single-step transformation")
-                
-                # Solve problem with enhanced display
-                pathways = solve_chemistry_problem(problem_text, selected_reactions)
-                
-                st.subheader("🎯 Comprehensive Pathway Solutions")
-                
-                if not pathways:
-                    st.warning("No pathways found. Try adjusting the reaction types or problem description.")
+                pathways = solve_chemistry_problem(problem_text, selected_reactions, compounds_found, reactions_found)
+                outside = bool(pathways) and pathways[0].get('outside_selection', False)
+                previous = st.session_state.get('analysis')
+                st.session_state['analysis'] = {
+                    'run': previous['run'] + 1 if previous else 1,
+                    'problem_text': problem_text,
+                    'compounds': compounds_found,
+                    'reactions': reactions_found,
+                    'pathways': pathways,
+                    'routes': find_problem_routes(problem_text, None if outside else selected_reactions,
+                                                  compounds_found=compounds_found, reactions_found=reactions_found),
+                    'predictions': {
+                        name: predict_products(smiles, selected_reactions)
+                        for name, smiles in compounds_found.items() if smiles
+                    }
+                }
+        
+        analysis = st.session_state.get('analysis')
+        if analysis:
+            analyzed_text = analysis['problem_text']
+            compounds_found = analysis['compounds']
+            reactions_found = analysis['reactions']
+            
+            # Enhanced analysis display
+            st.subheader("🔍 Detailed Problem Analysis")
+            
+            analysis_col1, analysis_col2, analysis_col3 = st.columns(3)
+            
+            with analysis_col1:
+                st.markdown("📦 Compounds Identified:")
+                if compounds_found:
+                    for name, smiles in compounds_found.items():
+                        if smiles:
+                            st.write(f"- *{name.title()}*: {smiles}")
+                            if show_properties:
+                                props = calculate_molecular_properties(smiles)
+                                if props:
+                                    st.write(f"  - MW: {props['Molecular Weight']}, Formula: {props['Formula']}")
+                        else:
+                            st.write(f"- *Compound {name}*: Structure unknown")
+                else:
+                    st.write("- No specific compounds identified")
+            
+            with analysis_col2:
+                st.markdown("⚗ Reactions Identified:")
+                if reactions_found:
+                    for reaction in reactions_found:
+                        st.write(f"- {reaction.title()}")
+                        # Show number of available pathways
+                        pathway_count = len(reaction_pathways.get(reaction, []))
+                        st.write(f"  - {pathway_count} pathway(s) available")
                 else:
-                    for i, pathway in enumerate(pathways):
-                        with st.expander(f"Pathway {i+1}: {pathway['name']} ({len([c for c in ['A','B','C'] if c in pathway])} steps)", expanded=True):
-                            
-                            # Enhanced compound table
-                            results_data = []
-                            for compound in ['A', 'B', 'C']:
-                                if compound in pathway:
-                                    smiles = pathway[compound]
-                                    results_data.append({
-                                        'Compound': compound,
-                                        'SMILES': smiles,
-                                        'Name': get_compound_name(smiles),
-                                        'Valid': '✅' if validate_smiles(smiles) else '❌'
-                                    })
-                            
-                            # Display enhanced table
-                            if results_data:
-                                df = pd.DataFrame(results_data)
-                                st.table(df)
-                                
-                                # Reaction flow diagram
-                                if show_flow_diagram:
-                                    st.write("*Reaction Flow:*")
-                                    flow_img = create_reaction_flow_diagram(pathway)
-                                    if flow_img:
-                                        st.image(flow_img, use_column_width=True)
-                                
-                                # Molecular structures with properties
-                                st.write("*Molecular Analysis:*")
-                                compounds_to_draw = [c for c in ['A', 'B', 'C'] if c in pathway]
-                                cols = st.columns(len(compounds_to_draw))
-                                
-                                for idx, compound in enumerate(compounds_to_draw):
-                                    smiles = pathway[compound]
-                                    with cols[idx]:
-                                        st.write(f"*Compound {compound}*")
-                                        img = draw_molecule(smiles, (200, 200))
-                                        if img:
-                                            st.image(img, caption=get_compound_name(smiles))
-                                        
-                                        if show_properties:
-                                            props = calculate_molecular_properties(smiles)
-                                            if props:
-                                                st.write(f"*MW:* {props['Molecular Weight']}")
-                                                st.write(f"*Formula:* {props['Formula']}")
-                            
-                            # Enhanced pathway details
-                            st.info(f"*Description:* {pathway['description']}")
-                            
-                            if 'reagents' in pathway:
-                                st.write("🧪 Typical Reagents:")
-                                for reagent in pathway['reagents']:
-                                    st.write(f"- {reagent}")
-                            
-                            if show_mechanism and 'mechanism' in pathway:
-                                st.write("🔬 Reaction Mechanism:")
-                                st.write(pathway['mechanism'])
+                    st.write("- No specific reactions identified")
+            
+            with analysis_col3:
+                st.markdown("🎯 Problem Type:")
+                if 'benzoic acid' in analyzed_text.lower():
+                    st.write("- Carboxylic acid synthesis")
+                if 'aniline' in analyzed_text.lower():
+                    st.write("- Amine synthesis")
+                common_names_found = [name for kind, name in find_compound_mentions(analyzed_text) if kind == 'common_name']
+                if common_names_found:
+                    st.write("- Mentions: " + ", ".join(dict.fromkeys(common_names_found)))
+                if len(reactions_found) > 1:
+                    st.write("- Multi-step synthesis")
+                else:
+                    st.write("- Single-step transformation")
+            
+            st.subheader("🎯 Comprehensive Pathway Solutions")
+            
+            for i, route in enumerate(analysis['routes']):
+                route_info = describe_route(route)
+                names = " → ".join(get_compound_name(smiles) for smiles in route_info['compounds'])
+                reactions = ", ".join(step['reaction_type'] for step in route_info['steps'])
+                st.write(f"*Route {i+1}:* {names} ({reactions})")
+            
+            # Template predictions work for any identified compound, not just the pathway examples
+            for name, predictions in analysis['predictions'].items():
+                if predictions:
+                    labels = [get_compound_name(p['product']) for p in predictions[:PREDICTIONS_SHOWN]]
+                    products = ", ".join(
+                        f"{p['product'] if label == 'Unknown compound' else label} ({p['reaction_type']})"
+                        for label, p in zip(labels, predictions))
+                    more = f" (+{len(predictions) - PREDICTIONS_SHOWN} more)" if len(predictions) > PREDICTIONS_SHOWN else ""
+                    st.write(f"*Predicted from {name.title()}:* {products}{more}")
+            
+            pathway_results(analysis, show_properties, show_mechanism, show_flow_diagram, image_format)
     
     with col2:
         st.markdown("### 🎓 Learning Resources")
@@ -615,31 +561,14 @@ def main():
     adv_col1, adv_col2 = st.columns(2)
     
     with adv_col1:
-        st.markdown("### 📊 Molecular Property Calculator")
-        prop_smiles = st.text_input("Enter SMILES for property calculation:", "CCO")
-        if prop_smiles and validate_smiles(prop_smiles):
-            properties = calculate_molecular_properties(prop_smiles)
-            if properties:
-                st.write("*Calculated Properties:*")
-                for prop, value in properties.items():
-                    st.write(f"- *{prop}:* {value}")
-                img = draw_molecule(prop_smiles, (200, 200))
-                if img:
-                    st.image(img, caption=get_compound_name(prop_smiles))
+        property_calculator(image_format)
     
     with adv_col2:
-        st.markdown("### 🧪 Reaction Mechanism Library")
-        selected_mechanism = st.selectbox("Select reaction type:", list(reaction_pathways.keys()))
-        if selected_mechanism:
-            pathways = reaction_pathways[selected_mechanism]
-            st.write(f"{len(pathways)} pathway(s) available:")
-            for pathway in pathways:
-                with st.expander(pathway['name']):
-                    st.write(f"*Description:* {pathway['description']}")
-                    if 'mechanism' in pathway:
-                        st.write(f"*Mechanism:* {pathway['mechanism']}")
-                    st.write("*Reagents:* " + ", ".join(pathway.get('reagents', [])))
-st.info("developed by Subramanian Ramajayam")
+        mechanism_library(reaction_pathways)
+    
+    product_prediction(list(get_reaction_templates().keys()), selected_reactions, image_format)
+    property_filter()
+    st.info("developed by Subramanian Ramajayam")
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""Shared pytest setup: orgsyn from this checkout and a throwaway reaction store"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orgsyn.store import ReactionStore
+
+@pytest.fixture
+def reaction_store(tmp_path):
+    """Empty store in a temporary directory"""
+    store = ReactionStore(str(tmp_path / 'orgsyn.sqlite3'))
+    yield store
+    store.close()
@@ -0,0 +1,147 @@
+"""HTTP API: micro-batching, request validation and status codes"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import pytest
+
+from orgsyn import api
+from orgsyn.api import ApiServer, MicroBatcher
+
+@pytest.fixture
+def pool():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+def batcher(pool, calls, **options):
+    def function(items):
+        calls.append(list(items))
+        return [item.upper() if item != 'fail' else ValueError(item) for item in items]
+    return MicroBatcher(function, lambda: pool, **options)
+
+def test_requests_for_one_key_share_one_item(pool):
+    calls = []
+    shared = batcher(pool, calls, max_batch=10, window=0.01)
+
+    async def run():
+        return await asyncio.gather(*(shared.submit(key, key) for key in ['a', 'b', 'a', 'a', 'c', 'b']))
+
+    assert asyncio.run(run()) == ['A', 'B', 'A', 'A', 'C', 'B']
+    assert calls == [['a', 'b', 'c']]
+    assert shared.stats == {'requests': 6, 'deduplicated': 3, 'batches': 1, 'items': 3}
+    assert len(shared) == 0
+
+def test_full_batches_flush_without_waiting_for_the_window(pool):
+    calls = []
+    # A window this long would time the test out if full batches waited for it
+    full = batcher(pool, calls, max_batch=3, window=60, max_running=10)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*(full.submit(item, item) for item in 'abcdef')), 5)
+
+    assert asyncio.run(run()) == list('ABCDEF')
+    assert calls == [['a', 'b', 'c'], ['d', 'e', 'f']]
+
+def test_partial_batches_flush_after_the_window(pool):
+    calls = []
+    partial = batcher(pool, calls, max_batch=100, window=0.01)
+
+    async def run():
+        first = await partial.submit('a', 'a')
+        second = await asyncio.gather(partial.submit('b', 'b'), partial.submit('c', 'c'))
+        return first, second
+
+    assert asyncio.run(run()) == ('A', ['B', 'C'])
+    assert calls == [['a'], ['b', 'c']]
+
+def test_queued_batches_wait_for_a_free_slot(pool):
+    calls = []
+    limited = batcher(pool, calls, max_batch=2, window=0.01, max_running=1)
+
+    async def run():
+        return await asyncio.gather(*(limited.submit(item, item) for item in 'abcde'))
+
+    assert asyncio.run(run()) == list('ABCDE')
+    assert sorted(map(len, calls), reverse=True) == [2, 2, 1]
+    assert limited.stats['batches'] == 3
+
+def test_item_errors_reach_only_their_callers(pool):
+    calls = []
+    failing = batcher(pool, calls, window=0.01)
+
+    async def run():
+        return await asyncio.gather(failing.submit('ok', 'ok'), failing.submit('fail', 'fail'), return_exceptions=True)
+
+    ok, error = asyncio.run(run())
+    assert ok == 'OK' and isinstance(error, ValueError)
+    assert len(failing) == 0
+
+@pytest.fixture
+def server(reaction_store, monkeypatch):
+    reaction_store.sync_builtin()
+    monkeypatch.setattr(api, 'get_reaction_store', lambda: reaction_store)
+    server = ApiServer(workers=1, threads=2, batch_window=0.01)
+    yield server
+    server.close()
+
+def request(server, target, body=None, method='GET'):
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode('utf-8')
+    status, content_type, data = asyncio.run(server._respond(method if body is None else 'POST', target, body or b''))
+    return status, json.loads(data) if content_type == 'application/json' else data
+
+@pytest.mark.parametrize('target, body', [
+    ('/search?facets=century', None),
+    ('/search', {'facets': {'colour': 'blue'}}),
+    ('/search', {'facets': {'century': {'from': 1800}}}),
+    ('/search?limit=0', None),
+    ('/search?limit=ten', None),
+    ('/search?search_by=Nothing', None),
+    ('/solve', None),
+    ('/parse', {'problem': 5}),
+    ('/properties', {'smiles': []}),
+    ('/properties', b'not json'),
+    ('/properties', b'["CCO"]'),
+    ('/draw?smiles=CCO&size=0', None),
+    ('/draw?smiles=CCO&format=gif', None),
+])
+def test_bad_requests_are_rejected(server, target, body):
+    status, data = request(server, target, body)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert data['error']
+
+@pytest.mark.parametrize('target', ['/properties?smiles=xx', '/draw?smiles=C1CC'])
+def test_invalid_smiles_is_unprocessable(server, target):
+    status, data = request(server, target)
+    assert status == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert data == {'error': f"invalid SMILES: {target.split('=')[1]}"}
+
+def test_unknown_endpoints_and_methods(server):
+    assert request(server, '/nowhere')[0] == HTTPStatus.NOT_FOUND
+    assert request(server, '/health', method='DELETE')[0] == HTTPStatus.METHOD_NOT_ALLOWED
+
+def test_repeated_facet_parameters_combine(server, reaction_store):
+    status, data = request(server, '/search?facets=century:1800&facets=century:1900&limit=1000')
+    assert status == HTTPStatus.OK
+    total, _, _ = reaction_store.filter_reactions(facets={'century': ['1800', '1900']}, limit=1000)
+    assert data['total'] == total > 0
+    assert {reaction['year'] // 100 for reaction in data['reactions']} == {18, 19}
+
+def test_spellings_of_one_molecule_share_one_batch_item(server):
+    status, data = request(server, '/properties', {'smiles': ['OCC', 'CCO', 'C(O)C', 'c1ccccc1']})
+    assert status == HTTPStatus.OK
+    assert [row['smiles'] for row in data['results']] == ['OCC', 'CCO', 'C(O)C', 'c1ccccc1']
+    assert len({json.dumps(row['properties'], sort_keys=True) for row in data['results']}) == 2
+    assert server.batchers['properties'].stats == {'requests': 4, 'deduplicated': 2, 'batches': 1, 'items': 2}
+
+def test_list_of_smiles_reports_invalid_entries_inline(server):
+    status, data = request(server, '/properties', {'smiles': ['CCO', 'xx']})
+    assert status == HTTPStatus.OK
+    assert data['results'][1] == {'smiles': 'xx', 'properties': None, 'display': None}
+
+def test_draw_returns_an_image(server):
+    status, data = request(server, '/draw?smiles=CCO&size=120x80')
+    assert status == HTTPStatus.OK
+    assert data.lstrip().startswith(b'<svg') and b"width='120px'" in data
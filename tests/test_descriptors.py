@@ -0,0 +1,77 @@
+"""Descriptor table: .npz round trip and range filters against a naive scan"""
+import numpy as np
+import pytest
+
+from orgsyn import descriptors
+from orgsyn.chemistry import calculate_numeric_properties
+from orgsyn.data import get_compound_database
+from orgsyn.descriptors import DESCRIPTOR_COLUMNS, DescriptorTable, _blob, build_descriptor_table
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('descriptors') / 'descriptors.npz')
+    built = build_descriptor_table(list(get_compound_database().items()) + [('broken', 'xx')], path=path, workers=1)
+    return built, DescriptorTable.load(path)
+
+def naive_filter(columns, ranges):
+    mask = np.ones(len(next(iter(columns.values()))), dtype=bool)
+    for column, (low, high) in ranges.items():
+        if low is not None:
+            mask &= columns[column] >= low
+        if high is not None:
+            mask &= columns[column] <= high
+    return np.flatnonzero(mask)
+
+def test_round_trip_keeps_every_row(table):
+    built, loaded = table
+    assert len(loaded) == len(built) == len(get_compound_database())
+    for column in DESCRIPTOR_COLUMNS:
+        assert loaded.column(column).tolist() == built.column(column).tolist()
+    assert [loaded.name(row) for row in range(len(loaded))] == list(get_compound_database())
+
+def test_values_match_the_property_calculator(table):
+    _, loaded = table
+    for row in range(len(loaded)):
+        properties = calculate_numeric_properties(loaded.smiles(row))
+        assert {column: loaded.column(column)[row].item() for column in DESCRIPTOR_COLUMNS} == pytest.approx(
+            {column: properties[column] for column in DESCRIPTOR_COLUMNS})
+
+def test_filters_match_a_naive_scan():
+    rng = np.random.default_rng(22)
+    count = 5000
+    columns = {column: (rng.integers(0, 12, count).astype('<i4') if column in ('heavy_atoms', 'h_bond_donors')
+                        else rng.normal(200, 80, count)) for column in DESCRIPTOR_COLUMNS}
+    names = _blob([f'c{row}' for row in range(count)])
+    synthetic = DescriptorTable(names, names, columns)
+    for _ in range(100):
+        ranges = {}
+        for column in rng.choice(DESCRIPTOR_COLUMNS, rng.integers(1, 4), replace=False):
+            low, high = sorted(rng.choice(np.append(columns[column], [None, None]), 2, replace=False),
+                               key=lambda value: -np.inf if value is None else value)
+            ranges[str(column)] = (low, high)
+        assert synthetic.filter(ranges).tolist() == naive_filter(columns, ranges).tolist(), ranges
+
+def test_rows_sort_and_truncate(table):
+    _, loaded = table
+    matches = loaded.filter({'mol_wt': (50, 150)})
+    rows = loaded.rows(matches, 'logp', descending=True, limit=3)
+    assert len(rows) == 3
+    assert [row['logp'] for row in rows] == sorted(loaded.column('logp')[matches].tolist(), reverse=True)[:3]
+    assert [row['name'] for row in loaded.iter_rows(matches, chunk_size=2)] == [loaded.name(row) for row in matches]
+
+def test_empty_table():
+    empty = DescriptorTable.build([], workers=1)
+    assert len(empty) == 0
+    assert empty.bounds('logp') == (None, None)
+    assert empty.filter({'mol_wt': (1, 2)}).tolist() == []
+
+def test_app_table_is_loaded_only_once_built(tmp_path, monkeypatch):
+    path = str(tmp_path / 'descriptors.npz')
+    monkeypatch.setattr(descriptors, 'DESCRIPTOR_PATH', path)
+    descriptors.get_descriptor_table.cache_clear()
+    try:
+        assert descriptors.get_descriptor_table() is None
+        build_descriptor_table(path=path, workers=1)
+        assert len(descriptors.get_descriptor_table()) == len(get_compound_database())
+    finally:
+        descriptors.get_descriptor_table.cache_clear()
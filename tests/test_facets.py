@@ -0,0 +1,94 @@
+"""Facet bitmaps: selections and drill-down counts against a naive filter"""
+import itertools
+import random
+
+from orgsyn.facets import FACETS, FacetIndex, bitmap_of, contains, ids_of, reaction_facet_values, split_chemists
+
+def naive_counts(values_by_id, filters, within=None):
+    """{facet: {value: count}} by checking every reaction against the filters on the other facets"""
+    def matches(values, exclude):
+        return all(not chosen or values.get(facet, set()) & set(chosen)
+                   for facet, chosen in filters.items() if facet != exclude)
+    counts = {facet: {} for facet in FACETS}
+    for reaction_id, values in values_by_id.items():
+        if within is not None and reaction_id not in within:
+            continue
+        for facet in FACETS:
+            if matches(values, facet):
+                for value in values.get(facet, ()):
+                    counts[facet][value] = counts[facet].get(value, 0) + 1
+    return counts
+
+def random_reactions(rng, count):
+    choices = {'century': ['1700', '1800', '1900'], 'chemist': ['Hofmann', 'Claisen', 'Wittig', 'Diels', 'Alder'],
+               'mechanism': ['radical', 'hydride transfer', 'other'], 'reaction_type': ['oxidation', 'reduction',
+                                                                                      'addition', 'other']}
+    reactions = {}
+    for reaction_id in rng.sample(range(1, count * 3), count):
+        reactions[reaction_id] = {facet: set(rng.sample(values, rng.randint(1 if facet != 'chemist' else 0, 2)))
+                                  for facet, values in choices.items()}
+    return reactions
+
+def build_index(reactions, batches=1):
+    index = FacetIndex()
+    ids = sorted(reactions)
+    for batch in (ids[start::batches] for start in range(batches)):
+        index.add(batch, [(reaction_id, facet, value) for reaction_id in batch
+                          for facet, values in reactions[reaction_id].items() for value in values])
+    return index
+
+def nonzero(counts):
+    return {facet: {value: count for value, count in values.items() if count} for facet, values in counts.items()}
+
+def test_bitmap_round_trip():
+    ids = [0, 3, 64, 65, 1000]
+    bitmap = bitmap_of(ids)
+    assert ids_of(bitmap).tolist() == ids
+    assert contains(bitmap, [3, 4, 1000, 5000]).tolist() == [True, False, True, False]
+    assert bitmap_of([]) == 0
+
+def test_counts_match_a_naive_filter():
+    rng = random.Random(24)
+    reactions = random_reactions(rng, 300)
+    # Built in interleaved batches, as the store folds in new reactions
+    index = build_index(reactions, batches=3)
+    assert len(index) == len(reactions)
+    assert nonzero(index.counts()) == naive_counts(reactions, {})
+    for _ in range(50):
+        filters = {facet: rng.sample(sorted({value for values in reactions.values() for value in values[facet]}),
+                                     rng.randint(0, 2))
+                   for facet in rng.sample(list(FACETS), rng.randint(1, 3))}
+        within = set(rng.sample(sorted(reactions), 100)) if rng.random() < 0.5 else None
+        counts = index.counts(filters, bitmap_of(sorted(within)) if within is not None else None)
+        assert nonzero(counts) == naive_counts(reactions, filters, within), filters
+        selected = {reaction_id for reaction_id, values in reactions.items()
+                    if all(not chosen or values[facet] & set(chosen) for facet, chosen in filters.items())}
+        assert set(ids_of(index.select(filters)).tolist()) == selected
+
+def test_century_values_are_ordered_chronologically():
+    index = build_index({1: {'century': {'1900'}}, 2: {'century': {'1800'}}, 3: {'century': {'1800'}}})
+    assert list(index.counts()['century'].items()) == [('1800', 2), ('1900', 1)]
+
+def test_reaction_facet_values():
+    values = reaction_facet_values({
+        'name': 'Hofmann Elimination', 'chemist': 'Hans Meerwein, Wolfgang Ponndorf, and Albert Verley',
+        'year': 1851, 'description': 'Amines to alkenes', 'mechanism': 'E2 elimination'})
+    grouped = {facet: [value for _, value in group] for facet, group in itertools.groupby(values, key=lambda item: item[0])}
+    assert grouped == {'century': ['1800'], 'chemist': ['Hans Meerwein', 'Wolfgang Ponndorf', 'Albert Verley'],
+                       'mechanism': ['elimination'], 'reaction_type': ['elimination']}
+    assert split_chemists('Diels & Alder') == ['Diels', 'Alder']
+
+def test_store_counts_match_the_stored_reactions(reaction_store):
+    reaction_store.sync_builtin()
+    reactions = {}
+    for reaction in reaction_store.list_reactions(limit=1000):
+        values = {}
+        for facet, value in reaction_facet_values(reaction):
+            values.setdefault(facet, set()).add(value)
+        reactions[reaction['id']] = values
+    for filters in ({}, {'century': ['1800']}, {'century': ['1800'], 'mechanism': ['radical', 'rearrangement']}):
+        total, page, counts = reaction_store.filter_reactions(facets=filters, limit=1000)
+        assert nonzero(counts) == naive_counts(reactions, filters)
+        assert total == len(page) == sum(1 for values in reactions.values()
+                                         if all(values.get(facet, set()) & set(chosen)
+                                                for facet, chosen in filters.items()))
@@ -0,0 +1,52 @@
+"""Packed fingerprints: SWAR popcount and vectorized Tanimoto against RDKit"""
+import numpy as np
+import pytest
+from rdkit import Chem, DataStructs
+from rdkit.Chem import AllChem
+
+from orgsyn.data import get_compound_database
+from orgsyn.fingerprints import SIMILARITY_FP_SIZE, SIMILARITY_RADIUS, SimilarityIndex, _popcount_rows
+
+def morgan(smiles):
+    return AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(smiles), SIMILARITY_RADIUS, nBits=SIMILARITY_FP_SIZE)
+
+def python_popcounts(words):
+    return [sum(bin(int(word)).count('1') for word in row) for row in words]
+
+@pytest.mark.parametrize('columns', [1, 16, 31, 32, 70])
+def test_swar_popcount_matches_python(monkeypatch, columns):
+    # Force the SWAR fallback even where NumPy has bitwise_count
+    monkeypatch.delattr(np, 'bitwise_count', raising=False)
+    rng = np.random.default_rng(columns)
+    words = rng.integers(0, 2 ** 63, (40, columns), dtype=np.uint64) | np.uint64(1 << 63)
+    words[0] = 0
+    words[1] = np.uint64(2 ** 64 - 1)
+    assert _popcount_rows(words).tolist() == python_popcounts(words)
+
+def test_popcount_of_an_empty_matrix():
+    assert _popcount_rows(np.zeros((0, 16), dtype=np.uint64)).tolist() == []
+
+def test_scores_match_bulk_tanimoto():
+    records = list(get_compound_database().items())
+    index = SimilarityIndex(records)
+    fingerprints = [morgan(smiles) for smiles in index.smiles]
+    for position, query in enumerate(fingerprints):
+        expected = DataStructs.BulkTanimotoSimilarity(query, fingerprints)
+        assert index.scores(index.fingerprints[position]) == pytest.approx(expected, abs=1e-6)
+
+def test_nearest_is_best_first_and_honours_the_threshold():
+    index = SimilarityIndex(get_compound_database().items())
+    nearest = index.nearest('Nc1ccc(Br)cc1', k=5)
+    scores = [score for _, _, score in nearest]
+    assert scores == sorted(scores, reverse=True)
+    best = max(DataStructs.BulkTanimotoSimilarity(morgan('Nc1ccc(Br)cc1'), [morgan(smiles) for smiles in index.smiles]))
+    assert len(nearest) == 5 and scores[0] == pytest.approx(best, abs=1e-6)
+    assert index.nearest('Nc1ccc(Br)cc1', k=5, threshold=0.99) == []
+
+def test_closest_is_memoized_per_index():
+    index = SimilarityIndex(get_compound_database().items())
+    name, score = index.closest('Nc1ccc(Br)cc1')
+    assert (name, score) == index.nearest('Nc1ccc(Br)cc1', k=1)[0][::2]
+    assert index.closest('Nc1ccc(Br)cc1') == (name, score)
+    assert list(index._closest) == [('Nc1ccc(Br)cc1', 0.3)]
+    assert SimilarityIndex(get_compound_database().items())._closest == {}
@@ -0,0 +1,78 @@
+"""Typo-tolerant name lookup: trigram filter plus bounded Levenshtein against brute force"""
+import random
+
+from orgsyn.fuzzy import FuzzyNameIndex, bounded_levenshtein
+from orgsyn.parsing import _resolve_fuzzy, build_name_index, parse_problem
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def misspell(rng, word, edits):
+    chars = list(word)
+    for _ in range(edits):
+        position = rng.randint(0, len(chars))
+        operation = rng.randint(0, 2)
+        if operation == 0 or not chars:
+            chars.insert(position, rng.choice('abcdefghij'))
+        elif position < len(chars):
+            if operation == 1:
+                chars.pop(position)
+            else:
+                chars[position] = rng.choice('abcdefghij')
+    return ' '.join(''.join(chars).split())
+
+def test_bounded_levenshtein_matches_the_full_distance_up_to_the_limit():
+    rng = random.Random(23)
+    for _ in range(500):
+        a = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 8)))
+        b = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 8)))
+        limit = rng.randint(0, 4)
+        assert bounded_levenshtein(a, b, limit) == min(levenshtein(a, b), limit + 1), (a, b, limit)
+
+def test_search_returns_exactly_the_names_within_the_budget():
+    rng = random.Random(1)
+    vocabulary = {' '.join(''.join(rng.choice('abcdefghij ') for _ in range(rng.randint(3, 15))).split()) or 'x': i
+                  for i in range(800)}
+    index = FuzzyNameIndex(vocabulary)
+    for _ in range(60):
+        query = misspell(rng, rng.choice(index.terms), rng.randint(0, 3))
+        if not query:
+            continue
+        distances = {term: levenshtein(query, term) for term in index.terms}
+        for max_distance in (1, 2, 3):
+            found = {term: distance for term, _, distance in index.search(query, max_distance)}
+            assert found == {term: distance for term, distance in distances.items() if distance <= max_distance}, (
+                query, max_distance)
+
+def test_results_come_closest_first():
+    index = FuzzyNameIndex({'toluene': 1, 'toluen': 2, 'xylene': 3})
+    assert [(term, distance) for term, _, distance in index.search('tolune', 2)] == [('toluene', 1), ('toluen', 2)]
+
+def test_best_match_refuses_ties_between_different_names():
+    index = FuzzyNameIndex({'butanol': 'butanol', 'butenol': 'butenol'})
+    assert index.best_match('butxnol', 1) is None
+    assert index.best_match('butanal', 1) == ('butanol', 'butanol', 1)
+
+def test_misspelled_compounds_resolve_in_problems():
+    compounds, reactions = parse_problem("Benzne on nitraton gives Compound A; ethanoll is oxidized")
+    assert compounds == {'benzene': 'c1ccccc1', 'ethanol': 'CCO'}
+    assert reactions == ['nitration', 'oxidation']
+
+def test_functional_group_endings_are_not_corrected_away():
+    # 'ethanal' is one edit from 'ethanol' but names a different compound
+    index = build_name_index({'ethanol': 'CCO'}, {}, {})
+    assert _resolve_fuzzy(index, 'ethanal') is None
+    assert _resolve_fuzzy(index, 'ethanoll')[0] == 'ethanol'
+
+def test_resolution_memo_lives_on_the_index():
+    first = build_name_index({'ethanol': 'CCO'}, {}, {})
+    second = build_name_index({'ethanol': 'CCO'}, {}, {})
+    _resolve_fuzzy(first, 'ethanoll')
+    assert 'ethanoll' in first.resolved
+    assert not second.resolved
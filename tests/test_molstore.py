@@ -0,0 +1,55 @@
+"""Molecule store: build, map and read back"""
+from rdkit import Chem
+
+from orgsyn.molstore import MoleculeStore, build_molecule_store, read_compound_file
+
+RECORDS = [
+    ('ethanol', 'CCO'),
+    ('ethanol, again', 'OCC'),
+    ('benzene', 'c1ccccc1'),
+    ('kekule benzene', 'C1=CC=CC=C1'),
+    ('not a molecule', 'xx'),
+    ('acetic acid', 'CC(=O)O'),
+    ('caffeine', 'Cn1cnc2c1c(=O)n(C)c(=O)n2C'),
+]
+
+def build(tmp_path, records=RECORDS):
+    path = str(tmp_path / 'molecules.bin')
+    stats = build_molecule_store(records, path=path, workers=1)
+    return stats, MoleculeStore(path)
+
+def test_build_counts_duplicates_and_invalid_records(tmp_path):
+    stats, store = build(tmp_path)
+    assert stats == {'read': 7, 'written': 4, 'duplicates': 2, 'invalid': 1}
+    assert len(store) == 4
+
+def test_round_trip_keeps_names_smiles_and_molecules(tmp_path):
+    _, store = build(tmp_path)
+    expected = {'ethanol': 'CCO', 'benzene': 'c1ccccc1', 'acetic acid': 'CC(=O)O',
+                'caffeine': 'Cn1c(=O)c2c(ncn2C)n(C)c1=O'}
+    assert {store.name(row): store.smiles(row) for row in range(len(store))} == expected
+    for row in range(len(store)):
+        assert Chem.MolToSmiles(store.mol(row)) == store.smiles(row)
+        assert store.find_inchikey(store.inchikey(row)) == row
+
+def test_every_spelling_finds_its_row(tmp_path):
+    _, store = build(tmp_path)
+    for spelling in ('CCO', 'OCC', 'c1ccccc1', 'C1=CC=CC=C1'):
+        row = store.find(spelling)
+        assert row is not None
+        assert store.smiles(row) == Chem.MolToSmiles(Chem.MolFromSmiles(spelling))
+    assert store.find('CCCCCC') is None
+    assert store.get_mol('xx') is None
+
+def test_empty_store(tmp_path):
+    stats, store = build(tmp_path, [])
+    assert stats['written'] == 0 and len(store) == 0
+    assert store.find('CCO') is None
+
+def test_compound_files_are_read_by_extension(tmp_path):
+    smi = tmp_path / 'library.smi'
+    smi.write_text("# comment\nCCO ethyl alcohol\nc1ccccc1\n", encoding='utf-8')
+    csv_file = tmp_path / 'library.csv'
+    csv_file.write_text("name,smiles\nacetone,CC(C)=O\n", encoding='utf-8')
+    assert list(read_compound_file(str(smi))) == [('ethyl alcohol', 'CCO'), ('c1ccccc1', 'c1ccccc1')]
+    assert list(read_compound_file(str(csv_file))) == [('acetone', 'CC(C)=O')]
@@ -0,0 +1,62 @@
+"""Mention scanner: whole-word, leftmost-longest matching in one pass"""
+import random
+
+from orgsyn.parsing import MentionScanner, _normalize_mention_text, parse_problem
+
+def scanner(*terms):
+    return MentionScanner({term: term.upper() for term in terms})
+
+def brute_force_spans(terms, text):
+    """Leftmost-longest whole-word matches by trying every term at every position"""
+    text = _normalize_mention_text(text)
+    spans = []
+    position = 0
+    while position < len(text):
+        best = None
+        for term in terms:
+            end = position + len(term)
+            if (text.startswith(term, position)
+                    and (position == 0 or not text[position - 1].isalnum())
+                    and (end == len(text) or not text[end].isalnum())
+                    and (best is None or len(term) > len(best))):
+                best = term
+        if best is None:
+            position += 1
+        else:
+            spans.append((position, position + len(best), best))
+            position += len(best)
+    return spans
+
+def test_longest_term_wins_at_the_same_start():
+    assert scanner('benzoic', 'benzoic acid').scan("Benzoic acid is esterified") == [('benzoic acid', 'BENZOIC ACID')]
+
+def test_leftmost_match_wins_over_a_later_overlapping_one():
+    assert scanner('acetic acid', 'acid chloride').scan("acetic acid chloride") == [('acetic acid', 'ACETIC ACID')]
+
+def test_only_whole_words_match():
+    terms = scanner('ethanol', 'ol', 'ethan')
+    assert terms.scan("methanol and ethanolamine") == []
+    assert terms.scan("(ethanol).") == [('ethanol', 'ETHANOL')]
+
+def test_case_and_whitespace_are_normalized():
+    assert scanner('acetic acid').scan_spans("Add  ACETIC\n acid") == [(4, 15, 'acetic acid', 'ACETIC ACID')]
+
+def test_terms_inside_longer_words_are_not_matched():
+    # 'benzene' is reached inside 'nitrobenzene' through a dictionary link, but is not a whole word there
+    assert scanner('nitrobenzene', 'benzene').scan("nitrobenzene, then benzene") == [
+        ('nitrobenzene', 'NITROBENZENE'), ('benzene', 'BENZENE')]
+
+def test_scanner_agrees_with_brute_force():
+    rng = random.Random(6)
+    words = ['ab', 'abc', 'bc', 'cab', 'a', 'ca', 'bca']
+    for _ in range(200):
+        terms = {' '.join(rng.choice(words) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 8))}
+        text = ''.join(rng.choice(words) + rng.choice([' ', ' ', '-', '']) for _ in range(rng.randint(1, 12)))
+        expected = brute_force_spans(terms, text)
+        assert [(start, end, term) for start, end, term, _ in scanner(*terms).scan_spans(text)] == expected, (terms, text)
+
+def test_parse_problem_finds_compounds_and_reactions_in_text_order():
+    compounds, reactions = parse_problem(
+        "Benzene on nitration gives Compound A which on reduction gives Compound B, aniline.")
+    assert compounds == {'benzene': 'c1ccccc1', 'aniline': 'Nc1ccccc1'}
+    assert reactions == ['nitration', 'reduction']
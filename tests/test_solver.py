@@ -0,0 +1,40 @@
+"""Problem solving on the app's example problems"""
+import json
+
+import pytest
+
+from orgsyn.solver import analyze_problem, solve_chemistry_problem
+
+# The app's default reaction-type selection
+SELECTED = ['oxidation', 'reduction', 'esterification']
+
+@pytest.mark.parametrize('problem, expected, outside', [
+    ("Compound A on oxidation gives Compound B which on further oxidation gives compound C, benzoic acid.",
+     ['Primary Alcohol Oxidation', 'Toluene Oxidation'], False),
+    ("Benzene on nitration gives Compound A which on reduction gives Compound B, aniline.",
+     ['Nitro Reduction'], False),
+    ("Benzoic acid undergoes esterification with methanol to give Compound A.",
+     ['Fischer Esterification', 'Acyl Chloride Route'], False),
+    ("Aniline undergoes acetylation to give Compound A.",
+     ['Nitro Reduction'], False),
+    ("Benzene is first acylated to Compound A, which is then reduced to Compound B.",
+     ['Friedel-Crafts Acylation', 'Carbonyl Reduction', 'Nitro Reduction'], True),
+    ("Bromobenzene reacts with formaldehyde via Grignard reaction to give Compound A.",
+     ['Grignard with Carbonyl'], True),
+])
+def test_example_problems(problem, expected, outside):
+    pathways = solve_chemistry_problem(problem, SELECTED)
+    assert [pathway['name'] for pathway in pathways] == expected
+    assert all(pathway.get('outside_selection', False) is outside for pathway in pathways)
+
+def test_unlinked_problems_have_no_pathways():
+    assert solve_chemistry_problem("Compound A is heated gently.", SELECTED) == []
+
+def test_analysis_is_json_serializable():
+    problem = "Benzene is first acylated to Compound A, which is then reduced to Compound B."
+    analysis = analyze_problem(problem, SELECTED)
+    assert json.loads(json.dumps(analysis)) == analysis
+    # Routes are found over the same reaction types as the pathways shown
+    steps = {step['pathway'] for route in analysis['routes'] for step in route['steps']}
+    assert steps <= {pathway['name'] for pathway in analysis['pathways']}
+    assert analysis['routes']
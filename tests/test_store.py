@@ -0,0 +1,79 @@
+"""SQLite/FTS5 store: search text normalization, ranking and builtin sync"""
+import pytest
+
+from orgsyn.data import get_common_names, get_compound_database, get_named_reactions
+from orgsyn.search import normalize_search_text
+from orgsyn.store import get_reaction_store
+
+REACTIONS = [
+    {'name': 'Ozonolysis', 'chemist': 'Christian Schönbein', 'year': 1840,
+     'description': 'Cleavage of alkenes', 'mechanism': 'Criegee intermediate'},
+    {'name': 'Alkene cleavage', 'description': 'Oxidative cleavage related to ozonolysis',
+     'mechanism': 'Concerted addition'},
+    {'name': 'Hofmann Elimination', 'chemist': 'August Wilhelm von Hofmann', 'year': 1851,
+     'description': 'Amines to alkenes', 'mechanism': 'E2 elimination'},
+    {'name': 'Amine degradation', 'description': 'A Hofmann-type degradation', 'mechanism': 'E1 pathway'},
+    {'name': 'Arndt-Eistert Synthesis', 'reactants': 'RCOCl + CH₂N₂', 'products': 'RCH₂COOH',
+     'description': 'Homologation of acids', 'mechanism': 'Wolff rearrangement'},
+]
+
+@pytest.mark.parametrize('text, expected', [
+    ('CH₂N₂', 'ch2n2'),
+    ('R₃N⁺I⁻', 'r3n+i-'),
+    ('a−b‐c–d', 'a-b-c-d'),
+    ('Straße', 'strasse'),
+    ('ﬁsher', 'fisher'),
+    (1851, '1851'),
+    ('', ''),
+])
+def test_normalize_search_text(text, expected):
+    assert normalize_search_text(text) == expected
+
+@pytest.fixture
+def store(reaction_store):
+    reaction_store.import_reactions(REACTIONS, 'test')
+    return reaction_store
+
+def names(reactions):
+    return [reaction['name'] for reaction in reactions]
+
+def test_name_matches_outrank_description_matches(store):
+    assert names(store.search_reactions('ozonolysis')) == ['Ozonolysis', 'Alkene cleavage']
+
+def test_chemist_matches_outrank_description_matches(store):
+    assert names(store.search_reactions('hofmann')) == ['Hofmann Elimination', 'Amine degradation']
+
+def test_every_term_must_match(store):
+    assert names(store.search_reactions('alkenes cleavage')) == ['Ozonolysis']
+    assert store.search_reactions('ozonolysis hofmann') == []
+
+def test_subscripts_and_case_do_not_matter(store):
+    assert names(store.search_reactions('ch2n2')) == ['Arndt-Eistert Synthesis']
+    assert names(store.search_reactions('CH₂N₂')) == ['Arndt-Eistert Synthesis']
+
+def test_short_terms_fall_back_to_substring_matching(store):
+    assert names(store.search_reactions('E1')) == ['Amine degradation']
+    assert names(store.search_reactions('e2 hofmann')) == ['Hofmann Elimination']
+
+def test_fields_restrict_the_search(store):
+    assert names(store.search_reactions('ozonolysis', fields=['name'])) == ['Ozonolysis']
+    assert store.search_reactions('hofmann', fields=['mechanism']) == []
+
+def test_counts_and_pages_agree(store):
+    assert store.count_reactions() == len(REACTIONS)
+    assert store.count_reactions('alkenes') == 2
+    assert names(store.search_reactions('alkenes', limit=1, offset=1)) == names(store.search_reactions('alkenes'))[1:]
+
+def test_builtin_sync_loads_the_data_files_once(reaction_store):
+    assert reaction_store.sync_builtin()
+    assert not reaction_store.sync_builtin()
+    assert reaction_store.stats() == {'compounds': len(get_compound_database()),
+                                      'reactions': len(get_named_reactions()),
+                                      'common_names': len(get_common_names())}
+
+def test_one_store_per_path(tmp_path):
+    path = str(tmp_path / 'shared.sqlite3')
+    store = get_reaction_store(path)
+    assert get_reaction_store(path) is store
+    assert get_reaction_store(str(tmp_path / 'other.sqlite3')) is not store
+    assert store.count_reactions() == len(get_named_reactions())
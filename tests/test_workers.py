@@ -0,0 +1,36 @@
+"""Chunked scheduling over the shared process pool"""
+import itertools
+import operator
+
+import pytest
+
+from orgsyn.workers import chunked, map_chunks
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_results_keep_input_order(workers):
+    assert list(map_chunks(sum, range(100), 10, workers=workers)) == [sum(range(start, start + 10))
+                                                                      for start in range(0, 100, 10)]
+    assert list(map_chunks(operator.getitem, range(25), 10, workers=workers, args=(-1,))) == [9, 19, 24]
+
+def test_short_inputs_run_inline():
+    # A lambda cannot be pickled, so this only works without a pool
+    assert list(map_chunks(lambda chunk: len(chunk), range(5), 10, workers=4)) == [5]
+    assert list(map_chunks(len, [], 10, workers=4)) == []
+
+def test_input_is_read_a_few_chunks_ahead():
+    consumed = itertools.count()
+
+    def numbers():
+        for number in range(1000):
+            next(consumed)
+            yield number
+
+    results = map_chunks(len, numbers(), 10, workers=2)
+    assert next(results) == 10
+    # At most two chunks per worker in flight before the first result is handed back
+    assert next(consumed) <= 10 * 2 * 2
+    assert sum(results) == 990
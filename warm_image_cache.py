@@ -0,0 +1,24 @@
+"""Pre-render molecule images for the comprehensive app.
+
+Usage:
+    python warm_image_cache.py
+    python warm_image_cache.py svg webp
+
+Renders every compound in data/compounds.json and every pathway grid in
+data/reaction_pathways.json into the on-disk image cache (ORGSYN_IMAGE_CACHE_DIR,
+default .cache/images) so the first page views after a deploy are served
+from cache instead of RDKit. Formats default to ORGSYN_IMAGE_FORMAT (svg).
+"""
+import sys
+import time
+
+from orgsyn.cache import get_image_cache
+from orgsyn.chemistry import DEFAULT_IMAGE_FORMAT, warm_image_cache
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    rendered = sum(warm_image_cache(fmt=fmt) for fmt in sys.argv[1:] or [DEFAULT_IMAGE_FORMAT])
+    elapsed = time.perf_counter() - start
+    stats = get_image_cache().stats()
+    print(f"Warmed {rendered} images in {elapsed:.1f}s "
+          f"({stats['misses']} rendered, {stats['memory_hits'] + stats['disk_hits']} already cached)")